@@ -30,6 +30,13 @@ from app.database import engine  # Importeer je engine
 
 target_metadata = models.SQLModel.metadata
 
+# De FTS5 zoektabellen (en hun schaduwtabellen) staan niet in de metadata maar worden door
+# app/hulpmiddelen/zoekindex.py en de FTS5 migratie beheerd: autogenerate moet ze negeren.
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return "_fts" not in name
+    return True
+
 # Andere waarden van config, gedefinieerd door de behoeften van env.py,
 # kunnen worden verkregen:
 # my_important_option = config.get_main_option("my_important_option")
@@ -53,7 +60,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        render_as_batch=True
+        render_as_batch=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -71,7 +79,8 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
-            render_as_batch=True  # Voeg deze regel toe
+            render_as_batch=True,  # Voeg deze regel toe
+            include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,67 @@
+"""Jubileumdag als DATE kolom met index
+
+Revision ID: 3f6b9d0e1a24
+Revises: 8c1e4a7d2f90
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from alembic import op
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b9d0e1a24'
+down_revision: Union[str, None] = '8c1e4a7d2f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def parse_jubileumdag(waarde) -> date:
+    if isinstance(waarde, date):
+        return waarde
+    waarde = str(waarde).strip()
+    for formaat in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(waarde[:10], formaat).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Onbekend datumformaat voor jubileumdag: {waarde!r}")
+
+
+def upgrade() -> None:
+    # Nieuwe DATE kolom vullen en daarna de oude tekstkolom vervangen. Een alter_column met
+    # type-wijziging zou in SQLite een CAST(... AS DATE) doen, wat '2000-05-15' tot 2000 maakt.
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jubileumdag_datum', sa.Date(), nullable=True))
+
+    connection = op.get_bind()
+    jubilea = sa.table('jubilea', sa.column('id', sa.Integer), sa.column('jubileumdag', sa.String),
+                       sa.column('jubileumdag_datum', sa.Date), sa.column('jubileum_maanddag', sa.Integer))
+    for jubileum_id, jubileumdag in connection.execute(sa.select(jubilea.c.id, jubilea.c.jubileumdag)).all():
+        datum = parse_jubileumdag(jubileumdag)
+        connection.execute(
+            jubilea.update().where(jubilea.c.id == jubileum_id)
+            .values(jubileumdag_datum=datum, jubileum_maanddag=datum.month * 100 + datum.day)
+        )
+
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.drop_column('jubileumdag')
+
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.alter_column('jubileumdag_datum', new_column_name='jubileumdag',
+               existing_type=sa.Date(), nullable=False)
+
+    op.create_index(op.f('ix_jubilea_jubileumdag'), 'jubilea', ['jubileumdag'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jubilea_jubileumdag'))
+        batch_op.alter_column('jubileumdag',
+               existing_type=sa.Date(),
+               type_=sqlmodel.sql.sqltypes.AutoString(),
+               existing_nullable=False)
@@ -0,0 +1,44 @@
+"""Jubilea maanddag kolom met index
+
+Revision ID: 8c1e4a7d2f90
+Revises: 5b59f927bf44
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from datetime import date
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e4a7d2f90'
+down_revision: Union[str, None] = '5b59f927bf44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jubileum_maanddag', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_jubilea_jubileum_maanddag'), ['jubileum_maanddag'], unique=False)
+
+    # Bestaande jubilea vullen (MMDD van jubileumdag)
+    connection = op.get_bind()
+    jubilea = sa.table('jubilea', sa.column('id', sa.Integer), sa.column('jubileumdag', sa.String),
+                       sa.column('jubileum_maanddag', sa.Integer))
+    for jubileum_id, jubileumdag in connection.execute(sa.select(jubilea.c.id, jubilea.c.jubileumdag)).all():
+        try:
+            datum = date.fromisoformat(str(jubileumdag)[:10])
+        except ValueError:
+            continue  # Niet-ISO datums worden bij de omzetting naar DATE (3f6b9d0e1a24) gevuld
+        connection.execute(
+            jubilea.update().where(jubilea.c.id == jubileum_id).values(jubileum_maanddag=datum.month * 100 + datum.day)
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('jubilea', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jubilea_jubileum_maanddag'))
+        batch_op.drop_column('jubileum_maanddag')
@@ -0,0 +1,56 @@
+"""FTS5 zoekindex voor personen, families, jubilea en relatietypes
+
+Revision ID: a7d3c5e9b812
+Revises: b1e5d9f3c720
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3c5e9b812'
+down_revision: Union[str, None] = 'b1e5d9f3c720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Gelijk aan FTS_TABELLEN in app/hulpmiddelen/zoekindex.py op het moment van deze migratie
+FTS_TABELLEN = {
+    "personen":      ["voornaam", "achternaam"],
+    "families":      ["familienaam", "straatnaam", "postcode", "plaats"],
+    "jubilea":       ["jubileumnaam", "omschrijving"],
+    "jubileumtypes": ["naam"],
+    "relatietypes":  ["relatienaam"],
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for tabel, kolommen in FTS_TABELLEN.items():
+        fts = f"{tabel}_fts"
+        cols = ", ".join(kolommen)
+        new_cols = ", ".join(f"new.{c}" for c in kolommen)
+        old_cols = ", ".join(f"old.{c}" for c in kolommen)
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{tabel}', content_rowid='id', "
+                   f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabel} BEGIN "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabel} BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabel} BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END")
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for tabel in FTS_TABELLEN:
+        fts = f"{tabel}_fts"
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
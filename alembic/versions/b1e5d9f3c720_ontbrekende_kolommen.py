@@ -0,0 +1,55 @@
+"""Kolommen die wel in de modellen stonden maar nooit via een migratie zijn toegevoegd
+
+Revision ID: b1e5d9f3c720
+Revises: 3f6b9d0e1a24
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e5d9f3c720'
+down_revision: Union[str, None] = '3f6b9d0e1a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bestaande databases zijn meestal via create_all aangemaakt en hebben deze kolommen al;
+# alleen een database die vanaf de eerste migratie is opgebouwd mist ze. De FTS5 index
+# (volgende migratie) heeft jubilea.jubileumnaam nodig.
+KOLOMMEN = {
+    'personen': [
+        sa.Column('foto_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    ],
+    'jubilea': [
+        sa.Column('jubileumnaam', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default=''),
+        sa.Column('url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('foto_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    ],
+    'relatietypes': [
+        sa.Column('symmetrisch', sa.Boolean(), nullable=False, server_default=sa.false()),
+    ],
+}
+
+
+def _ontbrekend(tabel: str):
+    aanwezig = {kolom['name'] for kolom in sa.inspect(op.get_bind()).get_columns(tabel)}
+    return [kolom for kolom in KOLOMMEN[tabel] if kolom.name not in aanwezig]
+
+
+def upgrade() -> None:
+    for tabel in KOLOMMEN:
+        ontbrekend = _ontbrekend(tabel)
+        if ontbrekend:
+            with op.batch_alter_table(tabel, schema=None) as batch_op:
+                for kolom in ontbrekend:
+                    batch_op.add_column(kolom.copy())
+
+
+def downgrade() -> None:
+    # Niet terugdraaien: bij databases die de kolommen al hadden horen ze bij het oorspronkelijke schema
+    pass
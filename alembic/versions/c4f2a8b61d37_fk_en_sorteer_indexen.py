@@ -0,0 +1,52 @@
+"""Indexen op foreign keys, created_by en de sorteerkolommen van de lijstpagina's
+
+Revision ID: c4f2a8b61d37
+Revises: a7d3c5e9b812
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f2a8b61d37'
+down_revision: Union[str, None] = 'a7d3c5e9b812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Gelijk aan de index=True velden en __table_args__ in app/models/models.py op het moment van deze migratie
+INDEXEN = [
+    # Foreign keys: joins op de lijstpagina's en de relaties van een persoon
+    ('ix_relaties_persoon1_id',          'relaties',   ['persoon1_id']),
+    ('ix_relaties_persoon2_id',          'relaties',   ['persoon2_id']),
+    ('ix_relaties_relatietype_id',       'relaties',   ['relatietype_id']),
+    ('ix_personen_familie_id',           'personen',   ['familie_id']),
+    ('ix_jubilea_persoon_id',            'jubilea',    ['persoon_id']),
+    ('ix_jubilea_jubileumtype_id',       'jubilea',    ['jubileumtype_id']),
+    ('ix_gebruikers_rol_id',             'gebruikers', ['rol_id']),
+    # Eigenaar (owner_or_admin_required, admin/change-owner)
+    ('ix_families_created_by',           'families',   ['created_by']),
+    ('ix_personen_created_by',           'personen',   ['created_by']),
+    ('ix_jubilea_created_by',            'jubilea',    ['created_by']),
+    # Sorteerkolommen van de keyset paginering
+    ('ix_personen_achternaam_voornaam',  'personen',   ['achternaam', 'voornaam']),
+    ('ix_personen_voornaam',             'personen',   ['voornaam']),
+    ('ix_families_familienaam',          'families',   ['familienaam']),
+    ('ix_jubilea_jubileumnaam',          'jubilea',    ['jubileumnaam']),
+]
+
+
+def upgrade() -> None:
+    # if_not_exists: databases die met create_all (init_db) zijn aangemaakt kunnen ze al hebben
+    for naam, tabel, kolommen in INDEXEN:
+        op.create_index(naam, tabel, kolommen, unique=False, if_not_exists=True)
+    if op.get_bind().dialect.name == "sqlite":
+        # Statistieken voor de query planner, zodat de nieuwe indexen ook gekozen worden
+        op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    for naam, tabel, _ in reversed(INDEXEN):
+        op.drop_index(naam, table_name=tabel, if_exists=True)
@@ -0,0 +1,43 @@
+"""Relatietypes afstamming kolom (ouder/kind relaties voor voorouders en nakomelingen)
+
+Revision ID: d8b3e6f14a52
+Revises: c4f2a8b61d37
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3e6f14a52'
+down_revision: Union[str, None] = 'c4f2a8b61d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bestaande relatietypes met een eenduidige naam krijgen direct de juiste afstamming;
+# de rest is in te stellen via /relatietypes
+BEKENDE_NAMEN = {
+    'ouder': ['ouder van', 'is ouder van', 'vader van', 'is vader van', 'moeder van', 'is moeder van'],
+    'kind':  ['kind van', 'is kind van', 'zoon van', 'is zoon van', 'dochter van', 'is dochter van'],
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('relatietypes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('afstamming', sa.String(), nullable=True))
+
+    relatietypes = sa.table('relatietypes', sa.column('relatienaam', sa.String), sa.column('afstamming', sa.String))
+    for afstamming, namen in BEKENDE_NAMEN.items():
+        op.execute(
+            relatietypes.update()
+            .where(sa.func.lower(sa.func.trim(relatietypes.c.relatienaam)).in_(namen))
+            .values(afstamming=afstamming)
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('relatietypes', schema=None) as batch_op:
+        batch_op.drop_column('afstamming')
@@ -0,0 +1,55 @@
+"""Afleidingsregels en de gematerialiseerde tabel met afgeleide relaties
+
+Revision ID: e2a9c7f5b3d1
+Revises: d8b3e6f14a52
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c7f5b3d1'
+down_revision: Union[str, None] = 'd8b3e6f14a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('afleidingsregels',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('relatietype_id', sa.Integer(), nullable=False),
+    sa.Column('eerste_type_id', sa.Integer(), nullable=False),
+    sa.Column('eerste_omgekeerd', sa.Boolean(), nullable=False),
+    sa.Column('tweede_type_id', sa.Integer(), nullable=False),
+    sa.Column('tweede_omgekeerd', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['relatietype_id'], ['relatietypes.id'], ),
+    sa.ForeignKeyConstraint(['eerste_type_id'], ['relatietypes.id'], ),
+    sa.ForeignKeyConstraint(['tweede_type_id'], ['relatietypes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_afleidingsregels_relatietype_id'), 'afleidingsregels', ['relatietype_id'], unique=False)
+
+    # Zonder regels is er nog niets af te leiden; de tabel wordt gevuld zodra er regels zijn
+    op.create_table('afgeleiderelaties',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('persoon1_id', sa.Integer(), nullable=False),
+    sa.Column('persoon2_id', sa.Integer(), nullable=False),
+    sa.Column('relatietype_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['persoon1_id'], ['personen.id'], ),
+    sa.ForeignKeyConstraint(['persoon2_id'], ['personen.id'], ),
+    sa.ForeignKeyConstraint(['relatietype_id'], ['relatietypes.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('persoon1_id', 'relatietype_id', 'persoon2_id', name='uq_afgeleiderelaties_persoon1_type_persoon2')
+    )
+    op.create_index('ix_afgeleiderelaties_persoon2_type_persoon1', 'afgeleiderelaties', ['persoon2_id', 'relatietype_id', 'persoon1_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_afgeleiderelaties_persoon2_type_persoon1', table_name='afgeleiderelaties')
+    op.drop_table('afgeleiderelaties')
+    op.drop_index(op.f('ix_afleidingsregels_relatietype_id'), table_name='afleidingsregels')
+    op.drop_table('afleidingsregels')
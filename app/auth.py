@@ -6,8 +6,11 @@ from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 from .logging_config import app_logger, log_info, log_debug
 from functools import wraps
-from sqlmodel import Session, select
-from .database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import joinedload
+from .database import get_write_session, new_write_session
+from .hulpmiddelen.sjablonen import configure_templates
 from .models.models import Gebruikers
 from datetime import datetime
 from config import get_settings
@@ -31,7 +34,7 @@ oauth.register(
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 
 @router.get('/login')
 async def login(request: Request):
@@ -39,23 +42,23 @@ async def login(request: Request):
     return await oauth.google.authorize_redirect(request, redirect_uri)
     
 @router.get('/auth')
-async def auth(request: Request, session: Session = Depends(get_session)):
+async def auth(request: Request, session: AsyncSession = Depends(get_write_session)):
     token = await oauth.google.authorize_access_token(request)
-    log_debug(f"[Auth] Received token: {token}")
+    log_debug("[Auth] Received token: %s", token)
 
     user_info = token.get('userinfo')
     if user_info:
         email = user_info['email']
         google_id = user_info['sub']
-        log_debug(f"[Auth] User info from token: {user_info}")
+        log_debug("[Auth] User info from token: %s", user_info)
         
-        db_user = session.exec(select(Gebruikers).where(Gebruikers.email == email)).first()  # Zoek de gebruiker in de database
+        db_user = (await session.exec(select(Gebruikers).where(Gebruikers.email == email).options(joinedload(Gebruikers.rol)))).first()  # Zoek de gebruiker in de database
         if db_user:
-            app_logger.debug(f"[Auth] User gevonden in database: {db_user}")
+            app_logger.debug("[Auth] User gevonden in database: %s", db_user)
             db_user.last_login = datetime.utcnow()  # Update last_login en Google-ID
             db_user.google_id = google_id
             session.add(db_user)
-            session.commit()
+            await session.commit()
             
             request.session['user'] = {    # Sla relevante informatie op in de sessie
                 'id': db_user.id,
@@ -64,13 +67,13 @@ async def auth(request: Request, session: Session = Depends(get_session)):
                 'role': db_user.rol.naam,
                 'google_id': db_user.google_id
             }
-            app_logger.debug(f"[Auth] User logged in: {request.session['user'].get('email', 'Unknown')}")
-            app_logger.debug(f"[Auth] Session after setting user: {request.session}")
+            app_logger.debug("[Auth] User logged in: %s", request.session['user'].get('email', 'Unknown'))
+            app_logger.debug("[Auth] Session after setting user: %s", request.session)
             return RedirectResponse(url='/home', status_code=303)
 
         else:
             # Als de gebruiker niet bestaat, stuur ze naar een "niet geautoriseerd" pagina
-            app_logger.debug(f"User NIET gevonden in database: {db_user}")
+            app_logger.debug("User NIET gevonden in database: %s", db_user)
             return RedirectResponse(url=f'/?error=not_authorized&email={email}', status_code=303)
         
     else:
@@ -78,12 +81,12 @@ async def auth(request: Request, session: Session = Depends(get_session)):
 
 @router.get('/logout')
 async def logout(request: Request):
-    log_debug(f"[AUTH] handling logout...")
+    log_debug("[AUTH] handling logout...")
     user = request.session.get('user')
     if user:
-        app_logger.info(f"User logged out: {user.get('email', 'Unknown')}")
+        app_logger.info("User logged out: %s", user.get('email', 'Unknown'))
     request.session.pop('user', None)
-    log_debug(f"[AUTH] Session after logout: {request.session}")
+    log_debug("[AUTH] Session after logout: %s", request.session)
     return RedirectResponse(url='/')
 
 def login_required(func):
@@ -103,7 +106,7 @@ def login_required(func):
         if request is None:
             raise HTTPException(status_code=500, detail="Request object not found")
             
-        log_debug(f"[AUTH] Login required - Checking login for route: {request.url.path}")
+        log_debug("[AUTH] Login required - Checking login for route: %s", request.url.path)
         if 'user' not in request.session:
             log_debug("[AUTH] Login Required - No User found in session, redirecting to login")
             raise HTTPException(status_code=303, detail="Not authenticated", headers={"Location": "/login"})
@@ -115,11 +118,11 @@ def role_required(allowed_roles: Union[str, List[str]]):
     def decorator(func):
         @wraps(func)
         async def wrapper(request, *args, **kwargs):
-            log_debug(f"[AUTH] Role required - Checking role for route: {request.url.path}")
+            log_debug("[AUTH] Role required - Checking role for route: %s", request.url.path)
             user = request.session.get('user')
-            log_debug(f"[AUTH] Role Required - User in session: {user}")
+            log_debug("[AUTH] Role Required - User in session: %s", user)
             if not user:
-                log_debug(f"[AUTH] Role Required - No User found in session")
+                log_debug("[AUTH] Role Required - No User found in session")
                 raise HTTPException(status_code=303, detail="Not authenticated", headers={"Location": "/login"})
             
             user_role = user.get('role')
@@ -130,12 +133,12 @@ def role_required(allowed_roles: Union[str, List[str]]):
                 allowed_roles_list = allowed_roles
             
             if user_role not in allowed_roles_list:
-                log_debug(f"[AUTH] Role Required - Role is not allowed...")
+                log_debug("[AUTH] Role Required - Role is not allowed...")
                 response = RedirectResponse(url="/", status_code=302)
                 response.set_cookie(key="auth_error", value="Je bent niet geautoriseerd voor deze actie", max_age=30)
                 return response
             
-            log_debug(f"[AUTH] Role Required - Role is allowed!")
+            log_debug("[AUTH] Role Required - Role is allowed!")
             return await func(request, *args, **kwargs)
         return wrapper
     return decorator
@@ -151,13 +154,18 @@ def owner_or_admin_required(model):
         @wraps(func)
         async def wrapper(request: Request, *args, **kwargs):
             current_user = get_current_user(request)
-            session = next(get_session())
             
             id_param = next((value for key, value in kwargs.items() if key.endswith('_id')), None)
             if id_param is None:
                 raise HTTPException(status_code=400, detail="Er is een probleem opgetreden bij het identificeren van het record.")
             
-            item = session.get(model, id_param)
+            # De sessie van de route zelf gebruiken als die er is, anders een eigen (korte) sessie
+            session = kwargs.get('session')
+            if session is not None:
+                item = await session.get(model, id_param)
+            else:
+                async with new_write_session() as eigen_sessie:
+                    item = await eigen_sessie.get(model, id_param)
             
             if not item:
                 raise HTTPException(status_code=404, detail=f"Het gevraagde {model.__name__.lower()} record kon niet worden gevonden.")
@@ -1,19 +1,168 @@
 from sqlmodel import SQLModel, create_engine, Session
-from config import get_settings
-from .logging_config import app_logger
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from config import get_settings, Settings
+from .logging_config import app_logger, log_info
+from .hulpmiddelen import zoekindex  # registreert de FTS5 zoekindex bij create_all
+from .hulpmiddelen.metrics import instrument_engine
+from .hulpmiddelen.slowquery import install_slow_query_log
 
 settings = get_settings()
 
 DATABASE_URL = settings.DATABASE_URL
 
-# Engine aanmaken
-engine = create_engine(DATABASE_URL, echo=False) #echo=settings.DEVELOPMENT)
+# Async drivers per database; de sync URL blijft de bron (alembic, init_db en scripts gebruiken die)
+ASYNC_DRIVERS = {
+    "sqlite":     "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """Leidt de async URL af uit de sync URL, bv. sqlite:///x.db -> sqlite+aiosqlite:///x.db"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"Geen async driver bekend voor database '{dialect}'")
+    return f"{ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+
+# Pragmas die op elke nieuwe SQLite connectie gezet worden, in deze volgorde.
+# busy_timeout eerst: het omzetten naar WAL heeft zelf ook een lock nodig.
+def sqlite_pragmas(settings: Settings, read_only: bool = False) -> dict:
+    pragmas = {
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous":  settings.SQLITE_SYNCHRONOUS,
+        "cache_size":   settings.SQLITE_CACHE_SIZE,
+        "mmap_size":    settings.SQLITE_MMAP_SIZE,
+        "temp_store":   settings.SQLITE_TEMP_STORE,
+    }
+    if read_only:
+        # Leesverbinding: de journal mode wordt door de schrijvende engine gezet
+        del pragmas["journal_mode"]
+        pragmas["query_only"] = 1
+    return pragmas
+
+def _is_file_db(url) -> bool:
+    url = make_url(url)
+    return url.database not in (None, "", ":memory:") and url.query.get("mode") != "memory"
+
+def _engine_kwargs(url, settings: Settings, pool_class) -> dict:
+    kwargs = {"echo": False} #echo=settings.DEVELOPMENT
+    # In-memory SQLite houdt één vaste connectie aan; een pool heeft daar geen zin
+    if make_url(url).get_backend_name() != "sqlite" or _is_file_db(url):
+        kwargs.update(
+            poolclass=pool_class,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=False,
+        )
+    return kwargs
+
+def _install_pragmas(sync_engine, settings: Settings, read_only: bool = False):
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(settings, read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for naam, waarde in pragmas.items():
+                cursor.execute(f"PRAGMA {naam} = {waarde}")
+        finally:
+            cursor.close()
+
+def _install_instrumentatie(sync_engine, settings: Settings):
+    instrument_engine(sync_engine)
+    if settings.SLOW_QUERY_MS is not None:
+        install_slow_query_log(sync_engine, settings.SLOW_QUERY_MS, settings.SLOW_QUERY_EXPLAIN)
+
+def create_db_engine(url: str, settings: Settings, read_only: bool = False):
+    """Sync engine met pool-instellingen en SQLite pragmas uit de settings."""
+    engine = create_engine(url, **_engine_kwargs(url, settings, QueuePool))
+    _install_pragmas(engine, settings, read_only)
+    _install_instrumentatie(engine, settings)
+    return engine
+
+def create_async_db_engine(url: str, settings: Settings, read_only: bool = False) -> AsyncEngine:
+    """Async engine met dezelfde instellingen; de pragmas gaan via de onderliggende sync engine."""
+    engine = create_async_engine(url, **_engine_kwargs(url, settings, AsyncAdaptedQueuePool))
+    _install_pragmas(engine.sync_engine, settings, read_only)
+    _install_instrumentatie(engine.sync_engine, settings)
+    return engine
+
+def create_async_read_engine(settings: Settings, write_engine: AsyncEngine) -> AsyncEngine:
+    """Engine voor zware leespagina's.
+
+    - DATABASE_READ_URL gezet: een read replica (eigen engine en pool).
+    - Anders, bij SQLite met SQLITE_READ_ONLY: een eigen pool op hetzelfde bestand met query_only,
+      zodat lezers (dankzij WAL) naast de schrijver draaien zonder een schrijfverbinding te bezetten.
+    - Anders: dezelfde engine als voor schrijven."""
+    if settings.DATABASE_READ_URL:
+        return create_async_db_engine(async_database_url(settings.DATABASE_READ_URL), settings, read_only=True)
+    if write_engine.dialect.name == "sqlite" and settings.SQLITE_READ_ONLY and _is_file_db(write_engine.url):
+        return create_async_db_engine(write_engine.url, settings, read_only=True)
+    return write_engine
+
+def _effective_settings(connection) -> dict:
+    if connection.dialect.name != "sqlite":
+        return {}
+    return {
+        naam: connection.exec_driver_sql(f"PRAGMA {naam}").scalar()
+        for naam in ("query_only", *sqlite_pragmas(settings))
+    }
+
+async def log_engine_settings():
+    """Logt per engine de daadwerkelijk actieve pragmas en pool-instellingen (bij het opstarten)."""
+    engines = {"schrijven": async_engine}
+    if read_engine is not async_engine:
+        engines["lezen"] = read_engine
+    resultaat = {}
+    for rol, eng in engines.items():
+        async with eng.connect() as connection:
+            pragmas = await connection.run_sync(_effective_settings)
+        log_info("[Database] %s: %s - pool: %s %s - pragmas: %s", rol, eng.url.render_as_string(hide_password=True),
+                 type(eng.pool).__name__, eng.pool.status(), pragmas)
+        resultaat[rol] = pragmas
+    return resultaat
+
+# Engines aanmaken
+engine       = create_db_engine(DATABASE_URL, settings)
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL, settings)
+read_engine  = create_async_read_engine(settings, async_engine)
 
 # Functie om de database tabellen aan te maken
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
-# Functie om een database sessie te krijgen
+# Functie om een (sync) database sessie te krijgen, voor scripts en tests
 def get_session():
     with Session(engine) as session:    
-        yield session
\ No newline at end of file
+        yield session
+
+# Functies om een async database sessie te krijgen, voor de routes.
+# expire_on_commit=False: na een commit mogen attributen niet opnieuw (impliciet) geladen
+# worden, want lazy loading buiten een await om werkt niet met een AsyncSession.
+# Relaties die een template nodig heeft moeten daarom altijd expliciet geladen worden.
+def new_write_session() -> AsyncSession:
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+def new_read_session() -> AsyncSession:
+    return AsyncSession(read_engine, expire_on_commit=False)
+
+# Voor routes die schrijven, en voor formulieren die direct na een wijziging getoond worden
+async def get_write_session():
+    async with new_write_session() as session:
+        yield session
+
+# Voor zware leespagina's (home, lijsten, zoeken); kan achterlopen op een replica
+async def get_read_session():
+    async with new_read_session() as session:
+        yield session
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import re
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+# Pure beeldbewerking voor geüploade foto's. Deze module draait in de worker processen van
+# de fotoverwerking en importeert daarom bewust niets uit de rest van de applicatie.
+#
+# Elke foto wordt opgeslagen in meerdere formaten, als JPEG en als WebP, onder een naam
+# op basis van de inhoud: {hash}_{maat}.{jpg|webp}. Dezelfde foto twee keer uploaden levert
+# dus dezelfde bestanden op, en een gewijzigde foto krijgt altijd een nieuwe naam.
+#
+# Het aantal pixels wordt uit de header gelezen en gecontroleerd vóórdat er iets gedecodeerd
+# wordt (bescherming tegen 'decompression bombs'). Grote JPEG's worden met draft mode direct
+# op een lagere schaal gedecodeerd, zodat een foto van 4000x3000 niet volledig in het geheugen komt.
+
+FOTO_MATEN     = (64, 256, 1024)
+GROOTSTE_MAAT  = max(FOTO_MATEN)
+FORMATEN       = {"jpg": "JPEG", "webp": "WEBP"}
+JPEG_KWALITEIT = 85
+WEBP_KWALITEIT = 80
+
+HASH_LENGTE = 16
+_VARIANT_NAAM = re.compile(rf"^(?P<hash>[0-9a-f]{{{HASH_LENGTE}}})_(?P<maat>\d+)\.(?P<ext>jpg|webp)$")
+
+class FotoTeGroot(ValueError):
+    pass
+
+def controleer_afmetingen(img: Image.Image, max_pixels: Optional[int]):
+    """Weigert een (nog niet gedecodeerde) afbeelding met meer dan `max_pixels` pixels."""
+    breedte, hoogte = img.size
+    if max_pixels and breedte * hoogte > max_pixels:
+        raise FotoTeGroot(f"Foto van {breedte}x{hoogte} pixels is te groot (maximaal {max_pixels} pixels)")
+
+def inhoud_hash(pad: str) -> str:
+    h = hashlib.sha256()
+    with open(pad, "rb") as bestand:
+        for blok in iter(lambda: bestand.read(1024 * 1024), b""):
+            h.update(blok)
+    return h.hexdigest()[:HASH_LENGTE]
+
+def variant_naam(foto_hash: str, maat: int, ext: str = "jpg") -> str:
+    return f"{foto_hash}_{maat}.{ext}"
+
+def parse_variant_naam(bestandsnaam: str) -> Optional[str]:
+    """Geeft de hash als `bestandsnaam` een foto-variant is, anders None (bv. oude foto's)."""
+    match = _VARIANT_NAAM.match(bestandsnaam)
+    return match.group("hash") if match else None
+
+def _bewaar(img: Image.Image, doel: str, formaat: str):
+    # Uniek per proces: dezelfde foto kan tegelijk door twee workers verwerkt worden
+    tijdelijk = f"{doel}.{os.getpid()}.tmp"
+    if formaat == "JPEG":
+        img.save(tijdelijk, format=formaat, optimize=True, quality=JPEG_KWALITEIT, progressive=True)
+    else:
+        img.save(tijdelijk, format=formaat, quality=WEBP_KWALITEIT, method=4)
+    os.replace(tijdelijk, doel)
+
+def maak_varianten(bron: str, doelmap: str, max_pixels: Optional[int] = None) -> str:
+    """Maakt alle formaten van de foto in `bron` aan in `doelmap` en geeft de hash terug.
+    Er wordt steeds via een tijdelijk bestand geschreven, zodat een variant nooit half bestaat."""
+    foto_hash = inhoud_hash(bron)
+    if all(os.path.exists(os.path.join(doelmap, variant_naam(foto_hash, maat, ext)))
+           for maat in FOTO_MATEN for ext in FORMATEN):
+        return foto_hash
+
+    with Image.open(bron) as origineel:
+        controleer_afmetingen(origineel, max_pixels)
+        # Alleen JPEG: decodeer op de kleinste schaal (1/2, 1/4, 1/8) die nog minstens de grootste maat is
+        origineel.draft("RGB", (GROOTSTE_MAAT, GROOTSTE_MAAT))
+        img = ImageOps.exif_transpose(origineel)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        # Van groot naar klein, zodat elke stap vanaf de vorige (kleinere) versie rekent
+        for maat in sorted(FOTO_MATEN, reverse=True):
+            img.thumbnail((maat, maat))
+            for ext, formaat in FORMATEN.items():
+                _bewaar(img, os.path.join(doelmap, variant_naam(foto_hash, maat, ext)), formaat)
+    return foto_hash
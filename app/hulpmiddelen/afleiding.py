@@ -0,0 +1,271 @@
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, delete, insert, or_, tuple_, union_all
+from sqlmodel import select
+
+from ..models.models import Personen, Relaties, Relatietypes, Afleidingsregels, AfgeleideRelaties
+from ..logging_config import log_info
+
+# Afgeleide relaties (grootouder, broer/zus, neef, schoonouder, ...) als gematerialiseerde tabel.
+#
+# Een afleidingsregel hoort bij het afgeleide relatietype en combineert twee relaties:
+#   A -eerste-> X -tweede-> B  geeft  A -relatietype-> B
+# Bijvoorbeeld "is grootouder van" = "is ouder van" + "is ouder van", of
+# "is broer/zus van" = "is ouder van" (omgekeerd) + "is ouder van". Regels mogen ook afgeleide
+# relaties gebruiken (neef = ouder omgekeerd + oom/tante), dus afleiden gaat door tot er niets
+# nieuws meer bij komt.
+#
+# AfgeleideRelaties bevat alle relaties die uit de regels volgen; "alle kleinkinderen van X" is
+# daardoor één index range scan. De tabel wordt bijgewerkt in dezelfde transactie als de wijziging
+# in Relaties (verwerk_relatie_wijziging):
+# - toevoegen: alleen de gevolgen van de nieuwe relatie worden afgeleid (semi-naïef);
+# - verwijderen: eerst alles weghalen wat (mogelijk) van de relatie afhing, daarna opnieuw
+#   toevoegen wat langs een andere weg nog steeds volgt (delete and rederive).
+# Na een wijziging van de regels of van een relatietype wordt alles opnieuw berekend
+# (herbereken_afgeleide_relaties).
+
+Feit = Tuple[int, int, int]  # (persoon1_id, persoon2_id, relatietype_id)
+
+BATCH = 500  # feiten per IN (...) of INSERT
+
+class Regel(NamedTuple):
+    resultaat: int
+    eerste: int
+    eerste_omgekeerd: bool
+    tweede: int
+    tweede_omgekeerd: bool
+
+class Regels:
+    def __init__(self, regels: Iterable[Regel], symmetrisch: Set[int]):
+        self.regels = list(regels)
+        self.symmetrisch = symmetrisch
+        self.per_eerste: Dict[int, List[Regel]] = defaultdict(list)
+        self.per_tweede: Dict[int, List[Regel]] = defaultdict(list)
+        self.per_resultaat: Dict[int, List[Regel]] = defaultdict(list)
+        for regel in self.regels:
+            self.per_eerste[regel.eerste].append(regel)
+            self.per_tweede[regel.tweede].append(regel)
+            self.per_resultaat[regel.resultaat].append(regel)
+
+    def __bool__(self):
+        return bool(self.regels)
+
+    def normaliseer(self, feit: Feit) -> Feit:
+        """Symmetrische relaties één keer, met de laagste persoon id eerst."""
+        persoon1, persoon2, relatietype = feit
+        if relatietype in self.symmetrisch and persoon1 > persoon2:
+            return persoon2, persoon1, relatietype
+        return feit
+
+    def richtingen(self, feit: Feit):
+        """De (van, naar) paren waarin een feit gelezen mag worden."""
+        persoon1, persoon2, relatietype = feit
+        if relatietype in self.symmetrisch and persoon1 != persoon2:
+            return ((persoon1, persoon2), (persoon2, persoon1))
+        return ((persoon1, persoon2),)
+
+def laad_regels(connection) -> Regels:
+    regels = [
+        Regel(*rij) for rij in connection.execute(select(
+            Afleidingsregels.relatietype_id,
+            Afleidingsregels.eerste_type_id, Afleidingsregels.eerste_omgekeerd,
+            Afleidingsregels.tweede_type_id, Afleidingsregels.tweede_omgekeerd,
+        ))
+    ]
+    symmetrisch = set(connection.execute(select(Relatietypes.id).where(Relatietypes.symmetrisch)).scalars())
+    return Regels(regels, symmetrisch)
+
+class _DatabaseFeiten:
+    """Relaties plus afgeleide relaties in de database; `erbij` geldt als extra aanwezig
+    (de zojuist verwijderde relatie, zolang haar gevolgen worden opgezocht)."""
+
+    def __init__(self, connection, regels: Regels):
+        self.connection = connection
+        self.regels = regels
+        self.erbij: Set[Feit] = set()
+
+    def stappen(self, persoon: int, relatietype: int, omgekeerd: bool) -> Set[int]:
+        """Alle X met persoon -relatietype-> X (of X -relatietype-> persoon als omgekeerd)."""
+        richtingen = (False, True) if relatietype in self.regels.symmetrisch else (omgekeerd,)
+        delen = []
+        for tabel in (Relaties, AfgeleideRelaties):
+            for andersom in richtingen:
+                van, naar = (tabel.persoon2_id, tabel.persoon1_id) if andersom else (tabel.persoon1_id, tabel.persoon2_id)
+                delen.append(select(naar).where(van == persoon, tabel.relatietype_id == relatietype))
+        uitkomst = set(self.connection.execute(union_all(*delen)).scalars())
+        for persoon1, persoon2, soort in self.erbij:
+            if soort != relatietype:
+                continue
+            for andersom in richtingen:
+                van, naar = (persoon2, persoon1) if andersom else (persoon1, persoon2)
+                if van == persoon:
+                    uitkomst.add(naar)
+        return uitkomst
+
+    def in_relaties(self, feit: Feit) -> bool:
+        """Staat het feit (nog) als gewone relatie in Relaties? Een rij in AfgeleideRelaties telt
+        niet: die kan bij een recursieve regel juist op dit feit steunen."""
+        persoon1, persoon2, relatietype = feit
+        voorwaarde = and_(Relaties.persoon1_id == persoon1, Relaties.persoon2_id == persoon2)
+        if relatietype in self.regels.symmetrisch:
+            voorwaarde = or_(voorwaarde, and_(Relaties.persoon1_id == persoon2, Relaties.persoon2_id == persoon1))
+        basis = select(Relaties.id).where(voorwaarde, Relaties.relatietype_id == relatietype).limit(1)
+        return self.connection.execute(basis).first() is not None
+
+    def afgeleid(self, feiten: Iterable[Feit]) -> Set[Feit]:
+        """De feiten die al in AfgeleideRelaties staan."""
+        feiten = list(feiten)
+        aanwezig = set()
+        sleutel = tuple_(AfgeleideRelaties.persoon1_id, AfgeleideRelaties.persoon2_id, AfgeleideRelaties.relatietype_id)
+        for begin in range(0, len(feiten), BATCH):
+            query = select(AfgeleideRelaties.persoon1_id, AfgeleideRelaties.persoon2_id, AfgeleideRelaties.relatietype_id).where(
+                sleutel.in_(feiten[begin:begin + BATCH])
+            )
+            aanwezig.update(tuple(rij) for rij in self.connection.execute(query))
+        return aanwezig
+
+    def voeg_toe(self, feiten: Set[Feit]):
+        _schrijf(self.connection, feiten)
+
+    def verwijder(self, feiten: Set[Feit]):
+        feiten = list(feiten)
+        sleutel = tuple_(AfgeleideRelaties.persoon1_id, AfgeleideRelaties.persoon2_id, AfgeleideRelaties.relatietype_id)
+        for begin in range(0, len(feiten), BATCH):
+            self.connection.execute(delete(AfgeleideRelaties).where(sleutel.in_(feiten[begin:begin + BATCH])))
+
+class _GeheugenFeiten:
+    """Dezelfde opvragingen als _DatabaseFeiten, voor het volledig herberekenen in het geheugen."""
+
+    def __init__(self, regels: Regels, feiten: Iterable[Feit]):
+        self.regels = regels
+        self.uit: Dict[Tuple[int, int], Set[int]] = defaultdict(set)  # (persoon1, type) -> persoon2
+        self.in_: Dict[Tuple[int, int], Set[int]] = defaultdict(set)  # (persoon2, type) -> persoon1
+        self.voeg_toe(feiten)
+
+    def voeg_toe(self, feiten: Iterable[Feit]):
+        for persoon1, persoon2, relatietype in feiten:
+            self.uit[(persoon1, relatietype)].add(persoon2)
+            self.in_[(persoon2, relatietype)].add(persoon1)
+
+    def stappen(self, persoon: int, relatietype: int, omgekeerd: bool) -> Set[int]:
+        if relatietype in self.regels.symmetrisch:
+            return self.uit.get((persoon, relatietype), set()) | self.in_.get((persoon, relatietype), set())
+        return (self.in_ if omgekeerd else self.uit).get((persoon, relatietype), set())
+
+def _afleiden(feit: Feit, feiten, regels: Regels):
+    """Alle feiten die met één regel volgen uit `feit` (als eerste of als tweede stap) en de andere feiten."""
+    relatietype = feit[2]
+    for x, y in regels.richtingen(feit):
+        for regel in regels.per_eerste.get(relatietype, ()):
+            # feit is A -eerste-> X
+            a, tussen = (y, x) if regel.eerste_omgekeerd else (x, y)
+            for b in feiten.stappen(tussen, regel.tweede, regel.tweede_omgekeerd):
+                if a != b:
+                    yield regels.normaliseer((a, b, regel.resultaat))
+        for regel in regels.per_tweede.get(relatietype, ()):
+            # feit is X -tweede-> B
+            tussen, b = (y, x) if regel.tweede_omgekeerd else (x, y)
+            for a in feiten.stappen(tussen, regel.eerste, not regel.eerste_omgekeerd):
+                if a != b:
+                    yield regels.normaliseer((a, b, regel.resultaat))
+
+def _afleidbaar(feit: Feit, feiten, regels: Regels) -> bool:
+    """Volgt het feit met één regel uit de huidige feiten?"""
+    for a, b in regels.richtingen(feit):
+        for regel in regels.per_resultaat.get(feit[2], ()):
+            links = feiten.stappen(a, regel.eerste, regel.eerste_omgekeerd)
+            if links and links & feiten.stappen(b, regel.tweede, not regel.tweede_omgekeerd):
+                return True
+    return False
+
+def _propageer(feiten: _DatabaseFeiten, regels: Regels, delta: Set[Feit]) -> int:
+    """Voegt de gevolgen van de feiten in delta toe, en daarvan weer de gevolgen, enz."""
+    totaal = 0
+    while delta:
+        gevolgen = {gevolg for feit in delta for gevolg in _afleiden(feit, feiten, regels)}
+        delta = gevolgen - feiten.afgeleid(gevolgen)
+        feiten.voeg_toe(delta)
+        totaal += len(delta)
+    return totaal
+
+def _verwijder(feiten: _DatabaseFeiten, regels: Regels, feit: Feit):
+    if feiten.in_relaties(feit):
+        return  # nog een relatie met dezelfde personen en hetzelfde type
+    # 1. Alles wat (mogelijk) van het feit afhangt, zolang het feit er nog als 'erbij' is
+    feiten.erbij = {feit}
+    weg = {feit}
+    delta = {feit}
+    while delta:
+        gevolgen = {gevolg for f in delta for gevolg in _afleiden(f, feiten, regels)} - weg
+        delta = feiten.afgeleid(gevolgen)
+        weg |= delta
+    feiten.erbij = set()
+    # Het feit zelf kan ook afgeleid zijn (bv. T = T + T): die rij gaat mee en komt in stap 2
+    # alleen terug als het zonder de verwijderde relatie nog volgt
+    afgeleid = (weg - {feit}) | feiten.afgeleid([feit])
+    feiten.verwijder(afgeleid)
+    # 2. Wat langs een andere weg nog steeds volgt, komt terug (met zijn gevolgen)
+    herstel = {f for f in afgeleid if _afleidbaar(f, feiten, regels)}
+    feiten.voeg_toe(herstel)
+    _propageer(feiten, regels, herstel)
+
+def verwerk_relatie_wijziging(session, oud: Optional[Feit], nieuw: Optional[Feit]):
+    """Werkt AfgeleideRelaties bij na het toevoegen (oud None), wijzigen of verwijderen (nieuw None) van
+    een relatie. Aanroepen na een flush en vóór de commit, via AsyncSession.run_sync."""
+    if oud == nieuw:
+        return
+    connection = session.connection()
+    regels = laad_regels(connection)
+    if not regels:
+        return
+    feiten = _DatabaseFeiten(connection, regels)
+    if oud is not None:
+        _verwijder(feiten, regels, regels.normaliseer(oud))
+    if nieuw is not None:
+        _propageer(feiten, regels, {regels.normaliseer(nieuw)})
+
+def herbereken_afgeleide_relaties(session) -> int:
+    """Berekent AfgeleideRelaties opnieuw uit alle relaties (na een wijziging van de regels of relatietypes)."""
+    start = time.perf_counter()
+    connection = session.connection()
+    regels = laad_regels(connection)
+    connection.execute(delete(AfgeleideRelaties))
+    if not regels:
+        return 0
+    basis = {regels.normaliseer(tuple(rij)) for rij in connection.execute(
+        select(Relaties.persoon1_id, Relaties.persoon2_id, Relaties.relatietype_id)
+    )}
+    feiten = _GeheugenFeiten(regels, basis)
+    afgeleid: Set[Feit] = set()
+    delta = basis
+    while delta:
+        delta = {gevolg for feit in delta for gevolg in _afleiden(feit, feiten, regels)} - afgeleid
+        afgeleid |= delta
+        feiten.voeg_toe(delta)
+    _schrijf(connection, afgeleid)
+    log_info("[Afleiding] %s afgeleide relaties berekend uit %s relaties in %.0f ms",
+             len(afgeleid), len(basis), (time.perf_counter() - start) * 1000)
+    return len(afgeleid)
+
+def _schrijf(connection, feiten: Iterable[Feit]):
+    rijen = [{"persoon1_id": p1, "persoon2_id": p2, "relatietype_id": t} for p1, p2, t in feiten]
+    for begin in range(0, len(rijen), BATCH):
+        connection.execute(insert(AfgeleideRelaties), rijen[begin:begin + BATCH])
+
+def feit(relatie: Relaties) -> Feit:
+    return relatie.persoon1_id, relatie.persoon2_id, relatie.relatietype_id
+
+def afgeleide_relaties_query(persoon_id: int):
+    """(Relatietypes, Personen) van de afgeleide relaties van een persoon: waar de persoon persoon1 is,
+    en bij symmetrische relatietypes ook persoon2 (zelfde regel als de gewone relaties op de detailpagina)."""
+    ander = case((AfgeleideRelaties.persoon1_id == persoon_id, AfgeleideRelaties.persoon2_id), else_=AfgeleideRelaties.persoon1_id)
+    return select(Relatietypes, Personen).select_from(AfgeleideRelaties).join(
+        Relatietypes, AfgeleideRelaties.relatietype_id == Relatietypes.id
+    ).join(
+        Personen, Personen.id == ander
+    ).where(or_(
+        AfgeleideRelaties.persoon1_id == persoon_id,
+        and_(AfgeleideRelaties.persoon2_id == persoon_id, Relatietypes.symmetrisch),
+    )).order_by(Relatietypes.relatienaam, Personen.achternaam, Personen.voornaam, Personen.id)
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Eenvoudige in-process caches voor berekende gegevens die voor alle gebruikers gelijk zijn.
+# Routes die data wijzigen roepen invalidate_caches() aan met de namen van de caches
+# die daardoor verouderd raken.
+#
+# Elke cache heeft een maximaal aantal entries (least recently used eruit): de zoekcache krijgt
+# bij elke toetsaanslag een nieuwe sleutel, en zou zonder grens tussen twee wijzigingen in blijven
+# groeien. Verlopen entries worden opgeruimd zodra de cache vol is.
+
+MAX_ENTRIES = 1000
+
+class TTLCache:
+    def __init__(self, naam: str, ttl: float, max_entries: int = MAX_ENTRIES):
+        self.naam   = naam
+        self.ttl    = ttl
+        self.max_entries = max_entries
+        self.hits   = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generatie = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable):
+        """Geeft (True, waarde) bij een geldige entry, anders (False, generatie)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, self._generatie
+
+    def _store(self, key: Hashable, generatie: int, value: Any):
+        with self._lock:
+            # Niet bewaren als er tijdens het berekenen een wijziging is geweest
+            if generatie == self._generatie:
+                now = time.monotonic()
+                self._data[key] = (now + self.ttl, value)
+                self._data.move_to_end(key)
+                if len(self._data) > self.max_entries:
+                    self._ruim_op(now)
+
+    def _ruim_op(self, now: float):
+        """Verlopen entries weg, en daarna zo nodig de minst recent gebruikte (onder de lock)."""
+        for key in [key for key, (verloopt, _) in self._data.items() if verloopt <= now]:
+            del self._data[key]
+            self.evictions += 1
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        gevonden, waarde = self._lookup(key)
+        if gevonden:
+            return waarde
+        value = compute()
+        self._store(key, waarde, value)
+        return value
+
+    async def get_or_compute_async(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Als get_or_compute, maar `compute` levert een coroutine (bv. een query via een AsyncSession)."""
+        gevonden, waarde = self._lookup(key)
+        if gevonden:
+            return waarde
+        value = await compute()
+        self._store(key, waarde, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._generatie += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+_caches: Dict[str, TTLCache] = {}
+
+def get_cache(naam: str, ttl: float, max_entries: int = MAX_ENTRIES) -> TTLCache:
+    if naam not in _caches:
+        _caches[naam] = TTLCache(naam, ttl, max_entries)
+    return _caches[naam]
+
+def invalidate_caches(*namen: str):
+    for naam in namen:
+        cache = _caches.get(naam)
+        if cache is not None:
+            cache.invalidate()
+
+def cache_stats() -> dict:
+    return {naam: cache.stats() for naam, cache in _caches.items()}
+
+# Namen van de gedeelde caches
+UPCOMING_EVENTS = "upcoming_events"
+SEARCH          = "search"
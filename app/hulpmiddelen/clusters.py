@@ -0,0 +1,187 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from ..models.models import Personen, Relaties
+from ..logging_config import log_info, log_warning
+from .geheugenindex import GeheugenIndex
+from config import get_settings
+
+settings = get_settings()
+
+# Clusters van personen die via relaties (van welk type ook) met elkaar verbonden zijn.
+# Personen die in een ander cluster zitten dan de rest, zijn vaak "eilandjes" uit de invoer:
+# een gezin dat nooit aan de familie is gekoppeld, een dubbel ingevoerde persoon, ...
+#
+# Union-find (disjoint sets) met union op grootte en path halving: opbouwen is één doorloop over
+# de relaties, een nieuwe relatie verwerken is bijna O(1). Een verwijderde relatie kan een cluster
+# splitsen, en dat kan union-find niet; dan wordt alles bij de volgende opvraging opnieuw opgebouwd.
+
+PERSONEN_QUERY = select(Personen.id)
+RELATIES_QUERY = select(Relaties.persoon1_id, Relaties.persoon2_id)
+
+GEEN = -1  # geen persoon met dit id
+
+class Clusters:
+    def __init__(self, personen: Iterable[int], relaties: Iterable[Tuple[int, int]]):
+        """personen: alle persoon ids; relaties: (persoon1_id, persoon2_id). Relaties naar onbekende
+        personen worden overgeslagen."""
+        # De lijsten zijn direct op persoon id geïndexeerd (ids zijn oplopende gehele getallen met
+        # hooguit wat gaten): geen dict opzoeking per relatie, dat scheelt ruim de helft van de tijd.
+        personen = list(personen)
+        lengte = max(personen, default=0) + 1
+        self._ouder: List[int] = [GEEN] * lengte
+        for persoon in personen:
+            self._ouder[persoon] = persoon
+        self._grootte: List[int] = [1] * lengte
+        self._aantal_personen = lengte - self._ouder.count(GEEN)
+        self.aantal = self._aantal_personen  # aantal clusters
+
+        ouder, grootte = self._ouder, self._grootte
+        samengevoegd = 0
+        for i, j in relaties:
+            if i >= lengte or j >= lengte or ouder[i] == GEEN or ouder[j] == GEEN:
+                continue
+            # Wortels zoeken met path halving (ingebouwd: geen functie aanroep per relatie)
+            while ouder[i] != i:
+                ouder[i] = i = ouder[ouder[i]]
+            while ouder[j] != j:
+                ouder[j] = j = ouder[ouder[j]]
+            if i != j:
+                if grootte[i] < grootte[j]:
+                    i, j = j, i
+                ouder[j] = i
+                grootte[i] += grootte[j]
+                samengevoegd += 1
+        self.aantal -= samengevoegd
+
+    def __len__(self) -> int:
+        return self._aantal_personen
+
+    def __contains__(self, persoon_id: int) -> bool:
+        return 0 <= persoon_id < len(self._ouder) and self._ouder[persoon_id] != GEEN
+
+    def personen(self) -> List[int]:
+        return [persoon for persoon, ouder in enumerate(self._ouder) if ouder != GEEN]
+
+    def _wortel(self, i: int) -> int:
+        ouder = self._ouder
+        while ouder[i] != i:
+            ouder[i] = i = ouder[ouder[i]]
+        return i
+
+    # Wijzigingen (na een commit in de routes)
+
+    def voeg_persoon_toe(self, persoon_id: int):
+        if persoon_id >= len(self._ouder):
+            extra = persoon_id + 1 - len(self._ouder)
+            self._ouder.extend([GEEN] * extra)
+            self._grootte.extend([1] * extra)
+        if self._ouder[persoon_id] == GEEN:
+            self._ouder[persoon_id] = persoon_id
+            self._aantal_personen += 1
+            self.aantal += 1
+
+    def verbind(self, persoon1_id: int, persoon2_id: int):
+        self.voeg_persoon_toe(persoon1_id)
+        self.voeg_persoon_toe(persoon2_id)
+        i, j = self._wortel(persoon1_id), self._wortel(persoon2_id)
+        if i != j:
+            if self._grootte[i] < self._grootte[j]:
+                i, j = j, i
+            self._ouder[j] = i
+            self._grootte[i] += self._grootte[j]
+            self.aantal -= 1
+
+    # Opvragen
+
+    def cluster_van(self, persoon_id: int) -> Optional[int]:
+        """Id van het cluster (de persoon id van de wortel), of None voor een onbekende persoon."""
+        return self._wortel(persoon_id) if persoon_id in self else None
+
+    def verbonden(self, persoon1_id: int, persoon2_id: int) -> bool:
+        cluster = self.cluster_van(persoon1_id)
+        return cluster is not None and cluster == self.cluster_van(persoon2_id)
+
+    def grootte(self, persoon_id: int) -> int:
+        return self._grootte[self._wortel(persoon_id)] if persoon_id in self else 0
+
+    def clusters(self) -> List[List[int]]:
+        """Alle clusters als lijsten persoon ids, grootste eerst."""
+        per_wortel: Dict[int, List[int]] = {}
+        for persoon in self.personen():
+            per_wortel.setdefault(self._wortel(persoon), []).append(persoon)
+        return sorted(per_wortel.values(), key=len, reverse=True)
+
+    def verdeling(self) -> Dict[int, int]:
+        """Aantal clusters per clustergrootte."""
+        return dict(sorted(Counter(self._grootte[persoon] for persoon, ouder in enumerate(self._ouder) if ouder == persoon).items()))
+
+    def gelijk(self, ander: "Clusters") -> bool:
+        """Zelfde personen in dezelfde clusters (de wortels mogen verschillen)."""
+        personen = self.personen()
+        if self.aantal != ander.aantal or personen != ander.personen():
+            return False
+        heen: Dict[int, int] = {}
+        for persoon in personen:
+            wortel, andere_wortel = self._wortel(persoon), ander._wortel(persoon)
+            if heen.setdefault(wortel, andere_wortel) != andere_wortel:
+                return False
+        # Evenveel clusters en elke wortel op precies één andere wortel: dezelfde indeling
+        return True
+
+def familie_groepen(clusters: List[List[int]], familie_van: Dict[int, Optional[int]]) -> List[List[int]]:
+    """Groepen families die via relaties met elkaar verbonden zijn: families met personen in
+    hetzelfde cluster. Elke familie komt in precies één groep; grootste groep eerst.
+    Personen zonder familie (bv. na het verwijderen van hun familie) tellen niet mee."""
+    families = Clusters({familie for familie in familie_van.values() if familie is not None}, ())
+    for cluster in clusters:
+        eerste = None
+        for persoon in cluster:
+            familie = familie_van.get(persoon)
+            if familie is None:
+                continue
+            if eerste is None:
+                eerste = familie
+            elif familie != eerste:
+                families.verbind(eerste, familie)
+    return families.clusters()
+
+async def _lees_clusters(session: AsyncSession) -> Clusters:
+    personen = (await session.exec(PERSONEN_QUERY)).all()
+    relaties = (await session.exec(RELATIES_QUERY)).all()
+    return await run_in_threadpool(Clusters, personen, relaties)
+
+class ClusterBeheer(GeheugenIndex[Clusters]):
+    """Eén gedeelde index per proces, zoals de relatiegraaf (zie geheugenindex.py)."""
+
+    async def _bouw(self, session: AsyncSession) -> Clusters:
+        return await _lees_clusters(session)
+
+    def _geladen(self, clusters: Clusters, milliseconden: float):
+        log_info("[Clusters] opgebouwd: %s personen in %s clusters in %.0f ms",
+                 len(clusters), clusters.aantal, milliseconden)
+
+    async def controleer(self, session: AsyncSession) -> bool:
+        """Consistentiecontrole: bouwt de index opnieuw op uit de database en vergelijkt met de
+        bijgewerkte index. Geeft False (en logt een waarschuwing) als die afweek."""
+        async with self._lock:
+            oud = self._index if self._actueel() else None
+            nieuw = await self._laad(session)
+        # Niet in een thread: de routes kunnen `nieuw` intussen al bijwerken
+        if oud is not None and not oud.gelijk(nieuw):
+            log_warning("[Clusters] bijgewerkte index week af van de database (%s in plaats van %s clusters)",
+                        oud.aantal, nieuw.aantal)
+            return False
+        return True
+
+    def voeg_persoon_toe(self, persoon_id: int):
+        self._wijzig("voeg_persoon_toe", persoon_id)
+
+    def verbind(self, relatie: Relaties):
+        self._wijzig("verbind", relatie.persoon1_id, relatie.persoon2_id)
+
+clusters = ClusterBeheer(settings.CLUSTERS_TTL)
@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, UnidentifiedImageError
+from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
+
+from config import get_settings
+from ..database import new_write_session
+from ..logging_config import log_debug, log_error, log_info
+from ..models.models import Personen, Jubilea
+from .afbeeldingen import (maak_varianten, controleer_afmetingen, parse_variant_naam, variant_naam,
+                           FotoTeGroot, FOTO_MATEN, FORMATEN, GROOTSTE_MAAT)
+from .cache import invalidate_caches, UPCOMING_EVENTS, SEARCH
+
+# Gedeelde verwerking van geüploade foto's (personen en jubilea).
+# De route bewaart alleen de upload en start de verwerking; decoderen, verkleinen en
+# encoderen gebeurt in een process pool, zodat het event loop niet geblokkeerd wordt.
+# Zodra de foto klaar is wordt foto_url van het record bijgewerkt (naar de grootste variant,
+# zie afbeeldingen.py). Tot dat moment staat het record als 'in verwerking' geregistreerd
+# (zie foto_in_verwerking).
+#
+# Het geheugengebruik per request blijft begrensd: de upload staat in een SpooledTemporaryFile
+# (boven 1 MB op schijf), de request body is begrensd door MAX_UPLOAD_BYTES (zie uploadlimiet.py)
+# en controleer_foto leest alleen de header om te grote of onleesbare foto's direct te weigeren.
+
+settings = get_settings()
+
+UPLOAD_CHUNK = 64 * 1024
+
+_executor: Optional[ProcessPoolExecutor] = None
+_in_verwerking: Dict[Tuple[str, int], asyncio.Task] = {}
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 'spawn': geen fork van een proces met draaiende (database) threads
+        _executor = ProcessPoolExecutor(max_workers=settings.FOTO_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        log_info("[Fotoverwerking] Process pool gestart met %s workers", settings.FOTO_WORKERS)
+    return _executor
+
+def _sleutel(model, record_id: int) -> Tuple[str, int]:
+    return (model.__name__, record_id)
+
+def foto_in_verwerking(record) -> bool:
+    """Voor templates: is er voor dit record nog een foto in verwerking?"""
+    return record is not None and _sleutel(type(record), record.id) in _in_verwerking
+
+def _lees_header(bestand):
+    bestand.seek(0)
+    try:
+        with Image.open(bestand) as img:
+            controleer_afmetingen(img, settings.MAX_IMAGE_PIXELS)
+            return img.format
+    finally:
+        bestand.seek(0)
+
+async def controleer_foto(upload: UploadFile) -> None:
+    """Controleert een upload aan de hand van de header, zonder de foto te decoderen.
+    Aanroepen vóórdat er iets opgeslagen wordt, zodat een geweigerde foto geen half record oplevert."""
+    try:
+        formaat = await run_in_threadpool(_lees_header, upload.file)
+    except (FotoTeGroot, Image.DecompressionBombError) as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(status_code=400, detail="Het bestand is geen (leesbare) afbeelding")
+    log_debug("[Fotoverwerking] Upload %s (%s, %s bytes) goedgekeurd", upload.filename, formaat, upload.size)
+
+async def _bewaar_upload(upload: UploadFile) -> str:
+    upload_dir = settings.FOTO_DIR / ".uploads"
+    upload_dir.mkdir(exist_ok=True)
+    pad = upload_dir / f"{uuid.uuid4().hex}{os.path.splitext(upload.filename)[1]}"
+    with open(pad, "wb") as bestand:
+        while chunk := await upload.read(UPLOAD_CHUNK):
+            bestand.write(chunk)
+    return str(pad)
+
+async def verwijder_foto(session, foto_url: Optional[str]):
+    """Verwijdert de bestanden van een foto, tenzij een ander record dezelfde foto gebruikt.
+    Aanroepen nadat foto_url van het eigen record al gewijzigd en gecommit is."""
+    if not foto_url:
+        return
+    bestandsnaam = foto_url.rsplit("/", 1)[-1]
+    foto_hash = parse_variant_naam(bestandsnaam)
+    if foto_hash is None:
+        # Foto van vóór de varianten (bv. person_1.jpg): hoort bij precies één record
+        paden = [settings.FOTO_DIR / bestandsnaam]
+    else:
+        for model in (Personen, Jubilea):
+            if (await session.exec(select(model.id).where(model.foto_url == foto_url))).first() is not None:
+                return
+        paden = [settings.FOTO_DIR / variant_naam(foto_hash, maat, ext) for maat in FOTO_MATEN for ext in FORMATEN]
+    for pad in paden:
+        if pad.exists():
+            os.remove(pad)
+    log_debug("[Fotoverwerking] %s verwijderd", foto_url)
+
+async def _verwerk(model, record_id: int, bron: str, vorige: Optional[asyncio.Task]):
+    sleutel = _sleutel(model, record_id)
+    try:
+        if vorige is not None:
+            # Uploads voor hetzelfde record na elkaar verwerken, zodat de nieuwste wint
+            await asyncio.gather(vorige, return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        foto_hash = await loop.run_in_executor(_get_executor(), maak_varianten, bron, str(settings.FOTO_DIR),
+                                               settings.MAX_IMAGE_PIXELS)
+        foto_url = f"/fotos/{variant_naam(foto_hash, GROOTSTE_MAAT)}"
+        log_debug("[Fotoverwerking] %s %s: %s bewaard", model.__name__, record_id, foto_url)
+
+        async with new_write_session() as session:
+            record = await session.get(model, record_id)
+            if record is None:
+                log_info("[Fotoverwerking] %s %s bestaat niet meer, foto vervalt", model.__name__, record_id)
+                await verwijder_foto(session, foto_url)
+                return
+            oude_url = record.foto_url
+            record.foto_url = foto_url
+            session.add(record)
+            await session.commit()
+            if oude_url != foto_url:
+                await verwijder_foto(session, oude_url)
+        invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    except Exception as e:
+        log_error("[Fotoverwerking] Fout bij verwerken foto voor %s %s: %s", model.__name__, record_id, e)
+    finally:
+        if os.path.exists(bron):
+            os.remove(bron)
+        if _in_verwerking.get(sleutel) is asyncio.current_task():
+            del _in_verwerking[sleutel]
+
+async def start_foto_verwerking(upload: UploadFile, model, record_id: int) -> None:
+    """Bewaart de upload en start de verwerking op de achtergrond; keert direct terug."""
+    bron = await _bewaar_upload(upload)
+
+    sleutel = _sleutel(model, record_id)
+    _in_verwerking[sleutel] = asyncio.create_task(
+        _verwerk(model, record_id, bron, _in_verwerking.get(sleutel))
+    )
+    log_debug("[Fotoverwerking] %s %s: verwerking gestart (%s)", model.__name__, record_id, upload.filename)
+
+async def wacht_op_verwerking():
+    """Wacht tot alle lopende verwerkingen klaar zijn (tests en afsluiten)."""
+    taken = list(_in_verwerking.values())
+    if taken:
+        await asyncio.gather(*taken, return_exceptions=True)
+
+async def shutdown():
+    global _executor
+    await wacht_op_verwerking()
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
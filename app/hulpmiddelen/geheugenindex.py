@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Generic, Optional, TypeVar
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Gedeelde basis voor indexen die per proces in het geheugen staan (relatiegraaf, clusters):
+# bij het eerste gebruik opgebouwd uit de database, daarna direct bijgewerkt door de routes
+# en na `ttl` seconden opnieuw opgebouwd, voor wijzigingen door andere workers.
+
+I = TypeVar("I")
+
+class GeheugenIndex(Generic[I]):
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._index: Optional[I] = None
+        self._geladen_op = 0.0
+        self._generatie  = 0
+        self._lock = asyncio.Lock()
+        # Wijzigingen tijdens het opbouwen: daarna opnieuw toegepast (ze moeten idempotent zijn)
+        self._journaal: Optional[list] = None
+
+    async def _bouw(self, session: AsyncSession) -> I:
+        """Bouwt de index op uit de database (in de subklasse)."""
+        raise NotImplementedError
+
+    def _geladen(self, index: I, milliseconden: float):
+        """Logregel na het opbouwen (in de subklasse)."""
+
+    def _actueel(self) -> bool:
+        return self._index is not None and time.monotonic() - self._geladen_op < self.ttl
+
+    async def get(self, session: AsyncSession) -> I:
+        if self._actueel():
+            return self._index
+        async with self._lock:
+            if not self._actueel():
+                await self._laad(session)
+            return self._index
+
+    async def _laad(self, session: AsyncSession) -> I:
+        """Opnieuw opbouwen; de aanroeper houdt de lock vast."""
+        start = time.perf_counter()
+        generatie = self._generatie
+        self._journaal = []
+        try:
+            index = await self._bouw(session)
+            for methode, args in self._journaal:
+                getattr(index, methode)(*args)
+        finally:
+            self._journaal = None
+        self._index = index
+        # Tijdens het opbouwen geïnvalideerd: bij de volgende opvraging nogmaals opbouwen
+        self._geladen_op = time.monotonic() if generatie == self._generatie else 0.0
+        self._geladen(index, (time.perf_counter() - start) * 1000)
+        return index
+
+    def _wijzig(self, methode: str, *args):
+        if self._journaal is not None:
+            self._journaal.append((methode, args))
+        if self._index is not None:
+            getattr(self._index, methode)(*args)
+
+    def invalideer(self):
+        """Volgende opvraging bouwt de index opnieuw op."""
+        self._generatie += 1
+        self._geladen_op = 0.0
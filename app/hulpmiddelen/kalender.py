@@ -0,0 +1,43 @@
+from calendar import isleap
+from datetime import date
+from typing import List, Tuple
+
+# Een 'maanddag' is de kalenderdag zonder jaartal als integer MMDD (bv. 15 mei -> 515).
+# Jubilea slaan deze waarde geïndexeerd op, zodat 'komende gebeurtenissen' een
+# range-query wordt in plaats van een scan over alle jubilea.
+
+def maand_dag(datum: date) -> int:
+    return datum.month * 100 + datum.day
+
+def maand_dag_bereiken(start: date, eind: date) -> List[Tuple[int, int]]:
+    """Geeft de (van, tot) maanddag-bereiken (inclusief) voor de periode start..eind.
+    Loopt de periode over de jaargrens heen, dan worden het twee bereiken.
+    Valt 1 maart van een niet-schrikkeljaar in de periode, dan hoort 29 februari (229) er ook
+    bij: die jubilea vallen dan op 1 maart (zie volgende_jubileumdatum)."""
+    van, tot = maand_dag(start), maand_dag(eind)
+    if (eind - start).days >= 365:
+        return [(101, 1231)]
+    if start.year == eind.year:
+        bereiken = [(van, tot)]
+    else:
+        bereiken = [(van, 1231), (101, tot)]
+    for jaar in range(start.year, eind.year + 1):
+        if not isleap(jaar) and start <= date(jaar, 3, 1) <= eind:
+            if not any(b_van <= 229 <= b_tot for b_van, b_tot in bereiken):
+                bereiken.append((229, 229))
+            break
+    return bereiken
+
+def volgende_jubileumdatum(datum: date, vandaag: date) -> date:
+    """De eerstvolgende keer (vanaf vandaag) dat de jubileumdatum valt.
+    29 februari valt in niet-schrikkeljaren op 1 maart."""
+    def in_jaar(jaar):
+        try:
+            return datum.replace(year=jaar)
+        except ValueError:
+            return date(jaar, 3, 1)
+
+    volgende = in_jaar(vandaag.year)
+    if volgende < vandaag:
+        volgende = in_jaar(vandaag.year + 1)
+    return volgende
@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Index op het logbestand voor de log viewer (/admin/logs).
+# Per bestand (app.log en de backups app.log.1 .. app.log.N van de RotatingFileHandler) worden
+# de byte offset, de datum en het niveau van elke logregel bijgehouden. Een pagina opvragen is
+# daardoor een bisect op datum plus een seek per regel, in plaats van het hele bestand parsen.
+#
+# De index groeit mee: bij elke opvraging wordt alleen het nieuwe deel van een bestand gelezen.
+# Bestanden worden herkend aan hun inode, zodat een rotatie (app.log -> app.log.1) de bestaande
+# index niet ongeldig maakt; alleen het nieuwe, lege app.log wordt dan opnieuw opgebouwd.
+# Zowel het tekstformaat als JSON regels (LOG_FORMAT=json) worden herkend.
+
+LOG_REGEL = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) (\w+) (.+)')
+_INDEX_REGEL = re.compile(rb'(\d{4})-(\d{2})-(\d{2}) \d{2}:\d{2}:\d{2},\d{3} (\w+) ')
+_INDEX_REGEL_JSON = re.compile(rb'\{"time": "(\d{4})-(\d{2})-(\d{2}) [^"]*", "level": "(\w+)"')
+
+class _BestandIndex:
+    """Offsets, datums (ordinals) en niveaus van de logregels in één bestand."""
+
+    def __init__(self, pad: str, stat: os.stat_result):
+        self.pad      = pad
+        self.inode    = (stat.st_dev, stat.st_ino)
+        self.gelezen  = 0  # tot hier is het bestand geïndexeerd (altijd het einde van een hele regel)
+        self.offsets  = array('q')
+        self.datums   = array('i')
+        # Per niveau de posities (in offsets/datums) van de regels met dat niveau
+        self.niveaus: Dict[str, array] = {}
+
+    def bijwerken(self, grootte: int):
+        if grootte <= self.gelezen:
+            return
+        datum_cache: Dict[bytes, int] = {}
+        with open(self.pad, 'rb') as bestand:
+            bestand.seek(self.gelezen)
+            offset = self.gelezen
+            for regel in bestand:
+                if not regel.endswith(b'\n'):
+                    break  # regel wordt nog geschreven, volgende keer verder
+                match = _INDEX_REGEL.match(regel) or _INDEX_REGEL_JSON.match(regel)
+                if match:
+                    sleutel = match.group(1, 2, 3)
+                    ordinal = datum_cache.get(sleutel)
+                    if ordinal is None:
+                        ordinal = datum_cache[sleutel] = date(*map(int, sleutel)).toordinal()
+                    niveau = match.group(4).decode().upper()
+                    if niveau not in self.niveaus:
+                        self.niveaus[niveau] = array('I')
+                    self.niveaus[niveau].append(len(self.offsets))
+                    self.offsets.append(offset)
+                    self.datums.append(ordinal)
+                offset += len(regel)
+        self.gelezen = offset
+
+    def bereik(self, van: int, tot: int, niveau: Optional[str]) -> Tuple[Optional[array], int, int]:
+        """Geeft (posities, begin, eind): de regels binnen [van, tot] zijn posities[begin:eind],
+        of bij posities None direct offsets[begin:eind]."""
+        if niveau is None:
+            return None, bisect_left(self.datums, van), bisect_right(self.datums, tot)
+        posities = self.niveaus.get(niveau)
+        if posities is None:
+            return None, 0, 0
+        datum = self.datums.__getitem__
+        return (posities,
+                bisect_left(posities, van, key=datum),
+                bisect_right(posities, tot, key=datum))
+
+class LogIndex:
+    def __init__(self, pad):
+        self.pad = Path(pad)
+        self._bestanden: Dict[Tuple[int, int], _BestandIndex] = {}
+        self._volgorde: List[_BestandIndex] = []
+        self._lock = threading.Lock()
+
+    def _kandidaten(self) -> List[Path]:
+        """Alle logbestanden, oudste eerst: app.log.N, ..., app.log.1, app.log."""
+        backups = []
+        for pad in self.pad.parent.glob(self.pad.name + ".*"):
+            achtervoegsel = pad.name[len(self.pad.name) + 1:]
+            if achtervoegsel.isdigit():
+                backups.append((int(achtervoegsel), pad))
+        return [pad for _, pad in sorted(backups, reverse=True)] + [self.pad]
+
+    def bijwerken(self):
+        with self._lock:
+            bestanden = {}
+            volgorde = []
+            for pad in self._kandidaten():
+                try:
+                    stat = os.stat(pad)
+                except FileNotFoundError:
+                    continue
+                inode = (stat.st_dev, stat.st_ino)
+                index = self._bestanden.get(inode)
+                if index is None or stat.st_size < index.gelezen:
+                    # Nieuw (of ingekort) bestand: opnieuw opbouwen
+                    index = _BestandIndex(str(pad), stat)
+                index.pad = str(pad)
+                index.bijwerken(stat.st_size)
+                bestanden[inode] = index
+                volgorde.append(index)
+            self._bestanden = bestanden
+            self._volgorde = volgorde
+
+    def eerste_datum(self) -> Optional[date]:
+        for index in self._volgorde:
+            if index.datums:
+                return date.fromordinal(index.datums[0])
+        return None
+
+    def zoek(self, van: Optional[date], tot: Optional[date], niveau: Optional[str],
+             start: int, aantal: int) -> Tuple[List[dict], int]:
+        """Geeft de regels [start, start + aantal) binnen het filter, en het totaal aantal treffers."""
+        self.bijwerken()
+        van_ordinal = van.toordinal() if van else 0
+        tot_ordinal = tot.toordinal() if tot else date.max.toordinal()
+        niveau = niveau.upper() if niveau else None
+
+        with self._lock:
+            bereiken = [(index, *index.bereik(van_ordinal, tot_ordinal, niveau)) for index in self._volgorde]
+        totaal = sum(eind - begin for _, _, begin, eind in bereiken)
+
+        regels = []
+        for index, posities, begin, eind in bereiken:
+            if start >= eind - begin:
+                start -= eind - begin
+                continue
+            begin += start
+            start = 0
+            stop = min(eind, begin + aantal - len(regels))
+            offsets = [index.offsets[i] for i in (posities[begin:stop] if posities is not None else range(begin, stop))]
+            regels.extend(_lees_regels(index.pad, offsets))
+            if len(regels) >= aantal:
+                break
+        return regels, totaal
+
+def _parse_regel(regel: str) -> Optional[dict]:
+    if regel.startswith('{'):
+        try:
+            data = json.loads(regel)
+            date_str, level, message = data['time'], data['level'], data['message']
+        except (ValueError, KeyError):
+            return None
+        if data.get('request_id'):
+            message = f"[{data['request_id']}] {message}"
+    else:
+        match = LOG_REGEL.match(regel)
+        if not match:
+            return None
+        date_str, level, message = match.groups()
+    return {
+        'date': datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S,%f'),
+        'level': level,
+        'message': message,
+    }
+
+def _lees_regels(pad: str, offsets: List[int]) -> List[dict]:
+    regels = []
+    try:
+        with open(pad, 'rb') as bestand:
+            for offset in offsets:
+                bestand.seek(offset)
+                regel = _parse_regel(bestand.readline().decode('utf-8', errors='replace'))
+                if regel is not None:
+                    regels.append(regel)
+    except FileNotFoundError:
+        pass  # tussentijds geroteerd; de volgende opvraging klopt weer
+    return regels
+
+_indexen: Dict[str, LogIndex] = {}
+
+def get_log_index(pad) -> LogIndex:
+    sleutel = str(pad)
+    if sleutel not in _indexen:
+        _indexen[sleutel] = LogIndex(pad)
+    return _indexen[sleutel]
@@ -0,0 +1,175 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+import jinja2
+from sqlalchemy import event
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Metrics voor /admin/metrics (Prometheus text format):
+# - latency per route (histogram, gelabeld met method, route-sjabloon en status)
+# - aantal en duur van database queries per route (via engine events, zie instrument_engine)
+# - render tijd per template (via de template class van de Jinja environment)
+# Alles in-process; bij meerdere workers heeft elke worker zijn eigen tellers.
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GEEN_ROUTE = "(none)"  # queries en templates buiten een request, of requests zonder route (404, static)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.tellers = [0] * len(buckets)
+        self.som     = 0.0
+        self.aantal  = 0
+
+    def observe(self, waarde: float):
+        for i, grens in enumerate(self.buckets):
+            if waarde <= grens:
+                self.tellers[i] += 1
+                break
+        self.som    += waarde
+        self.aantal += 1
+
+class Metriek:
+    """Een histogram of counter met labels; waarden per combinatie van labelwaarden."""
+    def __init__(self, naam: str, soort: str, help: str, labels: Tuple[str, ...], buckets=BUCKETS):
+        self.naam    = naam
+        self.soort   = soort
+        self.help    = help
+        self.labels  = labels
+        self.buckets = buckets
+        self.waarden: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, waarde: float, *labelwaarden):
+        with self._lock:
+            histogram = self.waarden.get(labelwaarden)
+            if histogram is None:
+                histogram = self.waarden[labelwaarden] = Histogram(self.buckets)
+            histogram.observe(waarde)
+
+    def inc(self, waarde: float = 1, *labelwaarden):
+        with self._lock:
+            self.waarden[labelwaarden] = self.waarden.get(labelwaarden, 0) + waarde
+
+    def _labeltekst(self, labelwaarden, extra: Optional[Tuple[str, str]] = None) -> str:
+        paren = list(zip(self.labels, labelwaarden))
+        if extra:
+            paren.append(extra)
+        if not paren:
+            return ""
+        return "{" + ",".join(f'{naam}="{_escape(waarde)}"' for naam, waarde in paren) + "}"
+
+    def render(self) -> str:
+        regels = [f"# HELP {self.naam} {self.help}", f"# TYPE {self.naam} {self.soort}"]
+        with self._lock:
+            items = sorted(self.waarden.items())
+            for labelwaarden, waarde in items:
+                if self.soort == "counter":
+                    regels.append(f"{self.naam}{self._labeltekst(labelwaarden)} {_getal(waarde)}")
+                    continue
+                cumulatief = 0
+                for grens, teller in zip(waarde.buckets, waarde.tellers):
+                    cumulatief += teller
+                    regels.append(f"{self.naam}_bucket{self._labeltekst(labelwaarden, ('le', _getal(grens)))} {cumulatief}")
+                regels.append(f"{self.naam}_bucket{self._labeltekst(labelwaarden, ('le', '+Inf'))} {waarde.aantal}")
+                regels.append(f"{self.naam}_sum{self._labeltekst(labelwaarden)} {_getal(waarde.som)}")
+                regels.append(f"{self.naam}_count{self._labeltekst(labelwaarden)} {waarde.aantal}")
+        return "\n".join(regels)
+
+def _escape(waarde) -> str:
+    return str(waarde).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _getal(waarde) -> str:
+    return repr(float(waarde)) if isinstance(waarde, float) else str(waarde)
+
+REQUEST_DUUR   = Metriek("http_request_duration_seconds", "histogram", "Duur van HTTP requests", ("method", "route", "status"))
+DB_QUERIES     = Metriek("db_queries_total", "counter", "Aantal database queries", ("route",))
+DB_QUERY_DUUR  = Metriek("db_query_duration_seconds", "histogram", "Duur van database queries", ("route",))
+TEMPLATE_DUUR  = Metriek("template_render_duration_seconds", "histogram", "Render tijd van templates", ("template",))
+# Aantal queries per request: een stijging wijst meestal op een N+1 probleem
+QUERIES_PER_REQUEST = Metriek("http_request_db_queries", "histogram", "Aantal database queries per request", ("route",),
+                              buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200))
+METRIEKEN = [REQUEST_DUUR, QUERIES_PER_REQUEST, DB_QUERIES, DB_QUERY_DUUR, TEMPLATE_DUUR]
+
+class RequestStats:
+    """Tellers van het lopende request; gedeeld met de engine events via een contextvar."""
+    __slots__ = ("scope", "queries", "db_tijd", "template_tijd")
+
+    def __init__(self, scope: Scope):
+        self.scope         = scope
+        self.queries       = 0
+        self.db_tijd       = 0.0
+        self.template_tijd = 0.0
+
+    @property
+    def route(self) -> str:
+        # De router zet de gevonden route in de (gedeelde) scope vóórdat het endpoint draait
+        route = self.scope.get("route")
+        return route.path if route is not None else GEEN_ROUTE
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats  = RequestStats(scope)
+        token  = request_stats.set(stats)
+        start  = time.perf_counter()
+        status = 500
+
+        async def send_met_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_met_status)
+        finally:
+            route = stats.route
+            REQUEST_DUUR.observe(time.perf_counter() - start, scope["method"], route, str(status))
+            QUERIES_PER_REQUEST.observe(stats.queries, route)
+            request_stats.reset(token)
+
+def instrument_engine(sync_engine):
+    """Telt de queries van een (sync of async.sync_engine) engine per route."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _voor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _na(conn, cursor, statement, parameters, context, executemany):
+        duur  = time.perf_counter() - conn.info["query_start"].pop()
+        stats = request_stats.get()
+        route = stats.route if stats is not None else GEEN_ROUTE
+        if stats is not None:
+            stats.queries += 1
+            stats.db_tijd += duur
+        DB_QUERIES.inc(1, route)
+        DB_QUERY_DUUR.observe(duur, route)
+
+class TimedTemplate(jinja2.Template):
+    """Template die de render tijd registreert (zie configure_templates)."""
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            duur  = time.perf_counter() - start
+            stats = request_stats.get()
+            if stats is not None:
+                stats.template_tijd += duur
+            TEMPLATE_DUUR.observe(duur, self.name or "(string)")
+
+def render_metrics(extra: str = "") -> str:
+    delen = [metriek.render() for metriek in METRIEKEN]
+    if extra:
+        delen.append(extra)
+    return "\n".join(delen) + "\n"
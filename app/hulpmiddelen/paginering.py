@@ -0,0 +1,106 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import date
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Keyset (cursor) paginering voor de lijstpagina's.
+# In plaats van OFFSET onthoudt de cursor de sorteerwaarden van de laatste (of eerste) rij,
+# zodat de volgende pagina met een geïndexeerde range-query wordt opgehaald:
+#   WHERE (sorteerkolom, id) > (:laatste_waarde, :laatste_id) ORDER BY sorteerkolom, id LIMIT n
+# De laatste sorteersleutel moet uniek zijn (meestal de primary key).
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE     = 200
+
+class Pagina:
+    def __init__(self, items: list, total: int, page_size: int,
+                 next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None):
+        self.items       = items
+        self.total       = total
+        self.page_size   = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+def encode_cursor(richting: str, waarden: Sequence[Any]) -> str:
+    data = json.dumps([richting, [w.isoformat() if isinstance(w, date) else w for w in waarden]])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_keys: Sequence) -> tuple:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        richting, waarden = json.loads(data)
+        if richting not in ("next", "prev") or len(waarden) != len(sort_keys):
+            raise ValueError(cursor)
+        # Datums terugzetten naar date, zodat de kolomtypes de parameters accepteren
+        waarden = [
+            date.fromisoformat(w) if w is not None and _python_type(key) is date else w
+            for key, w in zip(sort_keys, waarden)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Ongeldige paginacursor")
+    return richting, waarden
+
+def _python_type(key):
+    try:
+        return key.type.python_type
+    except NotImplementedError:
+        return None
+
+async def paginate(session: AsyncSession, query, sort_keys: List, count_query,
+             cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> Pagina:
+    """Voert `query` uit voor één pagina, gesorteerd op `sort_keys` (laatste sleutel uniek).
+
+    `count_query` telt het totaal aantal rijen; houd deze zo eenvoudig mogelijk
+    (bij voorkeur een count over één tabel zonder joins)."""
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    aantal_sleutels = len(sort_keys)
+
+    richting, waarden = ("next", None)
+    if cursor:
+        richting, waarden = decode_cursor(cursor, sort_keys)
+
+    # De sorteerwaarden worden als extra kolommen meegeselecteerd voor de volgende cursor
+    query = query.add_columns(*[key.label(f"_sleutel{i}") for i, key in enumerate(sort_keys)])
+    if richting == "next":
+        if waarden is not None:
+            query = query.where(tuple_(*sort_keys) > tuple_(*waarden))
+        query = query.order_by(*sort_keys)
+    else:
+        query = query.where(tuple_(*sort_keys) < tuple_(*waarden))
+        query = query.order_by(*[key.desc() for key in sort_keys])
+
+    # execute() i.p.v. exec(): de extra sleutelkolommen moeten als Row terugkomen, ook bij één entiteit
+    rows = (await session.execute(query.limit(page_size + 1))).all()
+    meer = len(rows) > page_size
+    rows = rows[:page_size]
+    if richting == "prev":
+        rows.reverse()
+
+    items = []
+    sleutels = []
+    rij_type = None
+    for row in rows:
+        waarden_rij = tuple(row[:-aantal_sleutels])
+        if len(waarden_rij) == 1:
+            items.append(waarden_rij[0])
+        else:
+            # Kolomnamen behouden zodat row.id e.d. blijven werken
+            if rij_type is None:
+                rij_type = namedtuple("Rij", row._fields[:-aantal_sleutels], rename=True)
+            items.append(rij_type(*waarden_rij))
+        sleutels.append(tuple(row[-aantal_sleutels:]))
+
+    next_cursor = prev_cursor = None
+    if sleutels:
+        if richting == "prev" or meer:
+            next_cursor = encode_cursor("next", sleutels[-1])
+        if (richting == "next" and waarden is not None) or (richting == "prev" and meer):
+            prev_cursor = encode_cursor("prev", sleutels[0])
+
+    total = (await session.exec(count_query)).one()
+    return Pagina(items, total, page_size, next_cursor, prev_cursor)
@@ -0,0 +1,250 @@
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
+
+from ..models.models import Personen, Relaties, Relatietypes
+from ..logging_config import log_info
+from .geheugenindex import GeheugenIndex
+from config import get_settings
+
+settings = get_settings()
+
+# Relatiegraaf in het geheugen: personen zijn de knopen, relaties de (ongerichte) kanten.
+# Hiermee wordt "hoe zijn deze twee personen familie?" beantwoord met een bidirectionele
+# breadth-first search, zonder per stap een query.
+#
+# Opslag: de relaties staan in parallelle arrays (positie -> id, persoon1, persoon2, type) en de
+# buren van elke persoon in CSR vorm (begin[i]..begin[i+1] in kanten, met posities in die arrays).
+# Wijzigingen uit routes/relaties.py worden direct verwerkt: een nieuwe relatie komt in een kleine
+# lijst 'extra' per persoon, een verwijderde of verhangen relatie wordt als dood gemarkeerd.
+# Als er te veel van zulke wijzigingen zijn, wordt de CSR structuur opnieuw opgebouwd.
+
+MIN_COMPACT = 1024  # wijzigingen voordat opnieuw opbouwen de moeite waard is
+
+class Stap(NamedTuple):
+    van: int             # persoon id
+    naar: int            # persoon id
+    relatie_id: int
+    relatietype_id: int
+    omgekeerd: bool      # niet-symmetrische relatie in de richting persoon2 -> persoon1
+
+class RelatieGraaf:
+    def __init__(self, relaties: Iterable[Tuple[int, int, int, int]], symmetrisch: Dict[int, bool]):
+        """relaties: (id, persoon1_id, persoon2_id, relatietype_id); symmetrisch: per relatietype id."""
+        self.symmetrisch = dict(symmetrisch)
+        kolommen = list(zip(*relaties)) or [(), (), (), ()]
+        self._id, self._p1, self._p2, self._type = (array('q', kolom) for kolom in kolommen)
+        self._levend = bytearray(b'\x01') * len(self._id)
+        self._compact()
+
+    def __len__(self) -> int:
+        return len(self._positie)
+
+    def _voeg_positie_toe(self, relatie_id: int, persoon1_id: int, persoon2_id: int, relatietype_id: int) -> int:
+        positie = len(self._id)
+        self._id.append(relatie_id)
+        self._p1.append(persoon1_id)
+        self._p2.append(persoon2_id)
+        self._type.append(relatietype_id)
+        self._levend.append(1)
+        self._positie[relatie_id] = positie
+        return positie
+
+    def _compact(self):
+        """Bouwt de arrays en de CSR buren opnieuw op uit de levende relaties."""
+        if 0 in self._levend:
+            levend = [positie for positie in range(len(self._id)) if self._levend[positie]]
+            self._id   = array('q', (self._id[p] for p in levend))
+            self._p1   = array('q', (self._p1[p] for p in levend))
+            self._p2   = array('q', (self._p2[p] for p in levend))
+            self._type = array('q', (self._type[p] for p in levend))
+            self._levend = bytearray(b'\x01') * len(levend)
+        self._positie: Dict[int, int] = {relatie_id: positie for positie, relatie_id in enumerate(self._id)}  # relatie id -> positie
+
+        # Knoop index per persoon, en de graad van elke knoop
+        knoop: Dict[int, int] = {}
+        graad: List[int] = []
+        for personen in (self._p1, self._p2):
+            for persoon in personen:
+                index = knoop.get(persoon)
+                if index is None:
+                    index = knoop[persoon] = len(graad)
+                    graad.append(0)
+                graad[index] += 1
+
+        begin = array('I', [0]) * (len(graad) + 1)
+        for index, aantal in enumerate(graad):
+            begin[index + 1] = begin[index] + aantal
+        vul = array('I', begin[:-1])
+        kanten = array('I', [0]) * begin[-1]
+        for personen in (self._p1, self._p2):
+            for positie, persoon in enumerate(personen):
+                index = knoop[persoon]
+                kanten[vul[index]] = positie
+                vul[index] += 1
+
+        self._knoop  = knoop
+        self._begin  = begin
+        self._kanten = kanten
+        self._extra: Dict[int, List[int]] = {}
+        self._wijzigingen = 0
+
+    def _misschien_compact(self):
+        self._wijzigingen += 1
+        if self._wijzigingen > max(MIN_COMPACT, len(self._positie) // 4):
+            self._compact()
+
+    def buren(self, persoon_id: int):
+        """Levert (buur, positie) voor elke relatie van de persoon."""
+        levend, p1, p2 = self._levend, self._p1, self._p2
+        index = self._knoop.get(persoon_id)
+        if index is not None:
+            kanten = self._kanten
+            for k in range(self._begin[index], self._begin[index + 1]):
+                positie = kanten[k]
+                if levend[positie]:
+                    yield (p2[positie] if p1[positie] == persoon_id else p1[positie]), positie
+        for positie in self._extra.get(persoon_id, ()):
+            if levend[positie]:
+                yield (p2[positie] if p1[positie] == persoon_id else p1[positie]), positie
+
+    def kanten(self) -> Tuple[array, array, array]:
+        """Kopie van (persoon1, persoon2, relatietype) van alle levende relaties, als parallelle arrays."""
+        if 0 not in self._levend:
+            return self._p1[:], self._p2[:], self._type[:]
+        levend = [positie for positie in range(len(self._id)) if self._levend[positie]]
+        return tuple(array('q', (kolom[p] for p in levend)) for kolom in (self._p1, self._p2, self._type))
+
+    # Wijzigingen (na een commit in routes/relaties.py)
+
+    def voeg_toe(self, relatie_id: int, persoon1_id: int, persoon2_id: int, relatietype_id: int):
+        if relatie_id in self._positie:
+            return self.wijzig(relatie_id, persoon1_id, persoon2_id, relatietype_id)
+        positie = self._voeg_positie_toe(relatie_id, persoon1_id, persoon2_id, relatietype_id)
+        self._extra.setdefault(persoon1_id, []).append(positie)
+        if persoon2_id != persoon1_id:
+            self._extra.setdefault(persoon2_id, []).append(positie)
+        self._misschien_compact()
+
+    def wijzig(self, relatie_id: int, persoon1_id: int, persoon2_id: int, relatietype_id: int):
+        positie = self._positie.get(relatie_id)
+        if positie is not None and (self._p1[positie], self._p2[positie]) == (persoon1_id, persoon2_id):
+            self._type[positie] = relatietype_id
+            return
+        self.verwijder(relatie_id)
+        self.voeg_toe(relatie_id, persoon1_id, persoon2_id, relatietype_id)
+
+    def verwijder(self, relatie_id: int):
+        positie = self._positie.pop(relatie_id, None)
+        if positie is not None:
+            self._levend[positie] = 0
+            self._misschien_compact()
+
+    # Zoeken
+
+    def _breid_uit(self, grens: List[int], bezocht: Dict[int, tuple], ander: Dict[int, tuple]):
+        """Breidt één laag uit. Geeft (nieuwe grens, beste ontmoeting of None); een ontmoeting is
+        (lengte, persoon aan deze kant, positie, persoon aan de andere kant)."""
+        nieuw = []
+        beste = None
+        for persoon in grens:
+            diepte = bezocht[persoon][2] + 1
+            for buur, positie in self.buren(persoon):
+                if buur in ander:
+                    lengte = diepte + ander[buur][2]
+                    if beste is None or lengte < beste[0]:
+                        beste = (lengte, persoon, positie, buur)
+                if buur not in bezocht:
+                    bezocht[buur] = (persoon, positie, diepte)
+                    nieuw.append(buur)
+        return nieuw, beste
+
+    def pad(self, van: int, naar: int, max_diepte: int = 20) -> Optional[List[Stap]]:
+        """Kortste pad van `van` naar `naar` (hoogstens max_diepte relaties), of None."""
+        if van == naar:
+            return []
+        # persoon -> (vorige persoon, positie van de relatie, diepte)
+        voor: Dict[int, tuple] = {van: (None, None, 0)}
+        achter: Dict[int, tuple] = {naar: (None, None, 0)}
+        grens_voor, grens_achter = [van], [naar]
+        diepte = 0
+        while grens_voor and grens_achter and diepte < max_diepte:
+            # Altijd de kleinste grens uitbreiden: dat houdt beide zoekbomen klein
+            if len(grens_voor) <= len(grens_achter):
+                grens_voor, ontmoeting = self._breid_uit(grens_voor, voor, achter)
+                if ontmoeting is not None:
+                    _, persoon, positie, buur = ontmoeting
+                    return self._stappen(persoon, positie, buur, voor, achter)
+            else:
+                grens_achter, ontmoeting = self._breid_uit(grens_achter, achter, voor)
+                if ontmoeting is not None:
+                    _, persoon, positie, buur = ontmoeting
+                    return self._stappen(buur, positie, persoon, voor, achter)
+            diepte += 1
+        return None
+
+    def _stappen(self, midden_voor: int, positie: int, midden_achter: int, voor, achter) -> List[Stap]:
+        personen = []
+        posities = []
+        persoon = midden_voor
+        while persoon is not None:
+            personen.append(persoon)
+            vorige, vorige_positie, _ = voor[persoon]
+            if vorige_positie is not None:
+                posities.append(vorige_positie)
+            persoon = vorige
+        personen.reverse()
+        posities.reverse()
+        posities.append(positie)
+        persoon = midden_achter
+        while persoon is not None:
+            personen.append(persoon)
+            volgende, volgende_positie, _ = achter[persoon]
+            if volgende_positie is not None:
+                posities.append(volgende_positie)
+            persoon = volgende
+
+        stappen = []
+        for van, naar, positie in zip(personen, personen[1:], posities):
+            relatietype_id = self._type[positie]
+            omgekeerd = self._p1[positie] != van and not self.symmetrisch.get(relatietype_id, False)
+            stappen.append(Stap(van, naar, self._id[positie], relatietype_id, omgekeerd))
+        return stappen
+
+async def _lees_relaties(session: AsyncSession):
+    # Alleen relaties waarvan beide personen (nog) bestaan
+    Persoon1 = aliased(Personen)
+    Persoon2 = aliased(Personen)
+    query = select(Relaties.id, Relaties.persoon1_id, Relaties.persoon2_id, Relaties.relatietype_id).join(
+        Persoon1, Relaties.persoon1_id == Persoon1.id
+    ).join(
+        Persoon2, Relaties.persoon2_id == Persoon2.id
+    )
+    relaties = [tuple(rij) for rij in await session.exec(query)]
+    symmetrisch = {id: bool(s) for id, s in await session.exec(select(Relatietypes.id, Relatietypes.symmetrisch))}
+    return relaties, symmetrisch
+
+class RelatieGraafBeheer(GeheugenIndex[RelatieGraaf]):
+    """Eén gedeelde graaf per proces (zie geheugenindex.py)."""
+
+    async def _bouw(self, session: AsyncSession) -> RelatieGraaf:
+        relaties, symmetrisch = await _lees_relaties(session)
+        return await run_in_threadpool(RelatieGraaf, relaties, symmetrisch)
+
+    def _geladen(self, graaf: RelatieGraaf, milliseconden: float):
+        log_info("[Relatiegraaf] geladen: %s relaties in %.0f ms", len(graaf), milliseconden)
+
+    def voeg_toe(self, relatie: Relaties):
+        self._wijzig("voeg_toe", relatie.id, relatie.persoon1_id, relatie.persoon2_id, relatie.relatietype_id)
+
+    def wijzig(self, relatie: Relaties):
+        self._wijzig("wijzig", relatie.id, relatie.persoon1_id, relatie.persoon2_id, relatie.relatietype_id)
+
+    def verwijder(self, relatie_id: int):
+        self._wijzig("verwijder", relatie_id)
+
+relatiegraaf = RelatieGraafBeheer(settings.RELATIEGRAAF_TTL)
@@ -0,0 +1,54 @@
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..logging_config import app_logger, request_id_var, route_var, DEVELOPMENT
+from .metrics import request_stats
+
+# Geeft elk request een id (overgenomen uit X-Request-ID, of nieuw) en zet dat samen met de
+# route in de logcontext, zodat elke logregel tijdens het request ernaar verwijst.
+# Na afloop volgt één regel met status en duur (en, binnen MetricsMiddleware, het aantal queries
+# en de database- en render tijd); het id gaat ook terug in de response header.
+
+REQUEST_ID_HEADER = "x-request-id"
+
+class RequestLogMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:12]
+        request_token = request_id_var.set(request_id)
+        route_token   = route_var.set(f"{scope['method']} {scope['path']}")
+        start  = time.perf_counter()
+        status = 500
+
+        async def send_met_id(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_met_id)
+        finally:
+            duur = (time.perf_counter() - start) * 1000
+            if DEVELOPMENT:
+                # Na de routing staat het route-sjabloon (bv. /personen/{persoon_id}) in de scope
+                route = scope.get("route")
+                route = f"{scope['method']} {route.path}" if route is not None else route_var.get()
+                extra = {"route": route, "status": status, "duration_ms": round(duur, 1)}
+                stats = request_stats.get()
+                if stats is not None:
+                    extra.update(queries=stats.queries, db_ms=round(stats.db_tijd * 1000, 1),
+                                 template_ms=round(stats.template_tijd * 1000, 1))
+                app_logger.debug("[Request] %s %s -> %s (%.1f ms, %s queries)", scope["method"], scope["path"],
+                                 status, duur, extra.get("queries", "?"), extra=extra)
+            request_id_var.reset(request_token)
+            route_var.reset(route_token)
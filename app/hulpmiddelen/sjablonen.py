@@ -0,0 +1,38 @@
+from typing import Optional
+
+from fastapi.templating import Jinja2Templates
+
+from .afbeeldingen import parse_variant_naam, variant_naam, FOTO_MATEN
+from .fotoverwerking import foto_in_verwerking
+from .metrics import TimedTemplate
+from .statisch import static_url
+
+# Gedeelde configuratie voor de Jinja2Templates van alle route modules:
+# filters en globals die in meerdere templates gebruikt worden, en het meten van de render tijd.
+
+def foto_variant(foto_url: Optional[str], maat: int, ext: str = "jpg") -> Optional[str]:
+    """URL van de foto in het kleinste formaat dat minstens `maat` pixels is.
+    Foto's van vóór de varianten hebben maar één formaat en worden ongewijzigd teruggegeven."""
+    if not foto_url:
+        return foto_url
+    map_url, _, bestandsnaam = foto_url.rpartition("/")
+    foto_hash = parse_variant_naam(bestandsnaam)
+    if foto_hash is None:
+        return foto_url
+    passend = min((m for m in FOTO_MATEN if m >= maat), default=max(FOTO_MATEN))
+    return f"{map_url}/{variant_naam(foto_hash, passend, ext)}"
+
+def foto_srcset(foto_url: Optional[str], maat: int, ext: str = "jpg") -> str:
+    """srcset met een 1x en 2x variant (voor schermen met hoge resolutie); leeg voor oude foto's."""
+    if not foto_url or parse_variant_naam(foto_url.rpartition("/")[2]) is None:
+        return ""
+    enkel, dubbel = foto_variant(foto_url, maat, ext), foto_variant(foto_url, maat * 2, ext)
+    return enkel if enkel == dubbel else f"{enkel} 1x, {dubbel} 2x"
+
+def configure_templates(templates: Jinja2Templates) -> Jinja2Templates:
+    templates.env.template_class = TimedTemplate
+    templates.env.filters["foto_variant"] = foto_variant
+    templates.env.filters["foto_srcset"]  = foto_srcset
+    templates.env.globals["foto_in_verwerking"] = foto_in_verwerking
+    templates.env.globals["static_url"] = static_url
+    return templates
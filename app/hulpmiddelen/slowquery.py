@@ -0,0 +1,60 @@
+import re
+import time
+
+from sqlalchemy import event
+
+from ..logging_config import log_slow_query, log_warning, route_var
+
+# Slow query log: statements die langer duren dan de drempel worden gelogd op niveau SLOW_QUERY,
+# met de parameters, de route van het request en het query plan. Alles op één regel, zodat
+# de log viewer (/admin/logs, filter SLOW_QUERY) ze volledig toont. Bijvoorbeeld:
+#   [SlowQuery] 152.3 ms route=GET /relaties/ sql=SELECT ... params=(5,) plan=SCAN relaties | ...
+# Een 'SCAN <tabel>' in het plan betekent meestal een ontbrekende index.
+
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+_UITLEGBAAR = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE)\b", re.IGNORECASE)
+_WITRUIMTE  = re.compile(r"\s+")
+MAX_PARAMS_LENGTE = 500
+
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not _UITLEGBAAR.match(statement):
+        return ""
+    # Via een eigen DBAPI cursor op dezelfde verbinding: dezelfde transactie, en geen engine events
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rijen = cursor.fetchall()
+    finally:
+        cursor.close()
+    if conn.dialect.name == "sqlite":
+        # (id, parent, notused, detail): alleen de omschrijving is interessant
+        return " | ".join(str(rij[-1]) for rij in rijen)
+    return " | ".join(str(rij[0]) for rij in rijen)
+
+def install_slow_query_log(sync_engine, drempel_ms: int, explain: bool = True):
+    drempel = drempel_ms / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _controleer(conn, cursor, statement, parameters, context, executemany):
+        duur = time.perf_counter() - conn.info["slow_query_start"].pop()
+        if duur < drempel:
+            return
+        plan = ""
+        if explain and not executemany:
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as e:
+                log_warning("[SlowQuery] EXPLAIN mislukt: %s", e)
+        params = repr(parameters)
+        if len(params) > MAX_PARAMS_LENGTE:
+            params = params[:MAX_PARAMS_LENGTE] + "..."
+        log_slow_query("[SlowQuery] %.1f ms route=%s sql=%s params=%s plan=%s", duur * 1000,
+                       route_var.get() or "-", _WITRUIMTE.sub(" ", statement).strip(), params, plan or "-")
@@ -0,0 +1,78 @@
+from sqlalchemy import and_, case, func, literal, or_
+from sqlmodel import select
+
+from ..models.models import Personen, Relaties, Relatietypes
+
+# Voorouders, nakomelingen en verwanten binnen N stappen van een persoon.
+# Elke opvraging is één query met een recursieve CTE: de database loopt de relaties af,
+# niet een Python lus met een query per generatie. De diepte is altijd begrensd.
+#
+# Welke relaties ouder/kind relaties zijn, staat per relatietype in Relatietypes.afstamming.
+
+OUDER = "ouder"  # persoon1 is ouder van persoon2
+KIND  = "kind"   # persoon1 is kind van persoon2
+AFSTAMMING = {
+    OUDER: "persoon 1 is ouder van persoon 2",
+    KIND:  "persoon 1 is kind van persoon 2",
+}
+
+VOOROUDERS   = "voorouders"
+NAKOMELINGEN = "nakomelingen"
+VERWANTEN    = "verwanten"
+
+def _kant(persoon_kolom, soort: str):
+    """Voorwaarde voor de relaties die vanaf de persoon in persoon_kolom een stap in de gevraagde richting zijn.
+    Bijvoorbeeld voor voorouders: de persoon is persoon2 van een 'ouder' relatie of persoon1 van een 'kind' relatie."""
+    if soort == VERWANTEN:
+        return or_(Relaties.persoon1_id == persoon_kolom, Relaties.persoon2_id == persoon_kolom)
+    als_persoon1, als_persoon2 = (KIND, OUDER) if soort == VOOROUDERS else (OUDER, KIND)
+    return or_(
+        and_(Relaties.persoon1_id == persoon_kolom, Relatietypes.afstamming == als_persoon1),
+        and_(Relaties.persoon2_id == persoon_kolom, Relatietypes.afstamming == als_persoon2),
+    )
+
+def _stap(persoon_kolom):
+    """De andere persoon van de relatie."""
+    return case((Relaties.persoon1_id == persoon_kolom, Relaties.persoon2_id), else_=Relaties.persoon1_id)
+
+def _bereik(soort: str, persoon_id: int, max_diepte: int):
+    """Recursieve CTE (persoon_id, diepte) van alle personen die vanaf persoon_id in hoogstens max_diepte
+    stappen bereikbaar zijn. De join op persoon1_id OR persoon2_id gebruikt beide indexen (MULTI-INDEX OR).
+    UNION (geen UNION ALL) houdt elke combinatie van persoon en diepte maar één keer, zodat een persoon
+    die via meerdere wegen bereikbaar is (bv. gedeelde voorouders) het aantal rijen niet laat exploderen."""
+    def relaties(query):
+        if soort == VERWANTEN:
+            return query
+        return query.join(Relatietypes, Relaties.relatietype_id == Relatietypes.id)
+
+    bereik = relaties(
+        select(_stap(persoon_id).label("persoon_id"), literal(1).label("diepte")).select_from(Relaties)
+    ).where(_kant(persoon_id, soort)).cte("bereik", recursive=True)
+    volgende = relaties(
+        select(_stap(bereik.c.persoon_id), bereik.c.diepte + 1).select_from(bereik).join(Relaties, _kant(bereik.c.persoon_id, soort))
+    ).where(bereik.c.diepte < max_diepte)
+    return bereik.union(volgende)
+
+def verwanten_query(soort: str, persoon_id: int, max_diepte: int):
+    """Select van (Personen, diepte), op kortste afstand per persoon, dichtstbijzijnde eerst.
+
+    soort: VOOROUDERS (ouders, grootouders, ...), NAKOMELINGEN (kinderen, kleinkinderen, ...) of
+    VERWANTEN (iedereen binnen max_diepte relaties, van welk type ook)."""
+    if soort not in (VOOROUDERS, NAKOMELINGEN, VERWANTEN):
+        raise ValueError(f"Onbekende soort: {soort}")
+
+    bereik = _bereik(soort, persoon_id, max_diepte)
+    per_persoon = select(bereik.c.persoon_id, func.min(bereik.c.diepte).label("diepte")).where(
+        bereik.c.persoon_id != persoon_id
+    ).group_by(bereik.c.persoon_id).subquery("per_persoon")
+    return select(Personen, per_persoon.c.diepte).join(
+        per_persoon, Personen.id == per_persoon.c.persoon_id
+    ).order_by(per_persoon.c.diepte, Personen.achternaam, Personen.voornaam, Personen.id)
+
+def generatie_naam(soort: str, diepte: int) -> str:
+    if soort == VERWANTEN:
+        return "1 stap" if diepte == 1 else f"{diepte} stappen"
+    namen = ("ouders", "grootouders", "overgrootouders") if soort == VOOROUDERS else ("kinderen", "kleinkinderen", "achterkleinkinderen")
+    if diepte <= len(namen):
+        return namen[diepte - 1].capitalize()
+    return f"{diepte} generaties"
@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from ..logging_config import log_debug, log_info
+from .afbeeldingen import parse_variant_naam
+
+# Cache-vriendelijk serveren van /static en /fotos.
+# - Bestanden met de actuele inhoudshash als versie in de URL (?v=<hash>, zie static_url) of een
+#   hash in de naam (de foto-varianten) veranderen nooit: die krijgen 'immutable' en een lange
+#   max-age. Een verouderde of verzonnen versie wordt gewoon gevalideerd.
+# - Overige bestanden mogen gecachet worden maar worden steeds gevalideerd (ETag / Last-Modified,
+#   een ongewijzigd bestand levert een 304 op).
+# - Ligt er naast een bestand een voorgecomprimeerde .br of .gz versie, dan wordt die
+#   geserveerd aan clients die dat ondersteunen.
+
+STATIC_DIR = Path(__file__).parent.parent.parent / "static"
+
+CACHE_IMMUTABLE   = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE  = "public, no-cache"
+COMPRIMEERBAAR    = {".css", ".js", ".svg", ".json", ".txt"}
+VOORGECOMPRIMEERD = (("br", ".br"), ("gzip", ".gz"))
+
+class CachedStaticFiles(StaticFiles):
+    def is_immutable(self, full_path, scope) -> bool:
+        versies = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v")
+        if versies:
+            try:
+                return versies[-1] == _bestand_hash(str(full_path), os.stat(full_path).st_mtime)
+            except FileNotFoundError:
+                return False
+        return parse_variant_naam(os.path.basename(full_path)) is not None
+
+    def _voorgecomprimeerd(self, full_path, request_headers: Headers):
+        geaccepteerd = {
+            deel.split(";")[0].strip() for deel in request_headers.get("accept-encoding", "").split(",")
+        }
+        for codering, extensie in VOORGECOMPRIMEERD:
+            if codering in geaccepteerd:
+                pad = f"{full_path}{extensie}"
+                try:
+                    return codering, pad, os.stat(pad)
+                except FileNotFoundError:
+                    continue
+        return None
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {
+            "Cache-Control": CACHE_IMMUTABLE if self.is_immutable(full_path, scope) else CACHE_REVALIDATE,
+        }
+
+        gecomprimeerd = None
+        if os.path.splitext(full_path)[1] in COMPRIMEERBAAR:
+            headers["Vary"] = "Accept-Encoding"
+            gecomprimeerd = self._voorgecomprimeerd(full_path, request_headers)
+
+        if gecomprimeerd is not None:
+            codering, pad, stat_gecomprimeerd = gecomprimeerd
+            headers["Content-Encoding"] = codering
+            # Het ETag volgt uit het gecomprimeerde bestand, en verschilt dus per codering
+            response = FileResponse(pad, status_code=status_code, stat_result=stat_gecomprimeerd, headers=headers,
+                                    media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain")
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+@lru_cache(maxsize=256)
+def _bestand_hash(pad: str, mtime: float) -> str:
+    with open(pad, "rb") as bestand:
+        return hashlib.sha256(bestand.read()).hexdigest()[:10]
+
+def static_url(path: str) -> str:
+    """URL naar een bestand in /static met de inhoudshash als versie, bv.
+    static_url('css/custom.css') -> /static/css/custom.css?v=1a2b3c4d5e"""
+    path = path.lstrip("/")
+    volledig = STATIC_DIR / path
+    try:
+        versie = _bestand_hash(str(volledig), volledig.stat().st_mtime)
+    except FileNotFoundError:
+        return f"/static/{path}"
+    return f"/static/{path}?v={versie}"
+
+def comprimeer_statisch(directory: Path = STATIC_DIR) -> int:
+    """Maakt .gz (en met het 'brotli' package ook .br) versies van de comprimeerbare bestanden,
+    voor zover die ontbreken of ouder zijn dan het origineel. Geeft het aantal geschreven bestanden."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    geschreven = 0
+    for pad in Path(directory).rglob("*"):
+        if pad.suffix not in COMPRIMEERBAAR or not pad.is_file():
+            continue
+        inhoud = None
+        for extensie, comprimeer in ((".gz", lambda data: gzip.compress(data, 9, mtime=0)),
+                                     (".br", brotli.compress if brotli else None)):
+            doel = pad.with_name(pad.name + extensie)
+            if comprimeer is None or (doel.exists() and doel.stat().st_mtime >= pad.stat().st_mtime):
+                continue
+            if inhoud is None:
+                inhoud = pad.read_bytes()
+            doel.write_bytes(comprimeer(inhoud))
+            geschreven += 1
+            log_debug("[Statisch] %s aangemaakt", doel)
+    if geschreven:
+        log_info("[Statisch] %s voorgecomprimeerde bestanden aangemaakt in %s", geschreven, directory)
+    return geschreven
@@ -0,0 +1,44 @@
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..logging_config import log_info
+
+# Begrenst de grootte van multipart requests (formulieren met een foto).
+# Een request met een te grote Content-Length wordt geweigerd vóórdat de body gelezen wordt;
+# zonder (of met een onjuiste) Content-Length wordt meegeteld tijdens het lezen.
+# De fout ontstaat binnen de route (bij het parsen van het formulier), zodat de gewone
+# HTTPException handler een 413 pagina toont.
+
+class UploadLimietMiddleware:
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app       = app
+        self.max_bytes = max_bytes
+
+    def _te_groot(self, scope: Scope, aantal) -> HTTPException:
+        log_info("[Upload] %s: request van %s bytes geweigerd (maximaal %s)", scope['path'], aantal, self.max_bytes)
+        return HTTPException(status_code=413, detail=f"Upload te groot (maximaal {self.max_bytes // (1024 * 1024)} MB)")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get("content-length")
+        aangekondigd = int(content_length) if content_length and content_length.isdigit() else None
+        ontvangen = 0
+
+        async def begrensde_receive() -> Message:
+            nonlocal ontvangen
+            if aangekondigd is not None and aangekondigd > self.max_bytes:
+                raise self._te_groot(scope, aangekondigd)
+            message = await receive()
+            if message["type"] == "http.request":
+                ontvangen += len(message.get("body", b""))
+                if ontvangen > self.max_bytes:
+                    raise self._te_groot(scope, f"meer dan {ontvangen}")
+            return message
+
+        await self.app(scope, begrensde_receive, send)
@@ -0,0 +1,177 @@
+from array import array
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .stamboom import OUDER, KIND
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+MET_SCIPY = np is not None
+
+# Verwantschap tussen alle paren uit een selectie personen in één keer, voor rapportages.
+#
+# - afstand: het kleinste aantal relaties (van welk type ook) tussen twee personen, tot max_afstand.
+# - coefficient: de verwantschapscoëfficiënt via de ouder/kind relaties (Relatietypes.afstamming):
+#   ouder-kind en broer/zus 0.5, grootouder en oom/tante 0.25, neef/nicht 0.125, aangetrouwd 0.
+#
+# Met numpy/scipy (in requirements.txt) gaat alles via sparse matrices:
+# - R_h = "binnen h stappen bereikbaar" per geselecteerde persoon (selectie x personen). Twee
+#   personen liggen binnen d stappen als hun bollen met straal ceil(d/2) en floor(d/2) elkaar
+#   raken, dus de paren binnen d zijn de niet-nullen van R_ceil(d/2) @ R_floor(d/2).T. De bollen
+#   blijven zo half zo groot als bij zoeken vanaf één kant.
+# - T = (I - P/2)^-1 beperkt tot de selectie (P: kind x ouder), als som van (P/2)^n per generatie;
+#   de verwantschapsmatrix is T @ D @ T.T met D het Mendeliaanse deel per persoon (1 zonder
+#   bekende ouders, 3/4 met één, 1/2 met twee; inteelt niet meegerekend).
+# Zonder numpy/scipy (bv. een installatie zonder die packages) wordt hetzelfde in Python berekend,
+# met een breadth-first search per persoon; dat is veel trager, zie de lagere grenzen in routes/admin.py.
+
+# Voorouders die via een weg minder dan dit gewicht bijdragen ((1/2)^20: twintig generaties terug)
+# tellen niet meer mee. Zonder die grens bevat elke rij van T bij een diepe, dichte stamboom
+# uiteindelijk vrijwel iedereen, terwijl de coëfficiënt er niet meer merkbaar door verandert.
+MIN_GEWICHT = 2.0 ** -20
+
+class Verwantschap(NamedTuple):
+    persoon1_id: int
+    persoon2_id: int
+    afstand: int
+    coefficient: float
+
+def _ouders(persoon1, persoon2, relatietype, afstamming: Dict[int, Optional[str]]) -> Dict[int, List[int]]:
+    """Ouders per persoon volgens de relaties met een ingestelde afstamming."""
+    ouders: Dict[int, set] = defaultdict(set)
+    for p1, p2, type_id in zip(persoon1, persoon2, relatietype):
+        soort = afstamming.get(type_id)
+        if soort == OUDER:
+            ouders[p2].add(p1)
+        elif soort == KIND:
+            ouders[p1].add(p2)
+    return {kind: sorted(ouders_) for kind, ouders_ in ouders.items() if kind not in ouders_}
+
+def _mendeliaans(aantal_ouders: int) -> float:
+    return 1.0 if aantal_ouders == 0 else 0.75 if aantal_ouders == 1 else 0.5
+
+def verwantschap(persoon1: Sequence[int], persoon2: Sequence[int], relatietype: Sequence[int],
+                 afstamming: Dict[int, Optional[str]], personen: Sequence[int],
+                 max_afstand: int, max_generaties: int) -> List[Verwantschap]:
+    """Alle paren (persoon1_id < persoon2_id) uit `personen` binnen max_afstand relaties, dichtstbij
+    eerst. persoon1/persoon2/relatietype: parallelle kolommen van de relaties (zie RelatieGraaf.kanten);
+    afstamming: Relatietypes.afstamming per relatietype id."""
+    personen = sorted(set(personen))
+    ouders = _ouders(persoon1, persoon2, relatietype, afstamming)
+    if MET_SCIPY:
+        paren = _met_scipy(persoon1, persoon2, ouders, personen, max_afstand, max_generaties)
+    else:
+        paren = _zonder_scipy(persoon1, persoon2, ouders, personen, max_afstand, max_generaties)
+    return sorted(paren, key=lambda paar: (paar.afstand, -paar.coefficient, paar.persoon1_id, paar.persoon2_id))
+
+def _coefficient(verwant: float, eigen1: float, eigen2: float) -> float:
+    # Genormaliseerd op de eigen verwantschap (1 zonder inteelt): blijft zo altijd tussen 0 en 1
+    return round(float(verwant / (eigen1 * eigen2) ** 0.5), 6) if verwant > 0 else 0.0
+
+# Met numpy/scipy
+
+def _met_scipy(persoon1, persoon2, ouders, personen, max_afstand, max_generaties) -> List[Verwantschap]:
+    p1 = np.frombuffer(array('q', persoon1), dtype=np.int64)
+    p2 = np.frombuffer(array('q', persoon2), dtype=np.int64)
+    # Persoon ids direct als index: ids zijn oplopend met hooguit wat gaten
+    n = int(max(p1.max(initial=0), p2.max(initial=0), max(personen, default=0), max(ouders, default=0))) + 1
+    aantal = len(personen)
+    selectie = sparse.csr_matrix((np.ones(aantal, dtype=np.float32), (np.arange(aantal), personen)), shape=(aantal, n))
+
+    buren = sparse.csr_matrix((np.ones(len(p1), dtype=np.float32), (p1, p2)), shape=(n, n))
+    buren = (buren + buren.T).tocsr()
+
+    # Bollen R_0 .. R_ceil(max_afstand/2)
+    bollen = [selectie]
+    for _ in range((max_afstand + 1) // 2):
+        bol = (bollen[-1] + bollen[-1] @ buren).tocsr()
+        bol.data[:] = 1
+        bollen.append(bol)
+
+    afstand = np.full((aantal, aantal), -1, dtype=np.int16)
+    np.fill_diagonal(afstand, 0)
+    for d in range(1, max_afstand + 1):
+        raakt = (bollen[(d + 1) // 2] @ bollen[d // 2].T).tocoo()
+        nieuw = afstand[raakt.row, raakt.col] < 0
+        afstand[raakt.row[nieuw], raakt.col[nieuw]] = d
+
+    # T beperkt tot de selectie: som over de generaties van (P/2)^g
+    kinderen = [kind for kind, ouders_ in ouders.items() for _ in ouders_]
+    ouders_kolom = [ouder for ouders_ in ouders.values() for ouder in ouders_]
+    halve_p = sparse.csr_matrix((np.full(len(kinderen), 0.5), (kinderen, ouders_kolom)), shape=(n, n))
+    mendeliaans = np.ones(n)
+    for kind, ouders_ in ouders.items():
+        mendeliaans[kind] = _mendeliaans(len(ouders_))
+    generatie = selectie.astype(np.float64)
+    t = generatie
+    for _ in range(max_generaties):
+        generatie = (generatie @ halve_p).tocsr()
+        generatie.data[generatie.data < MIN_GEWICHT] = 0
+        generatie.eliminate_zeros()
+        if generatie.nnz == 0:
+            break
+        t = t + generatie
+    verwant = (t @ sparse.diags(mendeliaans) @ t.T).tocsr()
+    eigen = verwant.diagonal()
+
+    rij, kolom = np.nonzero(np.triu(afstand >= 1))
+    waarden = np.asarray(verwant[rij, kolom]).ravel() if len(rij) else np.zeros(0)
+    return [
+        Verwantschap(personen[i], personen[j], int(afstand[i, j]), _coefficient(float(w), eigen[i], eigen[j]))
+        for i, j, w in zip(rij.tolist(), kolom.tolist(), waarden.tolist())
+    ]
+
+# Zonder numpy/scipy
+
+def _zonder_scipy(persoon1, persoon2, ouders, personen, max_afstand, max_generaties) -> List[Verwantschap]:
+    buren: Dict[int, List[int]] = defaultdict(list)
+    for p1, p2 in zip(persoon1, persoon2):
+        buren[p1].append(p2)
+        buren[p2].append(p1)
+    index = {persoon: i for i, persoon in enumerate(personen)}
+
+    def voorouders(persoon) -> Dict[int, float]:
+        """Rij van T: persoon zelf 1, elke voorouder (1/2)^generaties, opgeteld over alle wegen."""
+        t = {persoon: 1.0}
+        generatie = {persoon: 1.0}
+        for _ in range(max_generaties):
+            volgende = defaultdict(float)
+            for kind, gewicht in generatie.items():
+                for ouder in ouders.get(kind, ()):
+                    volgende[ouder] += gewicht / 2
+            volgende = {voorouder: gewicht for voorouder, gewicht in volgende.items() if gewicht >= MIN_GEWICHT}
+            if not volgende:
+                break
+            for voorouder, gewicht in volgende.items():
+                t[voorouder] = t.get(voorouder, 0.0) + gewicht
+            generatie = volgende
+        return t
+
+    def verwant(t1: Dict[int, float], t2: Dict[int, float]) -> float:
+        if len(t2) < len(t1):
+            t1, t2 = t2, t1
+        return sum(gewicht * t2[voorouder] * _mendeliaans(len(ouders.get(voorouder, ())))
+                   for voorouder, gewicht in t1.items() if voorouder in t2)
+
+    rijen = {persoon: voorouders(persoon) for persoon in personen}
+    eigen = {persoon: verwant(rijen[persoon], rijen[persoon]) for persoon in personen}
+
+    paren = []
+    for persoon in personen:
+        gezien = {persoon}
+        grens = [persoon]
+        for d in range(1, max_afstand + 1):
+            volgende = []
+            for huidige in grens:
+                for buur in buren.get(huidige, ()):
+                    if buur not in gezien:
+                        gezien.add(buur)
+                        volgende.append(buur)
+                        if index.get(buur, -1) > index[persoon]:
+                            paren.append(Verwantschap(persoon, buur, d, _coefficient(
+                                verwant(rijen[persoon], rijen[buur]), eigen[persoon], eigen[buur])))
+            grens = volgende
+    return paren
@@ -0,0 +1,158 @@
+import re
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlmodel import SQLModel, or_
+
+from ..models.models import Personen, Families, Jubilea, Jubileumtypes, Relatietypes, Relaties
+from ..logging_config import log_debug, log_info
+
+# Full-text zoekindex op basis van SQLite FTS5.
+# Per brontabel is er een FTS5 tabel met 'external content' (de tekst staat alleen in de
+# brontabel); triggers houden de index bij op elke INSERT/UPDATE/DELETE, ook buiten de ORM om.
+# Op andere databases (of zonder FTS5) vallen de zoekfuncties terug op ILIKE.
+
+FTS_TABELLEN = {
+    "personen":      ["voornaam", "achternaam"],
+    "families":      ["familienaam", "straatnaam", "postcode", "plaats"],
+    "jubilea":       ["jubileumnaam", "omschrijving"],
+    "jubileumtypes": ["naam"],
+    "relatietypes":  ["relatienaam"],
+}
+
+def fts_tabel(tabel: str) -> str:
+    return f"{tabel}_fts"
+
+def _ddl(tabel: str, kolommen: list) -> list:
+    fts = fts_tabel(tabel)
+    cols = ", ".join(kolommen)
+    new_cols = ", ".join(f"new.{c}" for c in kolommen)
+    old_cols = ", ".join(f"old.{c}" for c in kolommen)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{tabel}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabel} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabel} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabel} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+def create_search_index(connection):
+    """Maakt de FTS5 tabellen en triggers aan (idempotent) en vult nieuwe indexen."""
+    if connection.dialect.name != "sqlite":
+        return
+    for tabel, kolommen in FTS_TABELLEN.items():
+        fts = fts_tabel(tabel)
+        bestaat = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).first()
+        for statement in _ddl(tabel, kolommen):
+            connection.exec_driver_sql(statement)
+        if not bestaat:
+            log_info("[Zoekindex] %s aangemaakt, index wordt gevuld", fts)
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def _create_search_index_after_create(target, connection, **kw):
+    create_search_index(connection)
+
+def fts_query(search_term: str) -> Optional[str]:
+    """Zet een zoekterm om naar een FTS5 query: elk woord als prefix, alle woorden verplicht."""
+    woorden = re.findall(r"\w+", search_term or "")
+    if not woorden:
+        return None
+    return " ".join(f'"{woord}"*' for woord in woorden)
+
+def fts_available(session) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+def _fts(tabel: str):
+    fts = fts_tabel(tabel)
+    return sa.table(fts, sa.column("rowid"), sa.column("rank"), sa.column(fts))
+
+def match_ids(tabel: str, query: str):
+    fts = _fts(tabel)
+    return sa.select(fts.c.rowid).where(fts.c[fts_tabel(tabel)].op("MATCH")(query))
+
+def _rank_subquery(tabel: str, query: str, naam: Optional[str] = None):
+    fts = _fts(tabel)
+    return (
+        sa.select(fts.c.rowid.label("id"), fts.c.rank.label("rank"))
+        .where(fts.c[fts_tabel(tabel)].op("MATCH")(query))
+        .subquery(naam or f"{tabel}_treffers")
+    )
+
+def _ilike(kolommen, search_term):
+    return or_(*[kolom.ilike(f"%{search_term}%") for kolom in kolommen])
+
+def search_personen(session, query, search_term: str):
+    """Filtert een select(Personen ...) op de zoekterm, beste treffers eerst."""
+    q = fts_query(search_term)
+    if q is None:
+        return query
+    if not fts_available(session):
+        return query.where(_ilike([Personen.voornaam, Personen.achternaam], search_term))
+    treffers = _rank_subquery("personen", q)
+    log_debug("[Zoekindex] personen MATCH %s", q)
+    return query.join(treffers, treffers.c.id == Personen.id).order_by(treffers.c.rank)
+
+def search_families(session, query, search_term: str):
+    q = fts_query(search_term)
+    if q is None:
+        return query
+    if not fts_available(session):
+        return query.where(_ilike([Families.familienaam, Families.straatnaam, Families.postcode, Families.plaats], search_term))
+    treffers = _rank_subquery("families", q)
+    log_debug("[Zoekindex] families MATCH %s", q)
+    return query.join(treffers, treffers.c.id == Families.id).order_by(treffers.c.rank)
+
+def search_jubilea(session, query, search_term: str):
+    """Zoekt op jubileumnaam/omschrijving, de naam van de persoon en het jubileumtype.
+    Verwacht een query waarin Personen en Jubileumtypes al gejoind zijn."""
+    q = fts_query(search_term)
+    if q is None:
+        return query
+    if not fts_available(session):
+        return query.where(_ilike([Personen.voornaam, Personen.achternaam, Jubilea.omschrijving,
+                                   Jubilea.jubileumnaam, Jubileumtypes.naam], search_term))
+    treffers = _rank_subquery("jubilea", q)
+    log_debug("[Zoekindex] jubilea MATCH %s", q)
+    # Directe treffers op het jubileum eerst (op rank), daarna treffers via persoon of type
+    return (
+        query.outerjoin(treffers, treffers.c.id == Jubilea.id)
+        .where(or_(
+            treffers.c.id.is_not(None),
+            Jubilea.persoon_id.in_(match_ids("personen", q)),
+            Jubilea.jubileumtype_id.in_(match_ids("jubileumtypes", q)),
+        ))
+        .order_by(treffers.c.rank.is_(None), treffers.c.rank, Jubilea.id)
+    )
+
+def search_relaties(session, query, search_term: str, persoon1, persoon2):
+    """Zoekt op de namen van beide personen en de relatienaam.
+    `persoon1` en `persoon2` zijn de aliassen van Personen die in de query gebruikt worden."""
+    q = fts_query(search_term)
+    if q is None:
+        return query
+    if not fts_available(session):
+        return query.where(_ilike([persoon1.voornaam, persoon1.achternaam, persoon2.voornaam,
+                                   persoon2.achternaam, Relatietypes.relatienaam], search_term))
+    log_debug("[Zoekindex] relaties MATCH %s", q)
+    # Relaties hebben geen eigen index: de rank is de som van de ranks van de treffers op beide
+    # personen en het relatietype (FTS5 rank is negatief, lager is beter), zodat een relatie die
+    # op meer delen treft eerst komt
+    treffers1 = _rank_subquery("personen", q, "persoon1_treffers")
+    treffers2 = _rank_subquery("personen", q, "persoon2_treffers")
+    typen     = _rank_subquery("relatietypes", q)
+    rank = sum(sa.func.coalesce(treffers.c.rank, 0) for treffers in (treffers1, treffers2, typen))
+    return (
+        query.outerjoin(treffers1, treffers1.c.id == Relaties.persoon1_id)
+        .outerjoin(treffers2, treffers2.c.id == Relaties.persoon2_id)
+        .outerjoin(typen, typen.c.id == Relaties.relatietype_id)
+        .where(or_(treffers1.c.id.is_not(None), treffers2.c.id.is_not(None), typen.c.id.is_not(None)))
+        .order_by(rank, Relaties.id)
+    )
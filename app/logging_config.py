@@ -1,27 +1,82 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from config import get_settings
 import os
 
 settings    = get_settings()
 DEVELOPMENT = settings.DEVELOPMENT
 
+# Per request gezet door RequestLogMiddleware (hulpmiddelen/requestlog.py) en aan elke logregel toegevoegd
+request_id_var: ContextVar = ContextVar('request_id', default=None)
+route_var     : ContextVar = ContextVar('route', default=None)
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+
+# Eigen niveau voor trage queries (zie database.py), tussen INFO en WARNING, zodat ze in de
+# log viewer apart te filteren zijn
+SLOW_QUERY = 25
+logging.addLevelName(SLOW_QUERY, 'SLOW_QUERY')
+
 def get_log_level():  # DEVELOPMENT or PRODUCTION
     if DEVELOPMENT:
         return logging.DEBUG
     else:
         return logging.ERROR
 
-def setup_logger(name, log_file, level=logging.DEBUG):
-    """Function to setup as many loggers as you want"""
+class RequestContextFilter(logging.Filter):
+    """Voegt request id en route toe aan een record. Draait in de aanroepende thread,
+    dus vóór de queue, zodat de context van het request nog beschikbaar is."""
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, 'route'):
+            record.route = route_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Eén JSON object per regel. 'time' en 'level' staan vooraan (zie hulpmiddelen/logindex.py)."""
+    VELDEN = ('request_id', 'route', 'status', 'duration_ms', 'queries', 'db_ms', 'template_ms')
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'logger': record.name,
+        }
+        for veld in self.VELDEN:
+            waarde = getattr(record, veld, None)
+            if waarde is not None:
+                data[veld] = waarde
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+def _formatter(log_format):
+    if log_format == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+_listeners = []
+
+def setup_logger(name, log_file, level=logging.DEBUG, log_format=None, use_queue=None):
+    """Function to setup as many loggers as you want
+
+    Met use_queue schrijven de handlers in een aparte thread (QueueListener); een log-aanroep
+    in een request zet alleen een record in de queue."""
+    log_format = log_format or settings.LOG_FORMAT
+    use_queue  = settings.LOG_QUEUE if use_queue is None else use_queue
 
     # Zorg ervoor dat de log directory bestaat
     log_dir = os.path.dirname(log_file)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    # formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s:%(lineno)d %(message)s')
-    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    formatter = _formatter(log_format)
 
     # File handler
     file_handler = RotatingFileHandler(log_file, maxBytes=10000000, backupCount=5)
@@ -35,27 +90,47 @@ def setup_logger(name, log_file, level=logging.DEBUG):
 
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addFilter(RequestContextFilter())
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        listener  = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        logger.addHandler(QueueHandler(log_queue))
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
 
     return logger
 
+@atexit.register
+def stop_logging():
+    """Schrijft de resterende records in de queues weg."""
+    while _listeners:
+        _listeners.pop().stop()
+
 # Gebruik de functie om een logger op te zetten
 app_logger = setup_logger('app_logger', 'logs/app.log')
 
-def log_debug(message):
+# Berichten met %-placeholders worden pas geformatteerd als het niveau aan staat,
+# bv. log_debug("[Zoeken] q=%r", q) in plaats van log_debug(f"[Zoeken] q={q!r}").
+
+def log_debug(message, *args):
     if DEVELOPMENT:
-        app_logger.debug(message)
+        app_logger.debug(message, *args)
 
-def log_info(message):
+def log_info(message, *args):
     if DEVELOPMENT:
-        app_logger.info(message)
+        app_logger.info(message, *args)
+
+def log_warning(message, *args):
+    app_logger.warning(message, *args)
 
-def log_warning(message):
-    app_logger.warning(message)
+def log_error(message, *args):
+    app_logger.error(message, *args)
 
-def log_error(message):
-    app_logger.error(message)
+def log_critical(message, *args):
+    app_logger.critical(message, *args)
 
-def log_critical(message):
-    app_logger.critical(message)
+def log_slow_query(message, *args):
+    app_logger.log(SLOW_QUERY, message, *args)
@@ -1,15 +1,24 @@
 from fastapi import FastAPI, Depends, Request, HTTPException, Form, Query
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, or_, and_
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import aliased
 from pathlib import Path
-from .database import get_session, create_db_and_tables, engine
+from .database import get_read_session, create_db_and_tables, engine, async_engine, read_engine, log_engine_settings
 from .models.models import Families, Personen, Jubilea, Relatietypes, Relaties, Jubileumtypes
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from .routes import families, relatietypes, jubilea, personen, relaties, jubileumtypes, gebruikers, admin
+from .routes import families, relatietypes, jubilea, personen, relaties, jubileumtypes, gebruikers, admin, zoeken
 from .logging_config import app_logger, log_info, log_debug
+from .hulpmiddelen.kalender import maand_dag_bereiken, volgende_jubileumdatum
+from .hulpmiddelen.cache import get_cache, UPCOMING_EVENTS
+from .hulpmiddelen import fotoverwerking
+from .hulpmiddelen.sjablonen import configure_templates
+from .hulpmiddelen.statisch import CachedStaticFiles, comprimeer_statisch
+from .hulpmiddelen.uploadlimiet import UploadLimietMiddleware
+from .hulpmiddelen.requestlog import RequestLogMiddleware
+from .hulpmiddelen.metrics import MetricsMiddleware
 from .auth import router as auth_router, login_required #, AuthMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,14 +27,14 @@ import os
 
 settings = get_settings()
 log_info("[MAIN] Applicatie My_Relations gestart...")
-log_debug(f"[MAIN] Settings: {settings}")
+log_debug("[MAIN] Settings: %s", settings)
 
 app = FastAPI()
 
 # Monteer de static directory
 base_path = Path(__file__).parent.parent
-app.mount("/static", StaticFiles(directory=base_path / "static"), name="static")
-templates = Jinja2Templates(directory=base_path / "templates")
+app.mount("/static", CachedStaticFiles(directory=base_path / "static"), name="static")
+templates = configure_templates(Jinja2Templates(directory=base_path / "templates"))
 
 # Monteer de foto directory
 foto_path = Path(settings.FOTO_DIR)
@@ -41,7 +50,7 @@ if os.access(foto_path, os.W_OK):
     print(f"FOTO_DIR is writable: {foto_path}")
 else:
     print(f"WARNING: FOTO_DIR is not writable: {foto_path}")
-app.mount("/fotos", StaticFiles(directory=settings.FOTO_DIR), name="fotos")
+app.mount("/fotos", CachedStaticFiles(directory=settings.FOTO_DIR), name="fotos")
 
 # Voeg SessionMiddleware toe
 log_info("[MAIN] Adding SessionMiddleware")
@@ -61,6 +70,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+log_info("[MAIN] Adding UploadLimietMiddleware (max %s bytes)", settings.MAX_UPLOAD_BYTES)
+app.add_middleware(UploadLimietMiddleware, max_bytes=settings.MAX_UPLOAD_BYTES)
+# De laatst toegevoegde middleware is de buitenste: request id, duur en metrics omvatten het hele request
+log_info("[MAIN] Adding RequestLogMiddleware")
+app.add_middleware(RequestLogMiddleware)
+log_info("[MAIN] Adding MetricsMiddleware")
+app.add_middleware(MetricsMiddleware)
 
 # Inclusie van de diverse blueprints
 app.include_router(families.router, prefix="/families", tags=["families"])
@@ -71,12 +87,24 @@ app.include_router(relaties.router, prefix="/relaties", tags=["relaties"])
 app.include_router(jubileumtypes.router, prefix="/jubileumtypes", tags=["jubileumtypes"])
 app.include_router(gebruikers.router, prefix="/users", tags=["gebruikers"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(zoeken.router, prefix="/search", tags=["zoeken"])
 
 app.include_router(auth_router, tags=["auth"])
 
-# @app.on_event("startup")
-# async def startup_event():
+@app.on_event("startup")
+async def startup_event():
     # create_db_and_tables()
+    await log_engine_settings()
+    comprimeer_statisch(base_path / "static")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Lopende fotoverwerking afmaken voordat de database connecties sluiten
+    await fotoverwerking.shutdown()
+    # Gepoolde connecties netjes sluiten (aiosqlite houdt per connectie een thread open)
+    await async_engine.dispose()
+    if read_engine is not async_engine:
+        await read_engine.dispose()
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -95,22 +123,54 @@ async def check_session(request: Request):
     else:
         return {"session_exists": False}
 
-def get_upcoming_events(session: Session):
+async def get_spouses(session: AsyncSession, persoon_ids):
+    """Geeft per persoon-id de echtgeno(o)t(e) terug, voor alle personen tegelijk."""
+    if not persoon_ids:
+        return {}
+
+    Persoon1 = aliased(Personen)
+    Persoon2 = aliased(Personen)
+    results = (await session.exec(
+        select(Persoon1, Persoon2)
+        .select_from(Relaties)
+        .join(Persoon1, Relaties.persoon1_id == Persoon1.id)
+        .join(Persoon2, Relaties.persoon2_id == Persoon2.id)
+        .join(Relatietypes, Relaties.relatietype_id == Relatietypes.id)
+        .where(Relatietypes.relatienaam == "is gehuwd met")
+        .where(or_(Relaties.persoon1_id.in_(persoon_ids), Relaties.persoon2_id.in_(persoon_ids)))
+        .order_by(Relaties.id)
+    )).all()
+
+    spouses = {}
+    for persoon1, persoon2 in results:
+        if persoon1.id in persoon_ids:
+            spouses.setdefault(persoon1.id, persoon2)
+        if persoon2.id in persoon_ids:
+            spouses.setdefault(persoon2.id, persoon1)
+    return spouses
+
+async def get_upcoming_events(session: AsyncSession):
     today = date.today()
     end_date = today + relativedelta(months=1)
-    
-    jubilea = session.exec(
+
+    # Alleen de jubilea binnen het venster ophalen via de geïndexeerde maanddag
+    bereiken = maand_dag_bereiken(today, end_date)
+    jubilea = (await session.exec(
         select(Jubilea, Personen, Jubileumtypes)
         .outerjoin(Personen)
         .join(Jubileumtypes)
-    ).all()
+        .where(or_(*[Jubilea.jubileum_maanddag.between(van, tot) for van, tot in bereiken]))
+    )).all()
+    
+    # Partners voor alle trouwdagen in één query ophalen (geen query per jubileum)
+    spouses = await get_spouses(session, {
+        persoon.id for _, persoon, jubileumtype in jubilea if persoon and jubileumtype.naam == "Trouwdag"
+    })
     
     upcoming_events = []
     for jubileum, persoon, jubileumtype in jubilea:
-        event_date = date.fromisoformat(jubileum.jubileumdag)
-        this_year_event = event_date.replace(year=today.year)
-        if this_year_event < today:
-            this_year_event = this_year_event.replace(year=today.year + 1)
+        event_date = jubileum.jubileumdag
+        this_year_event = volgende_jubileumdatum(event_date, today)
         
         if today <= this_year_event <= end_date:
             if jubileumtype.naam == "Geboortedag" and persoon:
@@ -120,15 +180,7 @@ def get_upcoming_events(session: Session):
                 else:
                     event_description = f"zou {age} jaar zijn geworden."
             elif jubileumtype.naam == "Trouwdag" and persoon:  # Voor dit Jubileum is de partner nodig
-                spouse = session.exec(
-                    select(Personen)
-                    .join(Relaties, or_(
-                        and_(Relaties.persoon1_id == Personen.id, Relaties.persoon2_id == persoon.id),
-                        and_(Relaties.persoon2_id == Personen.id, Relaties.persoon1_id == persoon.id)
-                    ))
-                    .join(Relatietypes)
-                    .where(Relatietypes.relatienaam == "is gehuwd met")
-                ).first()
+                spouse = spouses.get(persoon.id)
                 
                 years = this_year_event.year - event_date.year
                 if spouse:
@@ -185,11 +237,13 @@ async def welcome(
 
 @app.get("/home", response_class=HTMLResponse)
 @login_required
-async def home(request: Request, session: Session = Depends(get_session)):
+async def home(request: Request, session: AsyncSession = Depends(get_read_session)):
     log_info("[MAIN] Handling request to /home")
     
-    # Implementeer hier je bestaande home-logica
-    upcoming_events = get_upcoming_events(session)
+    # De lijst is voor alle gebruikers gelijk: per dag cachen, wijzigingen invalideren de cache
+    upcoming_events = await get_cache(UPCOMING_EVENTS, settings.UPCOMING_EVENTS_CACHE_TTL).get_or_compute_async(
+        date.today(), lambda: get_upcoming_events(session)
+    )
     auth_error = request.cookies.get("auth_error")
 
     response = templates.TemplateResponse("index.html", {
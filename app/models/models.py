@@ -1,6 +1,7 @@
 from typing import Optional, List
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
-from datetime import datetime
+from datetime import datetime, date
 
 class Rollen(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -13,7 +14,7 @@ class Gebruikers(SQLModel, table=True):
     email: str = Field(unique=True, index=True)
     naam: str
     google_id: str = Field(unique=True, index=True)
-    rol_id: Optional[int] = Field(default=None, foreign_key="rollen.id")
+    rol_id: Optional[int] = Field(default=None, foreign_key="rollen.id", index=True)
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     last_login: Optional[datetime] = Field(default=None)
@@ -26,7 +27,7 @@ class Gebruikers(SQLModel, table=True):
 
 class Families(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    familienaam: str
+    familienaam: str = Field(index=True)
     straatnaam: str
     huisnummer: str
     huisnummer_toevoeging: Optional[str] = None
@@ -34,22 +35,26 @@ class Families(SQLModel, table=True):
     plaats: str
     
     personen: List["Personen"] = Relationship(back_populates="familie")
-    created_by: Optional[int] = Field(default=None, foreign_key="gebruikers.id")
+    created_by: Optional[int] = Field(default=None, foreign_key="gebruikers.id", index=True)
     creator: Optional[Gebruikers] = Relationship(back_populates="created_families")
 
 class Personen(SQLModel, table=True):
+    # Voor de lijst gesorteerd op achternaam (en zoeken op naam); de keyset paginering sorteert
+    # op (achternaam, id) en in een SQLite index zit het id (rowid) er al achter
+    __table_args__ = (Index("ix_personen_achternaam_voornaam", "achternaam", "voornaam"),)
+
     id:         Optional[int] = Field(default=None, primary_key=True)
-    voornaam:   str
+    voornaam:   str           = Field(index=True)
     achternaam: str
     leeft:      bool          = Field(default=True, nullable=False)
-    familie_id: Optional[int] = Field(default=None, foreign_key="families.id")
+    familie_id: Optional[int] = Field(default=None, foreign_key="families.id", index=True)
     foto_url:   Optional[str] = Field(default=None)
 
     familie:               Optional[Families]   = Relationship(back_populates="personen")
-    jubilea:               List["Jubilea"]      = Relationship(back_populates="persoon")
+    jubilea:               List["Jubilea"]      = Relationship(back_populates="persoon", sa_relationship_kwargs={"order_by": "Jubilea.jubileumdag"})
     relaties_als_persoon1: List["Relaties"]     = Relationship(back_populates="persoon1", sa_relationship_kwargs={"foreign_keys": "[Relaties.persoon1_id]"})
     relaties_als_persoon2: List["Relaties"]     = Relationship(back_populates="persoon2", sa_relationship_kwargs={"foreign_keys": "[Relaties.persoon2_id]"})
-    created_by:            Optional[int]        = Field(default=None, foreign_key="gebruikers.id")
+    created_by:            Optional[int]        = Field(default=None, foreign_key="gebruikers.id", index=True)
     creator:               Optional[Gebruikers] = Relationship(back_populates="created_personen")
 
 class Jubileumtypes(SQLModel, table=True):
@@ -60,31 +65,35 @@ class Jubileumtypes(SQLModel, table=True):
 
 class Jubilea(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    jubileumdag: str
+    jubileumdag: date = Field(index=True)
+    jubileum_maanddag: Optional[int] = Field(default=None, index=True)  # MMDD van jubileumdag, zie hulpmiddelen/kalender.py
     omschrijving: Optional[str] = Field(default=None)
-    jubileumnaam: str  # Changed to required field
+    jubileumnaam: str = Field(index=True)  # Changed to required field
     url: Optional[str] = Field(default=None)
-    persoon_id: Optional[int] = Field(default=None, foreign_key="personen.id")
-    jubileumtype_id: Optional[int] = Field(foreign_key="jubileumtypes.id", nullable=True)
+    persoon_id: Optional[int] = Field(default=None, foreign_key="personen.id", index=True)
+    jubileumtype_id: Optional[int] = Field(foreign_key="jubileumtypes.id", nullable=True, index=True)
     foto_url: Optional[str] = Field(default=None)
     
     persoon: "Personen" = Relationship(back_populates="jubilea")
     jubileumtype: Jubileumtypes = Relationship(back_populates="jubilea")
-    created_by: Optional[int] = Field(default=None, foreign_key="gebruikers.id")
+    created_by: Optional[int] = Field(default=None, foreign_key="gebruikers.id", index=True)
     creator: Optional[Gebruikers] = Relationship(back_populates="created_jubilea")
 
 class Relatietypes(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     relatienaam: str
     symmetrisch: bool = Field(default=False, nullable=False)
+    # Telt mee als ouder/kind relatie voor voorouders en nakomelingen (zie hulpmiddelen/stamboom.py):
+    # "ouder" = persoon1 is ouder van persoon2, "kind" = persoon1 is kind van persoon2, None = geen van beide
+    afstamming: Optional[str] = Field(default=None)
     
     relaties: List["Relaties"] = Relationship(back_populates="relatietype")
 
 class Relaties(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    persoon1_id: int = Field(foreign_key="personen.id")
-    persoon2_id: int = Field(foreign_key="personen.id")
-    relatietype_id: int = Field(foreign_key="relatietypes.id")
+    persoon1_id: int = Field(foreign_key="personen.id", index=True)
+    persoon2_id: int = Field(foreign_key="personen.id", index=True)
+    relatietype_id: int = Field(foreign_key="relatietypes.id", index=True)
     
     persoon1: Personen = Relationship(back_populates="relaties_als_persoon1", sa_relationship_kwargs={"foreign_keys": "[Relaties.persoon1_id]"})
     persoon2: Personen = Relationship(back_populates="relaties_als_persoon2", sa_relationship_kwargs={"foreign_keys": "[Relaties.persoon2_id]"})
@@ -93,3 +102,29 @@ class Relaties(SQLModel, table=True):
 
     class Config:
         arbitrary_types_allowed = True
+
+class Afleidingsregels(SQLModel, table=True):
+    """Afleidingsregel voor een relatietype: A -eerste-> X -tweede-> B geeft A -relatietype-> B.
+    Met 'omgekeerd' wordt een relatie van persoon2 naar persoon1 gelezen, bv. kind = ouder omgekeerd.
+    Zie hulpmiddelen/afleiding.py."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    relatietype_id: int = Field(foreign_key="relatietypes.id", index=True)  # de afgeleide relatie
+    eerste_type_id: int = Field(foreign_key="relatietypes.id")
+    eerste_omgekeerd: bool = Field(default=False, nullable=False)
+    tweede_type_id: int = Field(foreign_key="relatietypes.id")
+    tweede_omgekeerd: bool = Field(default=False, nullable=False)
+
+class AfgeleideRelaties(SQLModel, table=True):
+    """Afgeleide relaties (bv. grootouder, neef, schoonouder), bijgehouden bij elke wijziging van Relaties.
+    Symmetrische relatietypes staan er één keer in, met persoon1_id < persoon2_id."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    persoon1_id: int = Field(foreign_key="personen.id")
+    persoon2_id: int = Field(foreign_key="personen.id")
+    relatietype_id: int = Field(foreign_key="relatietypes.id")
+
+    # "Alle kleinkinderen van X" (persoon1 + type) en "alle grootouders van X" (persoon2 + type)
+    # zijn elk één index range scan
+    __table_args__ = (
+        UniqueConstraint("persoon1_id", "relatietype_id", "persoon2_id", name="uq_afgeleiderelaties_persoon1_type_persoon2"),
+        Index("ix_afgeleiderelaties_persoon2_type_persoon1", "persoon2_id", "relatietype_id", "persoon1_id"),
+    )
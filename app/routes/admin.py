@@ -1,18 +1,31 @@
 from fastapi import APIRouter, Depends, Request, Form, Query, HTTPException, Path
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from ..database import get_session
-from ..models.models import Jubilea, Personen, Families, Gebruikers, Rollen
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database import get_read_session, get_write_session
+from ..models.models import Jubilea, Personen, Families, Gebruikers, Rollen, Relatietypes
 from ..auth import role_required
 from ..logging_config import app_logger
-import re
+from ..hulpmiddelen.cache import cache_stats
+from ..hulpmiddelen.metrics import render_metrics
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..hulpmiddelen.sjablonen import configure_templates
+from ..hulpmiddelen.logindex import get_log_index
+from ..hulpmiddelen.clusters import clusters, familie_groepen
+from ..hulpmiddelen.relatiegraaf import relatiegraaf
+from ..hulpmiddelen.verwantschap import verwantschap, MET_SCIPY
+from config import get_settings
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, date
 from typing import List, Optional
+import csv
+import io
 from pathlib import Path as PathLib  # Hernoem de import om verwarring te voorkomen met fastapi Path
 
+settings = get_settings()
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 
 MODEL_MAP = {
     'jubilea': Jubilea,
@@ -22,22 +35,27 @@ MODEL_MAP = {
 
 @router.get("/users", response_class=HTMLResponse, name="admin_list_users")
 @role_required("Administrator")
-async def admin_list_users(request: Request, session: Session = Depends(get_session)):
+async def admin_list_users(request: Request, session: AsyncSession = Depends(get_read_session),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     statement = select(Gebruikers, Rollen).join(Rollen)
-    results = session.exec(statement).all()
-    gebruikers = [{"gebruiker": gebruiker, "rol": rol} for gebruiker, rol in results]
+    pagina = await paginate(session, statement, [Gebruikers.id],
+                            select(func.count()).select_from(Gebruikers).where(Gebruikers.rol_id.is_not(None)),
+                            cursor=cursor, page_size=page_size)
+    gebruikers = [{"gebruiker": gebruiker, "rol": rol} for gebruiker, rol in pagina.items]
     
     # Debug logging
-    app_logger.debug(f"[Admin] Number of users fetched: {len(gebruikers)}")
+    app_logger.debug("[Admin] Number of users fetched: %d", len(gebruikers))
     for user in gebruikers:
-        app_logger.debug(f"[Admin] User: {user['gebruiker'].naam}, Role: {user['rol'].naam}")
+        app_logger.debug("[Admin] User: %s, Role: %s", user['gebruiker'].naam, user['rol'].naam)
     
-    return templates.TemplateResponse("gebruikers.html", {"request": request, "gebruikers": gebruikers})
+    return templates.TemplateResponse("gebruikers.html", {"request": request, "gebruikers": gebruikers, "pagina": pagina})
 
 @router.get("/users/add", response_class=HTMLResponse, name="add_account_form")
 @role_required("Administrator")
-async def add_account_form(request: Request, session: Session = Depends(get_session)):
-    rollen = session.exec(select(Rollen)).all()
+async def add_account_form(request: Request, session: AsyncSession = Depends(get_write_session)):
+    rollen = (await session.exec(select(Rollen))).all()
     return templates.TemplateResponse("add_account.html", {"request": request, "rollen": rollen})
 
 @router.post("/users/add", response_class=RedirectResponse, name="add_account")
@@ -48,20 +66,20 @@ async def add_account(
     naam: str = Form(...),
     rol_id: int = Form(...),
     google_id: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     new_user = Gebruikers(email=email, naam=naam, rol_id=rol_id, google_id=google_id)
     session.add(new_user)
-    session.commit()
+    await session.commit()
     return RedirectResponse(url="/admin/users", status_code=303)
 
 @router.get("/users/{user_id}/edit", response_class=HTMLResponse, name="edit_account")
 @role_required("Administrator")
-async def edit_account_form(request: Request, user_id: int = Path(...), session: Session = Depends(get_session)):
-    user = session.get(Gebruikers, user_id)
+async def edit_account_form(request: Request, user_id: int = Path(...), session: AsyncSession = Depends(get_write_session)):
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
-    rollen = session.exec(select(Rollen)).all()
+    rollen = (await session.exec(select(Rollen))).all()
     return templates.TemplateResponse("edit_account.html", {"request": request, "user": user, "rollen": rollen})
 
 @router.post("/users/{user_id}/edit", response_class=RedirectResponse, name="update_account")
@@ -73,9 +91,9 @@ async def update_account(
     naam: str = Form(...),
     rol_id: int = Form(...),
     google_id: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
-    user = session.get(Gebruikers, user_id)
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
     user.email = email
@@ -83,17 +101,17 @@ async def update_account(
     user.rol_id = rol_id
     user.google_id = google_id
     session.add(user)
-    session.commit()
+    await session.commit()
     return RedirectResponse(url="/admin/users", status_code=303)
 
 @router.get("/users/{user_id}/delete", response_class=RedirectResponse, name="delete_account")
 @role_required("Administrator")
-async def delete_account(request: Request, user_id: int = Path(...), session: Session = Depends(get_session)):
-    user = session.get(Gebruikers, user_id)
+async def delete_account(request: Request, user_id: int = Path(...), session: AsyncSession = Depends(get_write_session)):
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
-    session.delete(user)
-    session.commit()
+    await session.delete(user)
+    await session.commit()
     return RedirectResponse(url="/admin/users", status_code=303)
 
 @router.get("/change-owner", response_class=HTMLResponse)
@@ -102,14 +120,14 @@ async def change_owner(
     request: Request,
     model: str = Query(None),
     page: int = Query(1, ge=1),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     items = []
     if model and model in MODEL_MAP:
         query = select(MODEL_MAP[model], Gebruikers).join(Gebruikers, MODEL_MAP[model].created_by == Gebruikers.id)
-        items = session.exec(query.offset((page - 1) * 10).limit(10)).all()
+        items = (await session.exec(query.offset((page - 1) * 10).limit(10))).all()
 
-    users = session.exec(select(Gebruikers)).all()
+    users = (await session.exec(select(Gebruikers))).all()
     print(f"Gebruikers: {users}, type: {type(users)}")
     
     return templates.TemplateResponse("change_owner.html", {
@@ -128,22 +146,22 @@ async def post_change_owner(
     model: str = Form(...),
     item_id: int = Form(...),
     new_owner_id: int = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     if model not in MODEL_MAP:
         raise HTTPException(status_code=400, detail="Invalid model")
 
-    item = session.get(MODEL_MAP[model], item_id)
+    item = await session.get(MODEL_MAP[model], item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    new_owner = session.get(Gebruikers, new_owner_id)
+    new_owner = await session.get(Gebruikers, new_owner_id)
     if not new_owner:
         raise HTTPException(status_code=404, detail="New owner not found")
 
     item.created_by = new_owner_id
     session.add(item)
-    session.commit()
+    await session.commit()
 
     return RedirectResponse(url=f"/admin/change-owner?model={model}", status_code=303)
 
@@ -155,13 +173,160 @@ async def add_account(
     naam: str = Form(...),
     rol_id: int = Form(...),
     google_id: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     new_user = Gebruikers(email=email, naam=naam, rol_id=rol_id, google_id=google_id)
     session.add(new_user)
-    session.commit()
+    await session.commit()
     return RedirectResponse(url="/admin/add-account", status_code=303)
 
+@router.get("/cache-stats", name="view_cache_stats")
+@role_required("Administrator")
+async def view_cache_stats(request: Request):
+    return cache_stats()
+
+@router.get("/metrics", response_class=PlainTextResponse, name="view_metrics")
+@role_required("Administrator")
+async def view_metrics(request: Request):
+    """Latency per route, database queries en render tijden in het Prometheus text format."""
+    regels = ["# HELP cache_requests_total Opvragingen per cache", "# TYPE cache_requests_total counter"]
+    for naam, stats in sorted(cache_stats().items()):
+        regels.append(f'cache_requests_total{{cache="{naam}",result="hit"}} {stats["hits"]}')
+        regels.append(f'cache_requests_total{{cache="{naam}",result="miss"}} {stats["misses"]}')
+    return PlainTextResponse(render_metrics("\n".join(regels)), media_type="text/plain; version=0.0.4")
+
+MAX_CLUSTERS = 100        # clusters in de tabel, grootste eerst
+VOORBEELD_PERSONEN = 5    # namen per cluster
+
+@router.get("/clusters", response_class=HTMLResponse, name="view_clusters")
+@role_required("Administrator")
+async def view_clusters(request: Request, controle: Optional[str] = Query(None),
+                        session: AsyncSession = Depends(get_read_session)):
+    """Clusters van via relaties verbonden personen (zie hulpmiddelen/clusters.py) en de families
+    die daardoor met elkaar verbonden zijn."""
+    index = await clusters.get(session)
+    alle = index.clusters()
+    verdeling = index.verdeling()
+
+    familie_van = dict((await session.exec(
+        select(Personen.id, Personen.familie_id).where(Personen.familie_id.is_not(None)))).all())
+    familienamen = dict((await session.exec(select(Families.id, Families.familienaam))).all())
+    verbonden_families = [
+        sorted(familienamen.get(familie, f"#{familie}") for familie in groep)
+        for groep in familie_groepen(alle, familie_van) if len(groep) > 1
+    ]
+
+    getoond = alle[:MAX_CLUSTERS]
+    voorbeeld_ids = [persoon for cluster in getoond for persoon in cluster[:VOORBEELD_PERSONEN]]
+    personen = {persoon.id: persoon for persoon in (await session.exec(
+        select(Personen).where(Personen.id.in_(voorbeeld_ids)))).all()}
+    rijen = [{
+        "grootte": len(cluster),
+        "families": sorted({familienamen.get(familie_van[persoon], "") for persoon in cluster if persoon in familie_van}),
+        "personen": [personen[persoon] for persoon in cluster[:VOORBEELD_PERSONEN] if persoon in personen],
+    } for cluster in getoond]
+
+    return templates.TemplateResponse("clusters.html", {
+        "request": request,
+        "aantal_personen": len(index),
+        "aantal_clusters": index.aantal,
+        "eilanden": verdeling.get(1, 0),
+        "grootste": len(alle[0]) if alle else 0,
+        "verdeling": verdeling,
+        "clusters": rijen,
+        "afgekapt": len(alle) > MAX_CLUSTERS,
+        "verbonden_families": verbonden_families,
+        "losse_families": len(familienamen) - sum(len(groep) for groep in verbonden_families),
+        "controle": controle,
+    })
+
+@router.post("/clusters/controleer", name="controleer_clusters")
+@role_required("Administrator")
+async def controleer_clusters(request: Request, session: AsyncSession = Depends(get_read_session)):
+    """Bouwt de clusters opnieuw op uit de database en vergelijkt met de bijgewerkte index."""
+    gelijk = await clusters.controleer(session)
+    return RedirectResponse(url=f"{request.url_for('view_clusters').path}?controle={'ok' if gelijk else 'afwijking'}", status_code=303)
+
+MAX_SELECTIE = 2000  # personen per verwantschapsrapport
+MAX_AFSTAND  = 10    # relaties tussen twee personen
+# Zonder numpy/scipy: een breadth-first search per persoon in Python, dus veel kleinere rapporten
+MAX_SELECTIE_ZONDER_SCIPY = 200
+MAX_AFSTAND_ZONDER_SCIPY  = 4
+MAX_RIJEN    = 500   # paren op de pagina; de CSV bevat alles
+
+async def _verwantschap_rapport(session: AsyncSession, familie_id: Optional[int], persoon_ids: Optional[str], max_afstand: int):
+    """(personen per id, paren) voor de geselecteerde personen; zie hulpmiddelen/verwantschap.py."""
+    ids = set()
+    if familie_id is not None:
+        ids.update((await session.exec(select(Personen.id).where(Personen.familie_id == familie_id))).all())
+    if persoon_ids:
+        try:
+            ids.update(int(deel) for deel in persoon_ids.replace(",", " ").split())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Persoon ids moeten getallen zijn")
+    max_selectie = MAX_SELECTIE if MET_SCIPY else MAX_SELECTIE_ZONDER_SCIPY
+    if len(ids) > max_selectie:
+        raise HTTPException(status_code=400, detail=f"Maximaal {max_selectie} personen per rapport")
+    if not MET_SCIPY and max_afstand > MAX_AFSTAND_ZONDER_SCIPY:
+        raise HTTPException(status_code=400, detail=f"Maximaal {MAX_AFSTAND_ZONDER_SCIPY} relaties zonder numpy/scipy")
+
+    personen = {persoon.id: persoon for persoon in (await session.exec(select(Personen).where(Personen.id.in_(ids)))).all()}
+    if not personen:
+        return personen, []
+    # Kopie van de relaties uit de graaf in het geheugen: de berekening loopt in een thread,
+    # terwijl de routes de graaf intussen kunnen bijwerken
+    kolommen = (await relatiegraaf.get(session)).kanten()
+    afstamming = dict((await session.exec(select(Relatietypes.id, Relatietypes.afstamming))).all())
+    paren = await run_in_threadpool(verwantschap, *kolommen, afstamming, list(personen),
+                                    max_afstand, settings.STAMBOOM_MAX_DIEPTE)
+    return personen, paren
+
+@router.get("/verwantschap", response_class=HTMLResponse, name="view_verwantschap")
+@role_required("Administrator")
+async def view_verwantschap(
+    request: Request,
+    familie_id: Optional[int] = Query(None),
+    persoon_ids: Optional[str] = Query(None),
+    max_afstand: int = Query(4, ge=1, le=MAX_AFSTAND),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Afstand en verwantschapscoëfficiënt tussen alle paren uit een familie of een lijst personen."""
+    personen, paren = await _verwantschap_rapport(session, familie_id, persoon_ids, max_afstand)
+    families = (await session.exec(select(Families).order_by(Families.familienaam))).all()
+    return templates.TemplateResponse("verwantschap.html", {
+        "request": request,
+        "families": families,
+        "familie_id": familie_id,
+        "persoon_ids": persoon_ids or "",
+        "max_afstand": max_afstand,
+        "max_afstand_limiet": MAX_AFSTAND if MET_SCIPY else MAX_AFSTAND_ZONDER_SCIPY,
+        "personen": personen,
+        "paren": paren[:MAX_RIJEN],
+        "aantal_paren": len(paren),
+        "met_scipy": MET_SCIPY,
+        "query": request.url.query,
+    })
+
+@router.get("/verwantschap.csv", name="download_verwantschap")
+@role_required("Administrator")
+async def download_verwantschap(
+    request: Request,
+    familie_id: Optional[int] = Query(None),
+    persoon_ids: Optional[str] = Query(None),
+    max_afstand: int = Query(4, ge=1, le=MAX_AFSTAND),
+    session: AsyncSession = Depends(get_read_session)
+):
+    personen, paren = await _verwantschap_rapport(session, familie_id, persoon_ids, max_afstand)
+    uitvoer = io.StringIO()
+    schrijver = csv.writer(uitvoer)
+    schrijver.writerow(["persoon1_id", "persoon1", "persoon2_id", "persoon2", "afstand", "coefficient"])
+    for paar in paren:
+        persoon1, persoon2 = personen[paar.persoon1_id], personen[paar.persoon2_id]
+        schrijver.writerow([persoon1.id, f"{persoon1.voornaam} {persoon1.achternaam}",
+                            persoon2.id, f"{persoon2.voornaam} {persoon2.achternaam}", paar.afstand, paar.coefficient])
+    return Response(uitvoer.getvalue(), media_type="text/csv",
+                    headers={"Content-Disposition": 'attachment; filename="verwantschap.csv"'})
+
 base_path = PathLib(__file__).parent.parent.parent
 
 @router.get("/logs", response_class=HTMLResponse, name="view_logs")
@@ -173,53 +338,37 @@ async def view_logs(
     date_to: Optional[str] = Query(None),
     log_level: Optional[str] = Query(None),
     items_per_page: int = Query(50, le=100),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     log_file_path = base_path / 'logs' / 'app.log'
-    log_pattern = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) (\w+) (.+)')
-    
-    log_entries = []
-    first_date = None
-    try:
-        with open(log_file_path, 'r') as log_file:
-            for line in log_file:
-                match = log_pattern.match(line)
-                if match:
-                    date_str, level, message = match.groups()
-                    log_datetime = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S,%f')
-                    
-                    if first_date is None:
-                        first_date = log_datetime.date()
-                    
-                    if date_from and log_datetime.date() < datetime.strptime(date_from, '%Y-%m-%d').date():
-                        continue
-                    if date_to and log_datetime.date() > datetime.strptime(date_to, '%Y-%m-%d').date():
-                        continue
-                    if log_level and level.lower() != log_level.lower():
-                        continue
-                    
-                    log_entries.append({
-                        'date': log_datetime,
-                        'level': level,
-                        'message': message
-                    })
-    except FileNotFoundError:
+    if not log_file_path.exists():
         raise HTTPException(status_code=404, detail=f"Log file not found at {log_file_path}")
 
+    try:
+        van = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        tot = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ongeldige datum")
+
+    # Alleen de gevraagde pagina wordt gelezen; de index werkt zichzelf bij (zie logindex.py)
+    log_index = get_log_index(log_file_path)
+    start_index = (page - 1) * items_per_page
+    paginated_entries, total_items = await run_in_threadpool(
+        log_index.zoek, van, tot, log_level, start_index, items_per_page)
+
+    total_pages = max(1, (total_items + items_per_page - 1) // items_per_page)
+    if page > total_pages:
+        page = total_pages
+        paginated_entries, total_items = await run_in_threadpool(
+            log_index.zoek, van, tot, log_level, (page - 1) * items_per_page, items_per_page)
+
     # If date_from or date_to are not provided, set default values
     if not date_from:
+        first_date = log_index.eerste_datum()
         date_from = first_date.strftime('%Y-%m-%d') if first_date else None
     if not date_to:
         date_to = date.today().strftime('%Y-%m-%d')
 
-    total_items = len(log_entries)
-    total_pages = max(1, (total_items + items_per_page - 1) // items_per_page)
-    page = min(max(1, page), total_pages)
-    start_index = (page - 1) * items_per_page
-    end_index = start_index + items_per_page
-    
-    paginated_entries = log_entries[start_index:end_index]
-
     return templates.TemplateResponse("log_viewer.html", {
         "request": request,
         "log_entries": paginated_entries,
@@ -1,21 +1,31 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, Form
+from fastapi import APIRouter, Depends, Request, HTTPException, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from ..database import get_session
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.cache import invalidate_caches, SEARCH
+from ..hulpmiddelen.zoekindex import search_families as fts_search_families
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..hulpmiddelen.sjablonen import configure_templates
 from ..models.models import Families, Personen, Gebruikers
 from ..auth import login_required, role_required, get_current_user, owner_or_admin_required
 from ..logging_config import app_logger
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 
 @router.get("/", response_class=HTMLResponse)
 @login_required
-async def list_families(request: Request, session: Session = Depends(get_session)):
-    families = session.exec(select(Families)).all()
-    return templates.TemplateResponse("families.html", {"request": request, "families": families})
+async def list_families(request: Request, session: AsyncSession = Depends(get_read_session),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    pagina = await paginate(session, select(Families), [Families.id], select(func.count()).select_from(Families),
+                            cursor=cursor, page_size=page_size)
+    return templates.TemplateResponse("families.html", {"request": request, "families": pagina.items, "pagina": pagina})
 
 @router.get("/search", response_class=HTMLResponse)
 @login_required
@@ -26,19 +36,14 @@ async def search_families(request: Request):
 @router.post("/search", response_class=HTMLResponse)
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def search_families(request: Request, search_term: str = Form(None), session: Session = Depends(get_session)):
-    app_logger.debug(f"[Families - Zoeken]: {search_term}")
+async def search_families(request: Request, search_term: str = Form(None), session: AsyncSession = Depends(get_read_session)):
+    app_logger.debug("[Families - Zoeken]: %s", search_term)
     query = select(Families)
 
     if search_term:
-        query = query.where(
-            Families.familienaam.ilike(f"%{search_term}%") | 
-            Families.straatnaam.ilike(f"%{search_term}%") |
-            Families.postcode.ilike(f"%{search_term}%") |
-            Families.plaats.ilike(f"%{search_term}%") 
-        )
+        query = fts_search_families(session, query, search_term)
 
-    families = session.exec(query).all()
+    families = (await session.exec(query)).all()
 
     return templates.TemplateResponse("families.html", {"request": request, "families": families}) 
 
@@ -60,21 +65,22 @@ async def new_family(
     postcode    : str     = Form(...),
     plaats      : str     = Form(...),
     current_user: dict    = Depends(get_current_user),
-    session     : Session = Depends(get_session)
+    session     : AsyncSession = Depends(get_write_session)
 ):
-    app_logger.debug(f"Create Family: {familienaam}, {straatnaam}, {huisnummer}, {huisnummer_toevoeging}, {postcode}, {plaats}")
+    app_logger.debug("Create Family: %s, %s, %s, %s, %s, %s", familienaam, straatnaam, huisnummer, huisnummer_toevoeging, postcode, plaats)
     new_family = Families(familienaam=familienaam, straatnaam=straatnaam, huisnummer=huisnummer,
                           huisnummer_toevoeging=huisnummer_toevoeging, postcode=postcode, plaats=plaats,
                           created_by=current_user['id'])
     session.add(new_family)
-    session.commit()
+    await session.commit()
+    invalidate_caches(SEARCH)
     return RedirectResponse(url="/families", status_code=303)
 
 @router.get("/{family_id}/edit", response_class=HTMLResponse)
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def edit_family(request: Request, family_id: int, session: Session = Depends(get_session)):
-    family = session.get(Families, family_id)
+async def edit_family(request: Request, family_id: int, session: AsyncSession = Depends(get_write_session)):
+    family = await session.get(Families, family_id, options=[joinedload(Families.creator)])
     if not family:
         raise HTTPException(status_code=404, detail="Familie niet gevonden")
     return templates.TemplateResponse("family_form.html", {"request": request, "family": family})
@@ -93,9 +99,9 @@ async def update_family(
     postcode: str = Form(...),
     plaats: str = Form(...),
     current_user: Gebruikers = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
-    family = session.get(Families, family_id)
+    family = await session.get(Families, family_id)
     if not family:
         raise HTTPException(status_code=404, detail="Familie niet gevonden")
     if family.created_by != current_user['id']: # and current_user.role != "admin":
@@ -109,25 +115,27 @@ async def update_family(
     family.plaats = plaats
     
     session.add(family)
-    session.commit()
+    await session.commit()
+    invalidate_caches(SEARCH)
     return RedirectResponse(url="/families", status_code=303)
 
 @router.get("/{family_id}/delete")
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
 @owner_or_admin_required(Families)
-async def delete_family(request: Request, family_id: int, session: Session = Depends(get_session)):
-    family = session.get(Families, family_id)
+async def delete_family(request: Request, family_id: int, session: AsyncSession = Depends(get_write_session)):
+    family = await session.get(Families, family_id)
     if not family:
         raise HTTPException(status_code=404, detail="Familie niet gevonden")
-    session.delete(family)
-    session.commit()
+    await session.delete(family)
+    await session.commit()
+    invalidate_caches(SEARCH)
     return RedirectResponse(url="/families", status_code=303)
 
 @router.get("/{family_id}", response_class=HTMLResponse)
 @login_required
-async def family_detail(request: Request, family_id: int, session: Session = Depends(get_session)):
-    family = session.get(Families, family_id)
+async def family_detail(request: Request, family_id: int, session: AsyncSession = Depends(get_write_session)):
+    family = await session.get(Families, family_id, options=[joinedload(Families.creator), selectinload(Families.personen)])
     if not family:
         raise HTTPException(status_code=404, detail="Familie niet gevonden")
     
@@ -1,26 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlmodel import Session, select
-from ..database import get_session
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..hulpmiddelen.sjablonen import configure_templates
 from ..models.models import Gebruikers, Rollen
 from ..auth import login_required, role_required
 from fastapi.templating import Jinja2Templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 
 @router.get("/", response_class=HTMLResponse)
 @login_required
 @role_required("Administrator")
-async def list_users(request: Request, session: Session = Depends(get_session)):
-    users = session.exec(select(Gebruikers)).all()
-    return templates.TemplateResponse("gebruikers.html", {"request": request, "users": users})
+async def list_users(request: Request, session: AsyncSession = Depends(get_read_session),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    pagina = await paginate(session, select(Gebruikers), [Gebruikers.id], select(func.count()).select_from(Gebruikers),
+                            cursor=cursor, page_size=page_size)
+    return templates.TemplateResponse("gebruikers.html", {"request": request, "users": pagina.items, "pagina": pagina})
 
 @router.get("/new", response_class=HTMLResponse)
 @login_required
 @role_required("Administrator")
-async def new_user(request: Request, session: Session = Depends(get_session)):
-    rollen = session.exec(select(Rollen)).all()
+async def new_user(request: Request, session: AsyncSession = Depends(get_write_session)):
+    rollen = (await session.exec(select(Rollen))).all()
     return templates.TemplateResponse("gebruikers_form.html", {
         "request": request,
         "rollen": rollen,
@@ -36,22 +43,22 @@ async def create_user(
     naam: str = Form(...),
     rol_id: int = Form(...),
     google_id: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     new_user = Gebruikers(email=email, naam=naam, rol_id=rol_id, google_id=google_id)
     session.add(new_user)
-    session.commit()
+    await session.commit()
     return RedirectResponse(url="/users", status_code=303)
 
 @router.get("/{user_id}/edit", response_class=HTMLResponse)
 @login_required
 @role_required("Administrator")
-async def edit_user(request: Request, user_id: int, session: Session = Depends(get_session)):
-    user = session.get(Gebruikers, user_id)
+async def edit_user(request: Request, user_id: int, session: AsyncSession = Depends(get_write_session)):
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
     
-    rollen = session.exec(select(Rollen)).all()
+    rollen = (await session.exec(select(Rollen))).all()
     if not rollen:
         raise HTTPException(status_code=404, detail="Rollen niet gevonden")
 
@@ -70,9 +77,9 @@ async def update_user(
     name: str = Form(...),
     role: str = Form(...),
     google_id: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
-    user = session.get(Gebruikers, user_id)
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
     user.email = email
@@ -80,16 +87,16 @@ async def update_user(
     user.role = role
     user.google_id = google_id
     session.add(user)
-    session.commit()
+    await session.commit()
     return RedirectResponse(url="/users", status_code=303)
 
 @router.get("/{user_id}/delete")
 @login_required
 @role_required("Administrator")
-async def delete_user(request: Request, user_id: int, session: Session = Depends(get_session)):
-    user = session.get(Gebruikers, user_id)
+async def delete_user(request: Request, user_id: int, session: AsyncSession = Depends(get_write_session)):
+    user = await session.get(Gebruikers, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
-    session.delete(user)
-    session.commit()
+    await session.delete(user)
+    await session.commit()
     return RedirectResponse(url="/users", status_code=303)
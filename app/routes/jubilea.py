@@ -1,62 +1,39 @@
 from fastapi import APIRouter, Depends, Request, HTTPException, Form, Query, UploadFile, File
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, func, or_
-from ..database import get_session
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import joinedload
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.cache import invalidate_caches, UPCOMING_EVENTS, SEARCH
+from ..hulpmiddelen.fotoverwerking import controleer_foto, start_foto_verwerking, verwijder_foto
+from ..hulpmiddelen.zoekindex import search_jubilea as fts_search_jubilea
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..models.models import Jubilea, Personen, Jubileumtypes
 from datetime import datetime
 from typing import Optional
 from ..auth import login_required, role_required, get_current_user, owner_or_admin_required
 from ..logging_config import app_logger, log_debug, log_error
+from ..hulpmiddelen.kalender import maand_dag
+from ..hulpmiddelen.sjablonen import configure_templates
 from config import get_settings
-from PIL import Image
-import os
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 settings  = get_settings()
 
-def process_photo(file: UploadFile, jubileum_id: int):
-    log_debug(f"[Jubilea - Process_photo] started...")
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"jubileum_{jubileum_id}{file_extension}"
-    filepath = settings.FOTO_DIR / filename
-    
-    log_debug(f"[Jubilea - Process_photo] Probeer foto te bewaren: {filepath}")
-    
-    try:
-        with Image.open(file.file) as img:
-            img.thumbnail((1024, 1024))
-            img.save(filepath, optimize=True, quality=85)
-            log_debug(f"[Jubilea - Process_photo] Foto successvol bewaard!")
-        
-    except Exception as e:
-        log_error(f"[Jubilea - Process_photo] Fout tijdens het bewaren: {str(e)}")
-        raise
-    
-    log_debug(f"[Jubilea - Process_photo] Foto Returning URL: /fotos/{filename}")
-    return f"/fotos/{filename}"
-
 @router.post("/search", response_class=HTMLResponse)
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def search_jubilea(request: Request, search_term: str = Form(None), session: Session = Depends(get_session)):
-    log_debug(f"[Jubilea - Zoeken]: {search_term}")
+async def search_jubilea(request: Request, search_term: str = Form(None), session: AsyncSession = Depends(get_read_session)):
+    log_debug("[Jubilea - Zoeken]: %s", search_term)
 
     query = select(Jubilea, Personen, Jubileumtypes).outerjoin(Personen).join(Jubileumtypes)
     if search_term:
-        query = query.where(
-            or_(
-                Personen.voornaam.ilike(f"%{search_term}%"),
-                Personen.achternaam.ilike(f"%{search_term}%"),
-                Jubilea.omschrijving.ilike(f"%{search_term}%"),
-                Jubilea.jubileumnaam.ilike(f"%{search_term}%"),
-                Jubileumtypes.naam.ilike(f"%{search_term}%")
-            )
-        )
-
-    results = session.exec(query).all()
+        query = fts_search_jubilea(session, query, search_term)
+
+    results = (await session.exec(query)).all()
 
     jubilea = [
         {
@@ -75,21 +52,29 @@ async def search_jubilea(request: Request, search_term: str = Form(None), sessio
 
 @router.get("/", response_class=HTMLResponse, name="list_jubilea")
 @login_required
-async def list_jubilea(request: Request, session: Session = Depends(get_session),
-    sort: str = Query(None, description="Sorteer op: jubileumtype, jubileumdag, of persoon")
+async def list_jubilea(request: Request, session: AsyncSession = Depends(get_read_session),
+    sort: str = Query(None, description="Sorteer op: jubileumtype, jubileumdag, of persoon"),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
     query = select(Jubilea, Jubileumtypes, Personen).outerjoin(Personen).join(Jubileumtypes)
     
+    # Sorteersleutels eindigen altijd op het id, zodat de cursor uniek is
     if sort == "jubileumtype":
-        query = query.order_by(Jubileumtypes.naam)
+        sort_keys = [Jubileumtypes.naam, Jubilea.id]
     elif sort == "jubileumnaam":
-        query = query.order_by(Jubilea.jubileumnaam)
+        sort_keys = [Jubilea.jubileumnaam, Jubilea.id]
     elif sort == "jubileumdag":
-        query = query.order_by(Jubilea.jubileumdag)
+        sort_keys = [Jubilea.jubileumdag, Jubilea.id]
     elif sort == "persoon":
-        query = query.order_by(func.coalesce(Personen.voornaam, ''), func.coalesce(Personen.achternaam, ''))
+        sort_keys = [func.coalesce(Personen.voornaam, ''), func.coalesce(Personen.achternaam, ''), Jubilea.id]
+    else:
+        sort_keys = [Jubilea.id]
     
-    results = session.exec(query).all()
+    pagina = await paginate(session, query, sort_keys,
+                            select(func.count()).select_from(Jubilea).where(Jubilea.jubileumtype_id.is_not(None)),
+                            cursor=cursor, page_size=page_size)
+    results = pagina.items
     
     jubilea = [
         {
@@ -107,16 +92,17 @@ async def list_jubilea(request: Request, session: Session = Depends(get_session)
     return templates.TemplateResponse("jubilea.html", {
         "request": request, 
         "jubilea": jubilea,
+        "pagina": pagina,
         "current_sort": sort
     })
 
 @router.get("/new", name="new_jubileum")
 @login_required
-async def new_jubileum(request: Request, session: Session = Depends(get_session),
+async def new_jubileum(request: Request, session: AsyncSession = Depends(get_write_session),
     persoon_id: int = Query(None)
 ):
-    personen = session.exec(select(Personen)).all()
-    jubileumtypes = session.exec(select(Jubileumtypes)).all()
+    personen = (await session.exec(select(Personen))).all()
+    jubileumtypes = (await session.exec(select(Jubileumtypes))).all()
     return templates.TemplateResponse("jubileum_form.html", {
         "request": request, 
         "personen": personen,
@@ -137,13 +123,17 @@ async def create_jubileum(
     persoon_id     : Optional[int] = Form(None),
     foto           : UploadFile    = File(None),
     current_user   : dict    = Depends(get_current_user),
-    session        : Session = Depends(get_session)
+    session        : AsyncSession = Depends(get_write_session)
 ):
-    jubileumdag = datetime.strptime(jubileumdag, "%Y-%m-%d").strftime("%Y-%m-%d")
+    if foto and foto.filename:
+        await controleer_foto(foto)
+
+    jubileum_datum = datetime.strptime(jubileumdag, "%Y-%m-%d").date()
     
     new_jubileum = Jubilea(
         jubileumtype_id=jubileumtype_id,
-        jubileumdag=jubileumdag,
+        jubileumdag=jubileum_datum,
+        jubileum_maanddag=maand_dag(jubileum_datum),
         jubileumnaam=jubileumnaam,
         omschrijving=omschrijving,
         url=url,
@@ -151,29 +141,29 @@ async def create_jubileum(
         created_by=current_user['id']
     )
     session.add(new_jubileum)
-    session.commit()
-    session.refresh(new_jubileum)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    await session.refresh(new_jubileum)
 
     if foto and foto.filename:
-        foto_url = process_photo(foto, new_jubileum.id)
-        new_jubileum.foto_url = foto_url
-        session.commit()
+        # foto_url wordt gezet zodra de foto op de achtergrond verwerkt is
+        await start_foto_verwerking(foto, Jubilea, new_jubileum.id)
 
     return RedirectResponse(url="/jubilea", status_code=303)
 
 @router.get("/{jubileum_id}/edit", name="edit_jubileum")
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def edit_jubileum(request: Request, jubileum_id: int, session: Session = Depends(get_session)):
-    app_logger.debug(f"[FUNCTION] edit_jubileum: Jubileum ID: {jubileum_id}")
-    jubileum = session.get(Jubilea, jubileum_id)
-    app_logger.debug(f"Jubileum: {jubileum}")
+async def edit_jubileum(request: Request, jubileum_id: int, session: AsyncSession = Depends(get_write_session)):
+    app_logger.debug("[FUNCTION] edit_jubileum: Jubileum ID: %s", jubileum_id)
+    jubileum = await session.get(Jubilea, jubileum_id, options=[joinedload(Jubilea.creator)])
+    app_logger.debug("Jubileum: %s", jubileum)
     if not jubileum:
         raise HTTPException(status_code=404, detail="Jubileum niet gevonden")
-    personen = session.exec(select(Personen)).all()
-    jubileumtypes = session.exec(select(Jubileumtypes)).all()
+    personen = (await session.exec(select(Personen))).all()
+    jubileumtypes = (await session.exec(select(Jubileumtypes))).all()
 
-    formatted_date = datetime.strptime(jubileum.jubileumdag, "%Y-%m-%d").strftime("%Y-%m-%d")
+    formatted_date = jubileum.jubileumdag.strftime("%Y-%m-%d")
     
     return templates.TemplateResponse("jubileum_form.html", {
         "request": request, 
@@ -198,38 +188,42 @@ async def update_jubileum(
     url            : str     = Form(None),
     persoon_id     : Optional[int] = Form(None),
     foto           : UploadFile    = File(None),
-    session        : Session = Depends(get_session)
+    session        : AsyncSession = Depends(get_write_session)
 ):
-    jubileum = session.get(Jubilea, jubileum_id)
+    jubileum = await session.get(Jubilea, jubileum_id)
     if not jubileum:
         raise HTTPException(status_code=404, detail="Jubileum niet gevonden")
 
     if action == "delete_photo":
         if jubileum.foto_url:
-            foto_path = settings.FOTO_DIR / jubileum.foto_url.split('/')[-1]
-            if foto_path.exists():
-                os.remove(foto_path)
+            oude_url = jubileum.foto_url
             jubileum.foto_url = None
-            session.commit()
+            await session.commit()
+            await verwijder_foto(session, oude_url)
+            invalidate_caches(UPCOMING_EVENTS, SEARCH)
         return RedirectResponse(url=f"/jubilea/{jubileum_id}/edit", status_code=303)
 
     elif action == "update_jubileum":
-        jubileumdag = datetime.strptime(jubileumdag, "%Y-%m-%d").strftime("%Y-%m-%d")
+        if foto and foto.filename:
+            await controleer_foto(foto)
+
+        jubileum_datum = datetime.strptime(jubileumdag, "%Y-%m-%d").date()
         
-        jubileum.jubileumtype_id = jubileumtype_id
-        jubileum.jubileumdag     = jubileumdag
+        jubileum.jubileumtype_id   = jubileumtype_id
+        jubileum.jubileumdag       = jubileum_datum
+        jubileum.jubileum_maanddag = maand_dag(jubileum_datum)
         jubileum.jubileumnaam    = jubileumnaam
         jubileum.omschrijving    = omschrijving
         jubileum.url             = url
         jubileum.persoon_id      = persoon_id
 
-        if foto and foto.filename:
-            foto_url = process_photo(foto, jubileum.id)
-            log_debug(f"Foto voor Jubileum {foto_url} - {jubileum.id} aangepast")
-            jubileum.foto_url = foto_url
-        
         session.add(jubileum)
-        session.commit()
+        await session.commit()
+        invalidate_caches(UPCOMING_EVENTS, SEARCH)
+
+        if foto and foto.filename:
+            await start_foto_verwerking(foto, Jubilea, jubileum.id)
+            log_debug("Nieuwe foto voor Jubileum %s in verwerking", jubileum.id)
         return RedirectResponse(url="/jubilea", status_code=303)
 
     else:
@@ -239,10 +233,11 @@ async def update_jubileum(
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
 @owner_or_admin_required(Jubilea)
-async def delete_jubileum(request: Request, jubileum_id: int, session: Session = Depends(get_session)):
-    jubileum = session.get(Jubilea, jubileum_id)
+async def delete_jubileum(request: Request, jubileum_id: int, session: AsyncSession = Depends(get_write_session)):
+    jubileum = await session.get(Jubilea, jubileum_id)
     if not jubileum:
         raise HTTPException(status_code=404, detail="Jubileum niet gevonden")
-    session.delete(jubileum)
-    session.commit()
+    await session.delete(jubileum)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
     return RedirectResponse(url="/jubilea", status_code=303)
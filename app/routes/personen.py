@@ -1,86 +1,94 @@
 from fastapi import APIRouter, Depends, Request, HTTPException, Form, Query, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from ..database import get_session
-from ..models.models import Personen, Families, Gebruikers
+from sqlmodel import select, func, delete, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload, contains_eager
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.cache import invalidate_caches, UPCOMING_EVENTS, SEARCH
+from ..hulpmiddelen.relatiegraaf import relatiegraaf
+from ..hulpmiddelen.clusters import clusters
+from ..hulpmiddelen.fotoverwerking import controleer_foto, start_foto_verwerking, verwijder_foto
+from ..hulpmiddelen.zoekindex import search_personen as fts_search_personen
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..hulpmiddelen.sjablonen import configure_templates
+from ..hulpmiddelen.afleiding import afgeleide_relaties_query, verwerk_relatie_wijziging, feit
+from ..hulpmiddelen.stamboom import verwanten_query, generatie_naam, VOOROUDERS, NAKOMELINGEN, VERWANTEN
+from ..models.models import Personen, Families, Gebruikers, Jubilea, Relaties, AfgeleideRelaties
 from ..auth import login_required, role_required, get_current_user, owner_or_admin_required
 from ..logging_config import log_info, log_debug, log_error
-from datetime import datetime
 from config import get_settings
-from PIL import Image
-import os
 
 router    = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
 settings  = get_settings()
 
-def process_photo(file: UploadFile, person_id: int):
-    log_debug(f"[Personen - Process_photo] gestart...")
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"person_{person_id}{file_extension}"
-    filepath = settings.FOTO_DIR / filename
-    
-    log_debug(f"[Personen - Process_photo] Probeer foto te bewaren: {filepath}")
-    
-    try:
-        with Image.open(file.file) as img:
-            img.thumbnail((1024, 1024))
-            img.save(filepath, optimize=True, quality=85)
-            log_debug(f"[Personen - Process_photo] Foto successvol bewaard!")
-        
-    except Exception as e:
-        log_error(f"[Personen - Process_photo] Fout tijdens het bewaren: {str(e)}")
-        raise
-    
-    log_debug(f"[Personen - Process_photo] Foto Returning URL: /fotos/{filename}")
-    return f"/fotos/{filename}"
+# Laadplannen: alles wat de templates van een persoon gebruiken in een vast aantal queries ophalen
+def _relaties_laadplan(relatie_attribuut):
+    return selectinload(relatie_attribuut).options(
+        joinedload(Relaties.relatietype),
+        joinedload(Relaties.persoon1),
+        joinedload(Relaties.persoon2),
+    )
+
+PERSOON_LAADPLAN = [
+    joinedload(Personen.familie),
+    joinedload(Personen.creator),
+    selectinload(Personen.jubilea).joinedload(Jubilea.jubileumtype),
+    _relaties_laadplan(Personen.relaties_als_persoon1),
+    _relaties_laadplan(Personen.relaties_als_persoon2),
+]
 
 @router.get("/", response_class=HTMLResponse)
 @login_required
-async def list_personen(request: Request, session: Session = Depends(get_session),
-    sort: str = Query(None, description="Sorteer op: voornaam, achternaam, of familie")
+async def list_personen(request: Request, session: AsyncSession = Depends(get_read_session),
+    sort: str = Query(None, description="Sorteer op: voornaam, achternaam, of familie"),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
-    query = select(Personen).join(Families)
+    query = select(Personen).join(Families).options(contains_eager(Personen.familie))
     
+    # Sorteersleutels eindigen altijd op het id, zodat de cursor uniek is
     if sort == "voornaam":
-        query = query.order_by(Personen.voornaam)
+        sort_keys = [Personen.voornaam, Personen.id]
     elif sort == "achternaam":
-        query = query.order_by(Personen.achternaam)
+        sort_keys = [Personen.achternaam, Personen.id]
     elif sort == "familie":
-        query = query.order_by(Families.familienaam)
+        sort_keys = [Families.familienaam, Personen.id]
+    else:
+        sort_keys = [Personen.id]
     
-    personen = session.exec(query).all()
+    pagina = await paginate(session, query, sort_keys,
+                            select(func.count()).select_from(Personen).where(Personen.familie_id.is_not(None)),
+                            cursor=cursor, page_size=page_size)
     
     return templates.TemplateResponse("personen.html", {
         "request": request, 
-        "personen": personen,
+        "personen": pagina.items,
+        "pagina": pagina,
         "current_sort": sort
     })
 
 @router.post("/search", response_class=HTMLResponse)
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def search_personen(request: Request, search_term: str = Form(None), session: Session = Depends(get_session)):
-    log_debug(f"[Personen - Zoeken]: {search_term}")
-    query = select(Personen)
+async def search_personen(request: Request, search_term: str = Form(None), session: AsyncSession = Depends(get_read_session)):
+    log_debug("[Personen - Zoeken]: %s", search_term)
+    query = select(Personen).options(selectinload(Personen.familie))
 
     if search_term:
-        query = query.where(
-            Personen.voornaam.ilike(f"%{search_term}%") | 
-            Personen.achternaam.ilike(f"%{search_term}%")
-        )
+        query = fts_search_personen(session, query, search_term)
 
-    personen = session.exec(query).all()
+    personen = (await session.exec(query)).all()
 
     return templates.TemplateResponse("personen.html", {"request": request, "personen": personen}) 
 
 @router.get("/new", name="new_persoon")
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def new_persoon(request: Request, session: Session = Depends(get_session)):
-    families = session.exec(select(Families)).all()
+async def new_persoon(request: Request, session: AsyncSession = Depends(get_write_session)):
+    families = (await session.exec(select(Families))).all()
     return templates.TemplateResponse("persoon_form.html", {"request": request, "families": families, "persoon": None})
 
 @router.post("/new", name="create_persoon")
@@ -94,34 +102,38 @@ async def create_persoon(
     leeft       : bool       = Form(False),
     foto        : UploadFile = File(None),
     current_user: dict       = Depends(get_current_user),
-    session     : Session    = Depends(get_session)):
+    session     : AsyncSession = Depends(get_write_session)):
+
+    if foto and foto.filename:
+        await controleer_foto(foto)
 
     new_persoon = Personen(voornaam=voornaam, achternaam=achternaam, familie_id=familie_id,
         leeft=leeft,created_by=current_user['id'])
     session.add(new_persoon)
-    session.commit()
-    session.refresh(new_persoon)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    await session.refresh(new_persoon)
+    clusters.voeg_persoon_toe(new_persoon.id)
 
     if foto and foto.filename:
-        foto_url = process_photo(foto, new_persoon.id)
-        new_persoon.foto_url = foto_url
-        session.commit()
+        # foto_url wordt gezet zodra de foto op de achtergrond verwerkt is
+        await start_foto_verwerking(foto, Personen, new_persoon.id)
 
     return RedirectResponse(url="/personen", status_code=303)
 
 @router.get("/{persoon_id}/edit", name="edit_persoon")
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def edit_persoon(request: Request, persoon_id: int, session: Session = Depends(get_session)):
-    persoon = session.get(Personen, persoon_id)
+async def edit_persoon(request: Request, persoon_id: int, session: AsyncSession = Depends(get_write_session)):
+    persoon = await session.get(Personen, persoon_id, options=PERSOON_LAADPLAN)
     
     if not persoon:
         raise HTTPException(status_code=404, detail="Persoon niet gevonden")
     
-    families = session.exec(select(Families)).all()
+    families = (await session.exec(select(Families))).all()
 
-    # Sorteer de jubilea op datum
-    sorted_jubilea = sorted(persoon.jubilea, key=lambda x: datetime.strptime(x.jubileumdag, "%Y-%m-%d"))
+    # Jubilea worden door de database al op datum gesorteerd (order_by op de relatie)
+    sorted_jubilea = persoon.jubilea
     
     # Filter relaties volgens de regels:
     # 1. Toon alle symmetrische relaties
@@ -169,38 +181,41 @@ async def update_persoon(
     leeft: bool = Form(False),
     foto: UploadFile = File(None),
     current_user: Gebruikers = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
-    log_debug(f"[Update_Persoon] started... Action: {action}")
-    persoon = session.get(Personen, persoon_id)
+    log_debug("[Update_Persoon] started... Action: %s", action)
+    persoon = await session.get(Personen, persoon_id)
     if not persoon:
         raise HTTPException(status_code=404, detail="Persoon niet gevonden")
 
     if action == "delete_photo":
         if persoon.foto_url:
-            foto_path = settings.FOTO_DIR / persoon.foto_url.split('/')[-1]
-            if foto_path.exists():
-                os.remove(foto_path)
+            oude_url = persoon.foto_url
             persoon.foto_url = None
-            session.commit()
+            await session.commit()
+            await verwijder_foto(session, oude_url)
+            invalidate_caches(UPCOMING_EVENTS, SEARCH)
         return RedirectResponse(url=f"/personen/{persoon_id}/edit", status_code=303)
 
     elif action == "update_persoon":
+        if foto and foto.filename:
+            await controleer_foto(foto)
+
         persoon.voornaam = voornaam
         persoon.achternaam = achternaam
         persoon.familie_id = familie_id
         persoon.leeft = leeft
 
+        session.add(persoon)
+        await session.commit()
+        invalidate_caches(UPCOMING_EVENTS, SEARCH)
+
         if foto and foto.filename:
             try:
-                foto_url = process_photo(foto, persoon.id)
-                log_debug(f"[Update_Persoon] Foto voor persoon {foto_url} - {persoon.id} aangepast")
-                persoon.foto_url = foto_url
+                await start_foto_verwerking(foto, Personen, persoon.id)
+                log_debug("[Update_Persoon] Nieuwe foto voor persoon %s in verwerking", persoon.id)
             except Exception as e:
-                log_error(f"Fout bij het updaten van de foto: {str(e)}")
-
-        session.add(persoon)
-        session.commit()
+                log_error("Fout bij het updaten van de foto: %s", e)
         return RedirectResponse(url="/personen", status_code=303)
 
     else:
@@ -208,18 +223,34 @@ async def update_persoon(
 
 @router.get("/{persoon_id}/delete", name="delete_persoon")
 @owner_or_admin_required(Personen)
-async def delete_persoon(request: Request, persoon_id: int, session: Session = Depends(get_session)):
-    persoon = session.get(Personen, persoon_id)
+async def delete_persoon(request: Request, persoon_id: int, session: AsyncSession = Depends(get_write_session)):
+    persoon = await session.get(Personen, persoon_id)
     if not persoon:
         raise HTTPException(status_code=404, detail="Persoon niet gevonden")
-    session.delete(persoon)
-    session.commit()
+    # Eerst de relaties van de persoon, elk met het bijwerken van de afgeleide relaties
+    # (zoals delete_relatie); daarna kan er geen afgeleide relatie met de persoon meer bestaan
+    relaties = (await session.exec(select(Relaties).where(
+        or_(Relaties.persoon1_id == persoon_id, Relaties.persoon2_id == persoon_id)
+    ))).all()
+    for relatie in relaties:
+        oud = feit(relatie)
+        await session.delete(relatie)
+        await session.flush()
+        await session.run_sync(verwerk_relatie_wijziging, oud, None)
+    await session.exec(delete(AfgeleideRelaties).where(
+        or_(AfgeleideRelaties.persoon1_id == persoon_id, AfgeleideRelaties.persoon2_id == persoon_id)
+    ))
+    await session.delete(persoon)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.invalideer()  # de relaties van deze persoon tellen niet meer mee
+    clusters.invalideer()
     return RedirectResponse(url="/personen", status_code=303)
 
 @router.get("/{persoon_id}", response_class=HTMLResponse)
 @login_required
-async def persoon_detail(request: Request, persoon_id: int, session: Session = Depends(get_session)):
-    persoon = session.get(Personen, persoon_id)
+async def persoon_detail(request: Request, persoon_id: int, session: AsyncSession = Depends(get_write_session)):
+    persoon = await session.get(Personen, persoon_id, options=PERSOON_LAADPLAN)
     if not persoon:
         raise HTTPException(status_code=404, detail="Persoon niet gevonden")
     
@@ -243,32 +274,70 @@ async def persoon_detail(request: Request, persoon_id: int, session: Session = D
     
     # Haal jubilea op
     jubilea = persoon.jubilea
+
+    # Afgeleide relaties (grootouders, neven, ...) uit de gematerialiseerde tabel
+    afgeleide_relaties = (await session.exec(afgeleide_relaties_query(persoon_id))).all()
     
     return templates.TemplateResponse("persoon_detail.html", {
         "request": request,
         "persoon": persoon,
         "relaties": relaties_info,
-        "jubilea": jubilea
+        "jubilea": jubilea,
+        "afgeleide_relaties": afgeleide_relaties
+    })
+
+MAX_VERWANTEN = 1000  # rijen op de verwanten pagina
+
+@router.get("/{persoon_id}/verwanten", response_class=HTMLResponse, name="persoon_verwanten")
+@login_required
+async def persoon_verwanten(request: Request, persoon_id: int, session: AsyncSession = Depends(get_read_session),
+    soort: str = Query(VOOROUDERS, description="voorouders, nakomelingen of verwanten"),
+    diepte: int = Query(None, ge=1, description="Maximaal aantal generaties (of stappen bij verwanten)"),
+):
+    if soort not in (VOOROUDERS, NAKOMELINGEN, VERWANTEN):
+        raise HTTPException(status_code=400, detail=f"Onbekende soort: {soort}")
+    persoon = await session.get(Personen, persoon_id)
+    if not persoon:
+        raise HTTPException(status_code=404, detail="Persoon niet gevonden")
+
+    max_diepte = settings.VERWANTEN_MAX_STAPPEN if soort == VERWANTEN else settings.STAMBOOM_MAX_DIEPTE
+    diepte = min(diepte or (2 if soort == VERWANTEN else max_diepte), max_diepte)
+
+    rijen = (await session.exec(verwanten_query(soort, persoon_id, diepte).limit(MAX_VERWANTEN + 1))).all()
+    log_debug("[Personen] - Verwanten (%s, diepte %s) van %s: %s", soort, diepte, persoon_id, len(rijen))
+
+    # Gegroepeerd per generatie (of per aantal stappen)
+    generaties = []
+    for verwant, afstand in rijen[:MAX_VERWANTEN]:
+        if not generaties or generaties[-1]["diepte"] != afstand:
+            generaties.append({"diepte": afstand, "naam": generatie_naam(soort, afstand), "personen": []})
+        generaties[-1]["personen"].append(verwant)
+
+    return templates.TemplateResponse("verwanten.html", {
+        "request": request,
+        "persoon": persoon,
+        "soort": soort,
+        "diepte": diepte,
+        "max_diepte": max_diepte,
+        "generaties": generaties,
+        "afgekapt": len(rijen) > MAX_VERWANTEN,
     })
 
 @router.post("/{persoon_id}/delete_photo", name="delete_person_photo")
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
 @owner_or_admin_required(Personen)
-async def delete_person_photo(request: Request, persoon_id: int, session: Session = Depends(get_session)):
-    persoon = session.get(Personen, persoon_id)
-    log_debug(f"[Personen] - *** Verwijder foto bij {persoon.voornaam}, {persoon.achternaam} ***")
+async def delete_person_photo(request: Request, persoon_id: int, session: AsyncSession = Depends(get_write_session)):
+    persoon = await session.get(Personen, persoon_id)
+    log_debug("[Personen] - *** Verwijder foto bij %s, %s ***", persoon.voornaam, persoon.achternaam)
     if not persoon:
         raise HTTPException(status_code=404, detail="Persoon niet gevonden")
     
-    if persoon.foto_url:  # Verwijder de foto van het bestandssysteem
-        foto_path = settings.FOTO_DIR / persoon.foto_url.split('/')[-1]
-        log_debug(f"Pad naar foto: {foto_path}")
-        if foto_path.exists():
-            log_debug(f"Pad naar foto bestaaat!")
-            os.remove(foto_path)
-        
-        persoon.foto_url = None  # Verwijder de foto URL ook uit de database
-        session.commit()
+    if persoon.foto_url:
+        oude_url = persoon.foto_url
+        persoon.foto_url = None  # Verwijder de foto URL uit de database
+        await session.commit()
+        await verwijder_foto(session, oude_url)  # en daarna de bestanden, als niemand anders ze gebruikt
+        invalidate_caches(UPCOMING_EVENTS, SEARCH)
     
     return RedirectResponse(url=f"/personen/{persoon_id}/edit", status_code=303)
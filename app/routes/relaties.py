@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, Form
+import logging
+import time
+
+from fastapi import APIRouter, Depends, Request, HTTPException, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, or_
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import aliased
-from ..database import get_session
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.cache import invalidate_caches, UPCOMING_EVENTS, SEARCH
+from ..hulpmiddelen.zoekindex import search_relaties as fts_search_relaties
+from ..hulpmiddelen.paginering import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..hulpmiddelen.sjablonen import configure_templates
+from ..hulpmiddelen.relatiegraaf import relatiegraaf
+from ..hulpmiddelen.clusters import clusters
+from ..hulpmiddelen.afleiding import verwerk_relatie_wijziging, feit
 from ..models.models import Relaties, Personen, Relatietypes
 from ..auth import login_required, role_required, get_current_user
 
@@ -11,13 +22,15 @@ from ..logging_config import app_logger
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
+
+MAX_PAD_DIEPTE = 30
 
 @router.post("/search", response_class=HTMLResponse)
 @login_required
 @role_required(["Administrator", "Beheerder", "Gebruiker"])
-async def search_relaties(request: Request, search_term: str = Form(None), session: Session = Depends(get_session)):
-    app_logger.debug(f"[Relaties - Zoeken]: {search_term}")
+async def search_relaties(request: Request, search_term: str = Form(None), session: AsyncSession = Depends(get_read_session)):
+    app_logger.debug("[Relaties - Zoeken]: %s", search_term)
 
     Persoon1 = aliased(Personen)
     Persoon2 = aliased(Personen)
@@ -41,17 +54,9 @@ async def search_relaties(request: Request, search_term: str = Form(None), sessi
     )
 
     if search_term:
-        query = query.where(
-            or_(
-                Persoon1.voornaam.ilike(f"%{search_term}%"),
-                Persoon1.achternaam.ilike(f"%{search_term}%"),
-                Persoon2.voornaam.ilike(f"%{search_term}%"),
-                Persoon2.achternaam.ilike(f"%{search_term}%"),
-                Relatietypes.relatienaam.ilike(f"%{search_term}%")
-            )
-        )
-
-    results = session.exec(query).all()
+        query = fts_search_relaties(session, query, search_term, Persoon1, Persoon2)
+
+    results = (await session.exec(query)).all()
     
     relaties = []
     for row in results:
@@ -77,7 +82,10 @@ async def search_relaties(request: Request, search_term: str = Form(None), sessi
 
 @router.get("/", response_class=HTMLResponse)
 @login_required
-async def list_relaties(request: Request, session: Session = Depends(get_session)):
+async def list_relaties(request: Request, session: AsyncSession = Depends(get_read_session),
+    cursor: str = Query(None),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     app_logger.debug("list_relaties functie is aangeroepen")
     Persoon1 = aliased(Personen)
     Persoon2 = aliased(Personen)
@@ -100,11 +108,14 @@ async def list_relaties(request: Request, session: Session = Depends(get_session
         Persoon2, Relaties.persoon2_id == Persoon2.id
     )
 
-    # Log de SQL query
-    sql = query.compile(compile_kwargs={"literal_binds": True})
-    app_logger.debug(f"List Relaties: Generated SQL query: {sql}")
+    # Log de SQL query (compileren alleen als debug logging aan staat)
+    if app_logger.isEnabledFor(logging.DEBUG):
+        sql = query.compile(compile_kwargs={"literal_binds": True})
+        app_logger.debug("List Relaties: Generated SQL query: %s", sql)
     
-    results = session.exec(query).all()
+    pagina = await paginate(session, query, [Relaties.id], select(func.count()).select_from(Relaties),
+                            cursor=cursor, page_size=page_size)
+    results = pagina.items
     
     relaties = []
     for row in results:
@@ -126,13 +137,64 @@ async def list_relaties(request: Request, session: Session = Depends(get_session
             }
         })
     
-    return templates.TemplateResponse("relaties.html", {"request": request, "relaties": relaties})
+    return templates.TemplateResponse("relaties.html", {"request": request, "relaties": relaties, "pagina": pagina})
+
+@router.get("/pad", name="relatie_pad")
+@login_required
+async def relatie_pad(request: Request, session: AsyncSession = Depends(get_read_session),
+    van: int = Query(..., description="Persoon id"),
+    naar: int = Query(..., description="Persoon id"),
+    max_diepte: int = Query(12, ge=1, le=MAX_PAD_DIEPTE, description="Maximaal aantal relaties in het pad"),
+):
+    """Hoe zijn twee personen familie: het kortste pad via de relaties (zie hulpmiddelen/relatiegraaf.py)."""
+    graaf = await relatiegraaf.get(session)
+    start = time.perf_counter()
+    stappen = graaf.pad(van, naar, max_diepte)
+    zoektijd = (time.perf_counter() - start) * 1000
+
+    persoon_ids = {van, naar} | {stap.naar for stap in stappen or ()}
+    personen = {
+        row.id: {"id": row.id, "voornaam": row.voornaam, "achternaam": row.achternaam}
+        for row in await session.exec(select(Personen.id, Personen.voornaam, Personen.achternaam).where(Personen.id.in_(persoon_ids)))
+    }
+    if van not in personen or naar not in personen:
+        raise HTTPException(status_code=404, detail="Persoon niet gevonden")
+    relatienamen = dict((await session.exec(
+        select(Relatietypes.id, Relatietypes.relatienaam).where(Relatietypes.id.in_({stap.relatietype_id for stap in stappen or ()}))
+    )).all())
+    app_logger.debug("[Relaties - Pad] %s -> %s: %s stappen in %.2f ms", van, naar, len(stappen) if stappen is not None else None, zoektijd)
+
+    def naam(persoon_id):
+        persoon = personen.get(persoon_id)
+        return f"{persoon['voornaam']} {persoon['achternaam']}" if persoon else f"#{persoon_id}"
+
+    resultaat = []
+    for stap in stappen or ():
+        relatienaam = relatienamen.get(stap.relatietype_id, "?")
+        # De omschrijving volgt de richting van de relatie zelf: "persoon1 <relatie> persoon2"
+        links, rechts = (stap.naar, stap.van) if stap.omgekeerd else (stap.van, stap.naar)
+        resultaat.append({
+            "van": personen.get(stap.van),
+            "naar": personen.get(stap.naar),
+            "relatie_id": stap.relatie_id,
+            "relatienaam": relatienaam,
+            "omgekeerd": stap.omgekeerd,
+            "omschrijving": f"{naam(links)} {relatienaam} {naam(rechts)}",
+        })
+    return {
+        "van": personen[van],
+        "naar": personen[naar],
+        "gevonden": stappen is not None,
+        "afstand": len(stappen) if stappen is not None else None,
+        "stappen": resultaat,
+        "zoektijd_ms": round(zoektijd, 3),
+    }
 
 @router.get("/new", response_class=HTMLResponse)
 @login_required
-async def new_relatie(request: Request, session: Session = Depends(get_session)):
-    personen = session.exec(select(Personen)).all()
-    relatietypes = session.exec(select(Relatietypes)).all()
+async def new_relatie(request: Request, session: AsyncSession = Depends(get_write_session)):
+    personen = (await session.exec(select(Personen))).all()
+    relatietypes = (await session.exec(select(Relatietypes))).all()
     return templates.TemplateResponse("relaties_form.html", {"request": request, "personen": personen, "relatietypes": relatietypes})
 
 @router.post("/new")
@@ -142,23 +204,29 @@ async def create_relatie(
     persoon1_id: int = Form(...),
     persoon2_id: int = Form(...),
     relatietype_id: int = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
     if persoon1_id == persoon2_id:
         raise HTTPException(status_code=400, detail="Een persoon kan geen relatie met zichzelf hebben")
     new_relatie = Relaties(persoon1_id=persoon1_id, persoon2_id=persoon2_id, relatietype_id=relatietype_id)
     session.add(new_relatie)
-    session.commit()
+    await session.flush()
+    # Afgeleide relaties in dezelfde transactie bijwerken
+    await session.run_sync(verwerk_relatie_wijziging, None, feit(new_relatie))
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.voeg_toe(new_relatie)
+    clusters.verbind(new_relatie)
     return RedirectResponse(url="/relaties", status_code=303)
 
 @router.get("/{relatie_id}/edit", response_class=HTMLResponse)
 @login_required
-async def edit_relatie(request: Request, relatie_id: int, session: Session = Depends(get_session)):
-    relatie = session.get(Relaties, relatie_id)
+async def edit_relatie(request: Request, relatie_id: int, session: AsyncSession = Depends(get_write_session)):
+    relatie = await session.get(Relaties, relatie_id)
     if not relatie:
         raise HTTPException(status_code=404, detail="Relatie niet gevonden")
-    personen = session.exec(select(Personen)).all()
-    relatietypes = session.exec(select(Relatietypes)).all()
+    personen = (await session.exec(select(Personen))).all()
+    relatietypes = (await session.exec(select(Relatietypes))).all()
     return templates.TemplateResponse("relaties_form.html", {"request": request, "relatie": relatie, "personen": personen, "relatietypes": relatietypes})
 
 @router.post("/{relatie_id}/edit")
@@ -169,12 +237,13 @@ async def update_relatie(
     persoon1_id: int = Form(...),
     persoon2_id: int = Form(...),
     relatietype_id: int = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_write_session)
 ):
-    relatie = session.get(Relaties, relatie_id)
+    relatie = await session.get(Relaties, relatie_id)
     if not relatie:
         raise HTTPException(status_code=404, detail="Relatie niet gevonden")
     
+    oud = feit(relatie)
     relatie.persoon1_id = persoon1_id
     relatie.persoon2_id = persoon2_id
     relatie.relatietype_id = relatietype_id
@@ -183,15 +252,27 @@ async def update_relatie(
         raise HTTPException(status_code=400, detail="Een persoon kan geen relatie met zichzelf hebben")
     
     session.add(relatie)
-    session.commit()
+    await session.flush()
+    await session.run_sync(verwerk_relatie_wijziging, oud, feit(relatie))
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.wijzig(relatie)
+    if oud[:2] != feit(relatie)[:2]:
+        clusters.invalideer()  # de oude relatie kan een cluster gesplitst hebben
     return RedirectResponse(url="/relaties", status_code=303)
 
 @router.get("/{relatie_id}/delete")
 @login_required
-async def delete_relatie(request: Request,relatie_id: int, session: Session = Depends(get_session)):
-    relatie = session.get(Relaties, relatie_id)
+async def delete_relatie(request: Request,relatie_id: int, session: AsyncSession = Depends(get_write_session)):
+    relatie = await session.get(Relaties, relatie_id)
     if not relatie:
         raise HTTPException(status_code=404, detail="Relatie niet gevonden")
-    session.delete(relatie)
-    session.commit()
+    oud = feit(relatie)
+    await session.delete(relatie)
+    await session.flush()
+    await session.run_sync(verwerk_relatie_wijziging, oud, None)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.verwijder(relatie_id)
+    clusters.invalideer()
     return RedirectResponse(url="/relaties", status_code=303)
@@ -1,41 +1,65 @@
 from fastapi import APIRouter, Depends, Request, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from ..database import get_session
-from ..models.models import Relatietypes
+from sqlmodel import select, delete, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database import get_read_session, get_write_session
+from ..hulpmiddelen.cache import invalidate_caches, UPCOMING_EVENTS, SEARCH
+from ..hulpmiddelen.relatiegraaf import relatiegraaf
+from ..hulpmiddelen.sjablonen import configure_templates
+from ..hulpmiddelen.stamboom import AFSTAMMING
+from ..hulpmiddelen.afleiding import herbereken_afgeleide_relaties
+from ..models.models import Relatietypes, Afleidingsregels
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="templates")
+templates = configure_templates(Jinja2Templates(directory="templates"))
+
+def _afstamming(waarde: str):
+    if not waarde:
+        return None
+    if waarde not in AFSTAMMING:
+        raise HTTPException(status_code=400, detail="Ongeldige afstamming")
+    return waarde
 
 @router.get("/", name="list_relatietypes")
-async def list_relatietypes(request: Request, session: Session = Depends(get_session)):
-    relatietypes = session.exec(select(Relatietypes)).all()
+async def list_relatietypes(request: Request, session: AsyncSession = Depends(get_read_session)):
+    relatietypes = (await session.exec(select(Relatietypes))).all()
     return templates.TemplateResponse("relatietypes.html", {"request": request, "relatietypes": relatietypes})
 
 @router.get("/new", name="new_relatietype")
 async def new_relatietype(request: Request):
-    return templates.TemplateResponse("relatietype_form.html", {"request": request})
+    return templates.TemplateResponse("relatietype_form.html", {"request": request, "afstamming": AFSTAMMING})
 
 @router.post("/new", name="create_relatietype")
 async def create_relatietype(
     request: Request,
     relatienaam: str = Form(...),
     symmetrisch: bool = Form(False),
-    session: Session = Depends(get_session)
+    afstamming: str = Form(""),
+    session: AsyncSession = Depends(get_write_session)
 ):
-    new_relatietype = Relatietypes(relatienaam=relatienaam, symmetrisch=symmetrisch)
+    new_relatietype = Relatietypes(relatienaam=relatienaam, symmetrisch=symmetrisch, afstamming=_afstamming(afstamming))
     session.add(new_relatietype)
-    session.commit()
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.invalideer()
     return RedirectResponse(url="/relatietypes", status_code=303)
 
 @router.get("/{relatietype_id}/edit", name="edit_relatietype")
-async def edit_relatietype(request: Request, relatietype_id: int, session: Session = Depends(get_session)):
-    relatietype = session.get(Relatietypes, relatietype_id)
+async def edit_relatietype(request: Request, relatietype_id: int, session: AsyncSession = Depends(get_write_session)):
+    relatietype = await session.get(Relatietypes, relatietype_id)
     if not relatietype:
         raise HTTPException(status_code=404, detail="Relatietype niet gevonden")
-    return templates.TemplateResponse("relatietype_form.html", {"request": request, "relatietype": relatietype})
+    relatietypes = {t.id: t for t in (await session.exec(select(Relatietypes).order_by(Relatietypes.relatienaam))).all()}
+    regels = (await session.exec(select(Afleidingsregels).where(Afleidingsregels.relatietype_id == relatietype_id))).all()
+    return templates.TemplateResponse("relatietype_form.html", {
+        "request": request,
+        "relatietype": relatietype,
+        "afstamming": AFSTAMMING,
+        "relatietypes": relatietypes,
+        "regels": regels,
+    })
 
 @router.post("/{relatietype_id}/edit", name="update_relatietype")
 async def update_relatietype(
@@ -43,23 +67,72 @@ async def update_relatietype(
     relatietype_id: int,
     relatienaam: str = Form(...),
     symmetrisch: bool = Form(False),
-    session: Session = Depends(get_session)
+    afstamming: str = Form(""),
+    session: AsyncSession = Depends(get_write_session)
 ):
-    relatietype = session.get(Relatietypes, relatietype_id)
+    relatietype = await session.get(Relatietypes, relatietype_id)
     if not relatietype:
         raise HTTPException(status_code=404, detail="Relatietype niet gevonden")
     
+    symmetrie_gewijzigd = relatietype.symmetrisch != symmetrisch
     relatietype.relatienaam = relatienaam
     relatietype.symmetrisch = symmetrisch
+    relatietype.afstamming = _afstamming(afstamming)
     session.add(relatietype)
-    session.commit()
+    if symmetrie_gewijzigd:
+        await session.flush()
+        await session.run_sync(herbereken_afgeleide_relaties)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.invalideer()
     return RedirectResponse(url="/relatietypes", status_code=303)
 
 @router.get("/{relatietype_id}/delete", name="delete_relatietype")
-async def delete_relatietype(request: Request, relatietype_id: int, session: Session = Depends(get_session)):
-    relatietype = session.get(Relatietypes, relatietype_id)
+async def delete_relatietype(request: Request, relatietype_id: int, session: AsyncSession = Depends(get_write_session)):
+    relatietype = await session.get(Relatietypes, relatietype_id)
     if not relatietype:
         raise HTTPException(status_code=404, detail="Relatietype niet gevonden")
-    session.delete(relatietype)
-    session.commit()
+    # Regels die dit type gebruiken of opleveren vervallen
+    await session.exec(delete(Afleidingsregels).where(or_(
+        Afleidingsregels.relatietype_id == relatietype_id,
+        Afleidingsregels.eerste_type_id == relatietype_id,
+        Afleidingsregels.tweede_type_id == relatietype_id,
+    )))
+    await session.delete(relatietype)
+    await session.flush()
+    await session.run_sync(herbereken_afgeleide_relaties)
+    await session.commit()
+    invalidate_caches(UPCOMING_EVENTS, SEARCH)
+    relatiegraaf.invalideer()
     return RedirectResponse(url="/relatietypes", status_code=303)
+
+@router.post("/{relatietype_id}/regels/new", name="create_afleidingsregel")
+async def create_afleidingsregel(
+    request: Request,
+    relatietype_id: int,
+    eerste_type_id: int = Form(...),
+    eerste_omgekeerd: bool = Form(False),
+    tweede_type_id: int = Form(...),
+    tweede_omgekeerd: bool = Form(False),
+    session: AsyncSession = Depends(get_write_session)
+):
+    for type_id in (relatietype_id, eerste_type_id, tweede_type_id):
+        if not await session.get(Relatietypes, type_id):
+            raise HTTPException(status_code=404, detail="Relatietype niet gevonden")
+    session.add(Afleidingsregels(relatietype_id=relatietype_id, eerste_type_id=eerste_type_id, eerste_omgekeerd=eerste_omgekeerd,
+                                 tweede_type_id=tweede_type_id, tweede_omgekeerd=tweede_omgekeerd))
+    await session.flush()
+    await session.run_sync(herbereken_afgeleide_relaties)
+    await session.commit()
+    return RedirectResponse(url=request.url_for("edit_relatietype", relatietype_id=relatietype_id).path, status_code=303)
+
+@router.get("/{relatietype_id}/regels/{regel_id}/delete", name="delete_afleidingsregel")
+async def delete_afleidingsregel(request: Request, relatietype_id: int, regel_id: int, session: AsyncSession = Depends(get_write_session)):
+    regel = await session.get(Afleidingsregels, regel_id)
+    if not regel or regel.relatietype_id != relatietype_id:
+        raise HTTPException(status_code=404, detail="Afleidingsregel niet gevonden")
+    await session.delete(regel)
+    await session.flush()
+    await session.run_sync(herbereken_afgeleide_relaties)
+    await session.commit()
+    return RedirectResponse(url=request.url_for("edit_relatietype", relatietype_id=relatietype_id).path, status_code=303)
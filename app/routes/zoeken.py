@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import aliased
+from ..database import new_read_session
+from ..models.models import Personen, Families, Jubilea, Jubileumtypes, Relaties, Relatietypes
+from ..auth import login_required
+from ..hulpmiddelen.cache import get_cache, SEARCH
+from ..hulpmiddelen.zoekindex import search_personen, search_families, search_jubilea, search_relaties
+from ..logging_config import log_debug
+from config import get_settings
+
+router   = APIRouter()
+settings = get_settings()
+
+# Eén zoek-API over alle entiteiten, bedoeld voor een type-ahead zoekveld.
+# Elk type wordt gelijktijdig gezocht (eigen async sessie per type).
+# Resultaten worden kort gecachet, zodat elke toetsaanslag niet opnieuw de database raakt.
+
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT        = 25
+
+async def _zoek_personen(session: AsyncSession, q: str, limit: int):
+    query = search_personen(session, select(Personen), q).limit(limit)
+    return [
+        {"type": "persoon", "id": p.id, "label": f"{p.voornaam} {p.achternaam}", "url": f"/personen/{p.id}"}
+        for p in await session.exec(query)
+    ]
+
+async def _zoek_families(session: AsyncSession, q: str, limit: int):
+    query = search_families(session, select(Families), q).limit(limit)
+    return [
+        {"type": "familie", "id": f.id, "label": f"{f.familienaam}, {f.plaats}", "url": f"/families/{f.id}"}
+        for f in await session.exec(query)
+    ]
+
+async def _zoek_jubilea(session: AsyncSession, q: str, limit: int):
+    query = select(Jubilea, Personen, Jubileumtypes).outerjoin(Personen).join(Jubileumtypes)
+    query = search_jubilea(session, query, q).limit(limit)
+    return [
+        {
+            "type": "jubileum",
+            "id": jubileum.id,
+            "label": f"{jubileum.jubileumnaam} ({persoon.voornaam} {persoon.achternaam})" if persoon else jubileum.jubileumnaam,
+            "url": f"/jubilea/{jubileum.id}/edit",
+        }
+        for jubileum, persoon, jubileumtype in await session.exec(query)
+    ]
+
+async def _zoek_relaties(session: AsyncSession, q: str, limit: int):
+    Persoon1 = aliased(Personen)
+    Persoon2 = aliased(Personen)
+    query = select(
+        Relaties.id,
+        Persoon1.voornaam.label('persoon1_voornaam'),
+        Relatietypes.relatienaam,
+        Persoon2.voornaam.label('persoon2_voornaam'),
+    ).join(
+        Persoon1, Relaties.persoon1_id == Persoon1.id
+    ).join(
+        Relatietypes, Relaties.relatietype_id == Relatietypes.id
+    ).outerjoin(
+        Persoon2, Relaties.persoon2_id == Persoon2.id
+    )
+    query = search_relaties(session, query, q, Persoon1, Persoon2).order_by(Relaties.id).limit(limit)
+    return [
+        {
+            "type": "relatie",
+            "id": row.id,
+            "label": f"{row.persoon1_voornaam} {row.relatienaam} {row.persoon2_voornaam}",
+            "url": f"/relaties/{row.id}/edit",
+        }
+        for row in await session.exec(query)
+    ]
+
+ZOEKERS = {
+    "personen": _zoek_personen,
+    "families": _zoek_families,
+    "jubilea":  _zoek_jubilea,
+    "relaties": _zoek_relaties,
+}
+
+async def _zoek_type(soort: str, q: str, limit: int):
+    async def bereken():
+        async with new_read_session() as session:
+            return await ZOEKERS[soort](session, q, limit)
+    cache = get_cache(SEARCH, settings.SEARCH_CACHE_TTL, settings.SEARCH_CACHE_MAX_ENTRIES)
+    return await cache.get_or_compute_async((soort, q.lower(), limit), bereken)
+
+async def _zoek_alle(soorten, q: str, limit: int):
+    """Start alle zoekacties tegelijk en levert (soort, hits) op in volgorde van gereedkomen."""
+    async def een_soort(soort):
+        return soort, await _zoek_type(soort, q, limit)
+
+    for taak in asyncio.as_completed([een_soort(soort) for soort in soorten]):
+        yield await taak
+
+@router.get("", name="search_all")
+@login_required
+async def search_all(
+    request: Request,
+    q: str = Query(..., description="Zoekterm (minimaal 2 tekens)"),
+    types: str = Query(None, description="Komma-gescheiden: personen, families, jubilea, relaties"),
+    limit: int = Query(5, ge=1, le=MAX_LIMIT, description="Maximaal aantal treffers per type"),
+    stream: bool = Query(False, description="Resultaten als NDJSON streamen zodra een type klaar is"),
+):
+    q = q.strip()
+    soorten = [s.strip() for s in types.split(",")] if types else list(ZOEKERS)
+    onbekend = [s for s in soorten if s not in ZOEKERS]
+    if onbekend:
+        raise HTTPException(status_code=400, detail=f"Onbekend zoektype: {', '.join(onbekend)}")
+    log_debug("[Zoeken] q=%r types=%s limit=%s stream=%s", q, soorten, limit, stream)
+
+    if len(q) < MIN_QUERY_LENGTH:
+        soorten = []
+
+    if stream:
+        async def ndjson():
+            async for soort, hits in _zoek_alle(soorten, q, limit):
+                yield json.dumps({"type": soort, "hits": hits}) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = {soort: [] for soort in soorten}
+    async for soort, hits in _zoek_alle(soorten, q, limit):
+        results[soort] = hits
+    return {"query": q, "results": results}
@@ -0,0 +1,134 @@
+"""Benchmark van de indexen uit migratie c4f2a8b61d37 (foreign keys, created_by en sorteerkolommen).
+
+Maakt een tijdelijke SQLite database met een grote, willekeurige dataset, meet een aantal
+queries zoals de lijstpagina's en de persoonspagina die ze uitvoeren, zonder en met de indexen.
+
+    python benchmark_indexen.py [--personen 100000] [--herhalingen 20]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select, tuple_
+from sqlmodel import SQLModel
+
+from app.models.models import Families, Personen, Jubilea, Relaties
+
+MIGRATIE = Path(__file__).parent / "alembic" / "versions" / "c4f2a8b61d37_fk_en_sorteer_indexen.py"
+
+def laad_indexen():
+    spec = importlib.util.spec_from_file_location("migratie", MIGRATIE)
+    migratie = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migratie)
+    return migratie.INDEXEN
+
+def vul_database(connection, aantal_personen: int):
+    rnd = random.Random(42)
+    achternamen = [f"Achternaam{i}" for i in range(aantal_personen // 20)]
+    voornamen   = [f"Voornaam{i}" for i in range(2000)]
+    aantal_families = aantal_personen // 5
+    aantal_gebruikers = 10
+
+    connection.exec_driver_sql(
+        "INSERT INTO gebruikers (id, email, naam, google_id, is_active, created_at) VALUES (?, ?, ?, ?, 1, '2024-01-01')",
+        [(i, f"gebruiker{i}@example.com", f"Gebruiker {i}", f"g{i}") for i in range(1, aantal_gebruikers + 1)])
+    connection.exec_driver_sql(
+        "INSERT INTO families (id, familienaam, straatnaam, huisnummer, postcode, plaats, created_by) VALUES (?, ?, 'Straat', '1', '1234AB', 'Plaats', ?)",
+        [(i, rnd.choice(achternamen), rnd.randint(1, aantal_gebruikers)) for i in range(1, aantal_families + 1)])
+    connection.exec_driver_sql(
+        "INSERT INTO personen (id, voornaam, achternaam, leeft, familie_id, created_by) VALUES (?, ?, ?, 1, ?, ?)",
+        [(i, rnd.choice(voornamen), rnd.choice(achternamen), rnd.randint(1, aantal_families), rnd.randint(1, aantal_gebruikers))
+         for i in range(1, aantal_personen + 1)])
+    connection.exec_driver_sql(
+        "INSERT INTO relatietypes (id, relatienaam, symmetrisch) VALUES (?, ?, ?)",
+        [(1, "ouder van", 0), (2, "partner van", 1), (3, "broer/zus van", 1)])
+    connection.exec_driver_sql(
+        "INSERT INTO relaties (persoon1_id, persoon2_id, relatietype_id) VALUES (?, ?, ?)",
+        [(rnd.randint(1, aantal_personen), rnd.randint(1, aantal_personen), rnd.randint(1, 3)) for _ in range(aantal_personen * 2)])
+    connection.exec_driver_sql(
+        "INSERT INTO jubileumtypes (id, naam) VALUES (?, ?)", [(1, "Verjaardag"), (2, "Huwelijk"), (3, "Overlijden")])
+    connection.exec_driver_sql(
+        "INSERT INTO jubilea (jubileumdag, jubileum_maanddag, jubileumnaam, persoon_id, jubileumtype_id, created_by) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"19{rnd.randint(30, 99)}-{m:02d}-{d:02d}", m * 100 + d, f"Jubileum {rnd.randint(1, 10**6)}", rnd.randint(1, aantal_personen),
+          rnd.randint(1, 3), rnd.randint(1, aantal_gebruikers))
+         for m, d in ((rnd.randint(1, 12), rnd.randint(1, 28)) for _ in range(aantal_personen))])
+
+def queries(aantal_personen: int):
+    persoon_id = aantal_personen // 2
+    familie_id = aantal_personen // 10
+    pagina = 50
+    return {
+        "relaties van een persoon": select(Relaties).where(
+            (Relaties.persoon1_id == persoon_id) | (Relaties.persoon2_id == persoon_id)),
+        "relaties per type (selectinload)": select(Relaties).where(
+            Relaties.persoon1_id.in_(range(persoon_id, persoon_id + 50)), Relaties.relatietype_id == 1),
+        "jubilea van een persoon": select(Jubilea).where(Jubilea.persoon_id == persoon_id).order_by(Jubilea.jubileumdag),
+        "personen van een familie": select(Personen).where(Personen.familie_id == familie_id),
+        "personen op achternaam, pagina 100": select(Personen, Families).join(Families)
+            .where(tuple_(Personen.achternaam, Personen.id) > tuple_("Achternaam2500", 0))
+            .order_by(Personen.achternaam, Personen.id).limit(pagina + 1),
+        "personen op voornaam, eerste pagina": select(Personen, Families).join(Families)
+            .order_by(Personen.voornaam, Personen.id).limit(pagina + 1),
+        "jubilea op naam, eerste pagina": select(Jubilea).order_by(Jubilea.jubileumnaam, Jubilea.id).limit(pagina + 1),
+        "aantal items van een eigenaar": select(func.count()).select_from(Personen).where(Personen.created_by == 3),
+    }
+
+def meet(connection, query, herhalingen: int) -> float:
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        connection.execute(query).all()
+        tijden.append(time.perf_counter() - start)
+    return statistics.median(tijden) * 1000
+
+def plan(connection, query) -> str:
+    sql = str(query.compile(connection, compile_kwargs={"literal_binds": True}))
+    return " | ".join(rij[-1] for rij in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--personen", type=int, default=100_000)
+    parser.add_argument("--herhalingen", type=int, default=20)
+    parser.add_argument("--plan", action="store_true", help="toon ook het query plan")
+    args = parser.parse_args()
+
+    indexen = laad_indexen()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'benchmark.db')}")
+        SQLModel.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for naam, _, _ in indexen:
+                connection.exec_driver_sql(f"DROP INDEX IF EXISTS {naam}")
+            print(f"Database vullen met {args.personen} personen ...")
+            vul_database(connection, args.personen)
+            connection.exec_driver_sql("ANALYZE")
+
+        resultaten = {}
+        with engine.connect() as connection:
+            for naam, query in queries(args.personen).items():
+                resultaten[naam] = [meet(connection, query, args.herhalingen), None, plan(connection, query), None]
+
+        with engine.begin() as connection:
+            for naam, tabel, kolommen in indexen:
+                connection.exec_driver_sql(f"CREATE INDEX {naam} ON {tabel} ({', '.join(kolommen)})")
+            connection.exec_driver_sql("ANALYZE")
+
+        with engine.connect() as connection:
+            for naam, query in queries(args.personen).items():
+                resultaten[naam][1] = meet(connection, query, args.herhalingen)
+                resultaten[naam][3] = plan(connection, query)
+        engine.dispose()
+
+    print(f"\n{'query':<38} {'zonder (ms)':>12} {'met (ms)':>10} {'factor':>8}")
+    for naam, (zonder, met, plan_zonder, plan_met) in resultaten.items():
+        print(f"{naam:<38} {zonder:>12.2f} {met:>10.2f} {zonder / met:>7.1f}x")
+        if args.plan:
+            print(f"    zonder: {plan_zonder}\n    met:    {plan_met}")
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,40 @@ class Settings(BaseSettings):
     PORT                : int           = Field(default=8000)
     DEVELOPMENT         : bool          = Field(default=True) # True is value 1.
     FOTO_DIR            : str           = Field(default=str(PROJECT_ROOT / "data" / "fotos"))
+    FOTO_WORKERS        : int           = Field(default=2) # processen voor het verwerken van foto's
+    MAX_UPLOAD_BYTES    : int           = Field(default=10 * 1024 * 1024) # maximale grootte van een upload (hele request)
+    MAX_IMAGE_PIXELS    : int           = Field(default=50_000_000) # breedte x hoogte van een geüploade foto
+    LOG_FORMAT          : str           = Field(default="text") # "text" of "json" (één JSON object per regel)
+    LOG_QUEUE           : bool          = Field(default=True)   # log handlers in een aparte thread
+    UPCOMING_EVENTS_CACHE_TTL: int      = Field(default=300) # seconden
+    SEARCH_CACHE_TTL    : int           = Field(default=60)  # seconden
+    SEARCH_CACHE_MAX_ENTRIES: int       = Field(default=1000) # zoektermen in de cache, daarna least recently used eruit
+    STAMBOOM_MAX_DIEPTE : int           = Field(default=25)  # generaties voor voorouders en nakomelingen
+    VERWANTEN_MAX_STAPPEN: int          = Field(default=6)   # relaties voor "verwanten binnen N stappen"
+    RELATIEGRAAF_TTL    : int           = Field(default=300) # seconden; daarna opnieuw laden (wijzigingen door andere workers)
+    CLUSTERS_TTL        : int           = Field(default=300) # seconden; idem voor de clusters (admin/clusters)
+    ASYNC_DATABASE_URL  : Optional[str] = Field(default=None) # standaard afgeleid van DATABASE_URL
+    DATABASE_READ_URL   : Optional[str] = Field(default=None) # read replica voor zware leespagina's
+    SQLITE_READ_ONLY    : bool          = Field(default=True) # zonder replica: aparte query_only pool op hetzelfde bestand
+
+    # Connection pool (niet van toepassing op een in-memory database)
+    DB_POOL_SIZE        : int           = Field(default=5)
+    DB_MAX_OVERFLOW     : int           = Field(default=10)
+    DB_POOL_TIMEOUT     : int           = Field(default=30)   # seconden wachten op een vrije connectie
+    DB_POOL_RECYCLE     : int           = Field(default=3600) # seconden, -1 = nooit
+
+    # SQLite pragmas, per connectie gezet
+    SQLITE_JOURNAL_MODE : str           = Field(default="WAL")
+    SQLITE_SYNCHRONOUS  : str           = Field(default="NORMAL")   # NORMAL is veilig in WAL mode
+    SQLITE_BUSY_TIMEOUT : int           = Field(default=5000)       # milliseconden
+    SQLITE_CACHE_SIZE   : int           = Field(default=-20000)     # negatief = KiB, dus ~20 MB
+    SQLITE_MMAP_SIZE    : int           = Field(default=134217728)  # bytes (128 MB), 0 = uit
+    SQLITE_TEMP_STORE   : str           = Field(default="MEMORY")
+
+    # Slow query log (opt-in): queries boven deze drempel worden met parameters, route en
+    # EXPLAIN (QUERY PLAN) gelogd op niveau SLOW_QUERY
+    SLOW_QUERY_MS       : Optional[int] = Field(default=None) # milliseconden, None = uit
+    SLOW_QUERY_EXPLAIN  : bool          = Field(default=True)
 
     class Config:
         env_file          = ".env"
@@ -0,0 +1,51 @@
+"""Nachtelijke controle op losse clusters: personen die via geen enkele relatie met de rest verbonden zijn.
+
+Bouwt de clusters in één doorloop over de relaties op (zie app/hulpmiddelen/clusters.py) en toont
+de verdeling en de kleinere clusters naast het grootste, met een paar namen per cluster.
+
+    python controleer_clusters.py [--toon 20]
+"""
+import argparse
+import time
+
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.hulpmiddelen.clusters import Clusters, PERSONEN_QUERY, RELATIES_QUERY
+from app.logging_config import log_info
+from app.models.models import Personen
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--toon", type=int, default=20, help="aantal losse clusters om te tonen")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        personen = session.exec(PERSONEN_QUERY).all()
+        relaties = session.exec(RELATIES_QUERY).all()
+        gelezen = time.perf_counter()
+        clusters = Clusters(personen, relaties)
+        klaar = time.perf_counter()
+
+        alle = clusters.clusters()
+        print(f"{len(personen)} personen, {len(relaties)} relaties: {clusters.aantal} clusters "
+              f"(lezen {(gelezen - start) * 1000:.0f} ms, opbouwen {(klaar - gelezen) * 1000:.0f} ms)")
+        print("\ngrootte  aantal")
+        for grootte, aantal in clusters.verdeling().items():
+            print(f"{grootte:>7}  {aantal:>6}")
+
+        losse = alle[1:args.toon + 1]
+        if losse:
+            print(f"\nLosse clusters naast het grootste ({len(alle[0])} personen):")
+            namen = {persoon.id: f"{persoon.voornaam} {persoon.achternaam}" for persoon in session.exec(
+                select(Personen).where(Personen.id.in_([p for cluster in losse for p in cluster[:5]])))}
+            for cluster in losse:
+                voorbeeld = ", ".join(namen[p] for p in cluster[:5] if p in namen)
+                print(f"  {len(cluster):>5}: {voorbeeld}{', ...' if len(cluster) > 5 else ''}")
+
+    log_info("[Clusters] controle: %s personen in %s clusters, waarvan %s zonder relaties",
+             len(personen), clusters.aantal, clusters.verdeling().get(1, 0))
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from sqlalchemy.exc import OperationalError
 from app.models.models import Rollen, Gebruikers, Families, Personen, Jubileumtypes, Jubilea, Relatietypes, Relaties
 
 from app.logging_config import app_logger, log_info
+from app.hulpmiddelen.zoekindex import create_search_index
 
 def init_db():
     # Extract the database file path from the DATABASE_URL
@@ -30,16 +31,20 @@ def init_db():
                 try:
                     # Use text() to wrap the SQL query
                     session.execute(text(f"SELECT * FROM {table.name} LIMIT 1"))
-                    app_logger.info(f"Table '{table.name}' already exists.")
+                    app_logger.info("Table '%s' already exists.", table.name)
                 except OperationalError:
-                    app_logger.info(f"Table '{table.name}' does not exist. Creating...")
+                    app_logger.info("Table '%s' does not exist. Creating...", table.name)
                     table.create(engine)
-                    app_logger.info(f"Table '{table.name}' created successfully.")
+                    app_logger.info("Table '%s' created successfully.", table.name)
+
+        # FTS5 zoekindex (tabellen + triggers) aanmaken als die nog ontbreekt
+        with engine.begin() as connection:
+            create_search_index(connection)
 
 if __name__ == "__main__":
     try:
         init_db()
         app_logger.info("Database initialization process completed successfully.")
     except Exception as e:
-        app_logger.error(f"An error occurred during database initialization: {str(e)}")
+        app_logger.error("An error occurred during database initialization: %s", e)
         raise
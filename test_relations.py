@@ -1,4 +1,5 @@
 from sqlmodel import Session, select
+from datetime import date
 from app.database import engine
 from app.models.models import Families, Personen, Jubilea, Relatietypes, Relaties
 
@@ -11,8 +12,8 @@ def insert_test_data():
         session.add(familie2)
         
         # Maak testdata aan voor Jubilea
-        jubileum1 = Jubilea(jubileumnaam="Huwelijk", jubileumdag="2000-05-15")
-        jubileum2 = Jubilea(jubileumnaam="Verjaardag", jubileumdag="1990-03-21")
+        jubileum1 = Jubilea(jubileumnaam="Huwelijk", jubileumdag=date(2000, 5, 15))
+        jubileum2 = Jubilea(jubileumnaam="Verjaardag", jubileumdag=date(1990, 3, 21))
         session.add(jubileum1)
         session.add(jubileum2)
         
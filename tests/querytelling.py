@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Hulpmiddel voor tests: telt de SQL statements die via een engine worden uitgevoerd.
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._before_cursor_execute)
+
+class QueryCountMixin:
+    """Voor unittest.TestCase: self.assertMaxQueries(engine, n) als context manager."""
+
+    @contextmanager
+    def assertMaxQueries(self, engine, maximum):
+        with count_queries(engine) as counter:
+            yield counter
+        self.assertLessEqual(
+            counter.count, maximum,
+            f"{counter.count} queries uitgevoerd, maximaal {maximum} verwacht:\n" + "\n".join(counter.statements)
+        )
@@ -0,0 +1,144 @@
+import random
+import unittest
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select, delete
+
+from app.hulpmiddelen.afleiding import verwerk_relatie_wijziging, herbereken_afgeleide_relaties, afgeleide_relaties_query, feit
+from app.models.models import Families, Personen, Relatietypes, Relaties, Afleidingsregels, AfgeleideRelaties
+from tests.querytelling import QueryCountMixin
+
+OUDER, GEHUWD, GROOTOUDER, BROER_ZUS, OOM_TANTE, NEEF, SCHOONOUDER, VOOROUDER, BEKENDE = range(1, 10)
+
+class TestAfleiding(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Families(id=1, familienaam="De Vries", straatnaam="Hoofdstraat", huisnummer="1", postcode="1234AB", plaats="Amsterdam"))
+        for i in range(1, 41):
+            self.session.add(Personen(id=i, voornaam=f"Persoon{i}", achternaam="de Vries", familie_id=1))
+        self.session.add_all([
+            Relatietypes(id=OUDER, relatienaam="is ouder van"),
+            Relatietypes(id=GEHUWD, relatienaam="is gehuwd met", symmetrisch=True),
+            Relatietypes(id=GROOTOUDER, relatienaam="is grootouder van"),
+            Relatietypes(id=BROER_ZUS, relatienaam="is broer/zus van", symmetrisch=True),
+            Relatietypes(id=OOM_TANTE, relatienaam="is oom/tante van"),
+            Relatietypes(id=NEEF, relatienaam="is neef/nicht van", symmetrisch=True),
+            Relatietypes(id=SCHOONOUDER, relatienaam="is schoonouder van"),
+            Relatietypes(id=VOOROUDER, relatienaam="is voorouder van"),
+            Relatietypes(id=BEKENDE, relatienaam="is bekende van", symmetrisch=True),
+        ])
+        self.session.add_all([
+            Afleidingsregels(relatietype_id=GROOTOUDER, eerste_type_id=OUDER, tweede_type_id=OUDER),
+            Afleidingsregels(relatietype_id=BROER_ZUS, eerste_type_id=OUDER, eerste_omgekeerd=True, tweede_type_id=OUDER),
+            Afleidingsregels(relatietype_id=OOM_TANTE, eerste_type_id=BROER_ZUS, tweede_type_id=OUDER),
+            Afleidingsregels(relatietype_id=NEEF, eerste_type_id=OUDER, eerste_omgekeerd=True, tweede_type_id=OOM_TANTE),
+            Afleidingsregels(relatietype_id=SCHOONOUDER, eerste_type_id=OUDER, tweede_type_id=GEHUWD),
+            # Recursief: voorouders tot elke diepte
+            Afleidingsregels(relatietype_id=VOOROUDER, eerste_type_id=OUDER, tweede_type_id=OUDER),
+            Afleidingsregels(relatietype_id=VOOROUDER, eerste_type_id=OUDER, tweede_type_id=VOOROUDER),
+            # Een gewoon relatietype dat ook uit zichzelf volgt: bekenden van bekenden
+            Afleidingsregels(relatietype_id=BEKENDE, eerste_type_id=BEKENDE, tweede_type_id=BEKENDE),
+        ])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def afgeleid(self):
+        return {tuple(rij) for rij in self.session.exec(
+            select(AfgeleideRelaties.persoon1_id, AfgeleideRelaties.persoon2_id, AfgeleideRelaties.relatietype_id))}
+
+    def voeg_toe(self, persoon1, persoon2, relatietype):
+        relatie = Relaties(persoon1_id=persoon1, persoon2_id=persoon2, relatietype_id=relatietype)
+        self.session.add(relatie)
+        self.session.flush()
+        verwerk_relatie_wijziging(self.session, None, feit(relatie))
+        self.session.commit()
+        return relatie
+
+    def verwijder(self, relatie):
+        oud = feit(relatie)
+        self.session.delete(relatie)
+        self.session.flush()
+        verwerk_relatie_wijziging(self.session, oud, None)
+        self.session.commit()
+
+    def test_grootouders_neven_en_schoonouders(self):
+        # 1 en 2 zijn ouders van 3 en 4; 3 is ouder van 5, 4 is ouder van 6; 5 is gehuwd met 7
+        for persoon1, persoon2 in [(1, 3), (2, 3), (1, 4), (2, 4), (3, 5), (4, 6)]:
+            self.voeg_toe(persoon1, persoon2, OUDER)
+        self.voeg_toe(7, 5, GEHUWD)
+        afgeleid = self.afgeleid()
+        self.assertTrue({(1, 5, GROOTOUDER), (2, 6, GROOTOUDER), (3, 4, BROER_ZUS), (3, 6, OOM_TANTE),
+                         (4, 5, OOM_TANTE), (5, 6, NEEF), (3, 7, SCHOONOUDER), (1, 6, VOOROUDER)} <= afgeleid)
+        self.assertNotIn((5, 5, NEEF), afgeleid)
+
+        # Lookup: alle afgeleide relaties van een persoon in één query
+        with self.assertMaxQueries(self.engine, 1):
+            relaties = [(t.id, p.id) for t, p in self.session.exec(afgeleide_relaties_query(6))]
+        self.assertIn((NEEF, 5), relaties)
+
+    def test_verwijderen_met_andere_afleiding(self):
+        een = self.voeg_toe(1, 3, OUDER)
+        self.voeg_toe(2, 3, OUDER)
+        self.voeg_toe(1, 4, OUDER)
+        twee = self.voeg_toe(2, 4, OUDER)
+        # 3 en 4 blijven broer/zus via ouder 2 (en daarna via ouder 1)
+        self.verwijder(een)
+        self.assertIn((3, 4, BROER_ZUS), self.afgeleid())
+        self.verwijder(twee)
+        self.assertNotIn((3, 4, BROER_ZUS), self.afgeleid())
+
+    def test_verwijderen_bij_recursief_relatietype(self):
+        # (1, 2) staat na het toevoegen van (2, 3) ook in AfgeleideRelaties (via 1-3-2), maar steunt
+        # dan op zichzelf: na het verwijderen van de relatie mag er niets afgeleid overblijven
+        een = self.voeg_toe(1, 2, BEKENDE)
+        self.voeg_toe(2, 3, BEKENDE)
+        self.assertIn((1, 2, BEKENDE), self.afgeleid())
+        self.verwijder(een)
+        self.assertEqual(self.afgeleid(), set())
+        self.assertEqual(herbereken_afgeleide_relaties(self.session), 0)
+
+    def test_incrementeel_gelijk_aan_herberekenen(self):
+        rnd = random.Random(3)
+        # BEKENDE is zowel een gewone relatie als het resultaat van een recursieve regel
+        BASISTYPES = (OUDER, OUDER, GEHUWD, BEKENDE)
+        relaties = []
+        for stap in range(150):
+            if relaties and rnd.random() < 0.3:
+                relatie = relaties.pop(rnd.randrange(len(relaties)))
+                if rnd.random() < 0.5:
+                    self.verwijder(relatie)
+                else:
+                    # Wijzigen: andere persoon of ander type
+                    oud = feit(relatie)
+                    relatie.persoon2_id = rnd.randint(1, 40)
+                    relatie.relatietype_id = rnd.choice(BASISTYPES)
+                    if relatie.persoon2_id == relatie.persoon1_id:
+                        relatie.persoon2_id = relatie.persoon1_id % 40 + 1
+                    self.session.add(relatie)
+                    self.session.flush()
+                    verwerk_relatie_wijziging(self.session, oud, feit(relatie))
+                    self.session.commit()
+                    relaties.append(relatie)
+            else:
+                persoon1, persoon2 = rnd.sample(range(1, 41), 2)
+                relaties.append(self.voeg_toe(persoon1, persoon2, rnd.choice(BASISTYPES)))
+            if stap % 25 == 24:
+                incrementeel = self.afgeleid()
+                herbereken_afgeleide_relaties(self.session)
+                self.session.commit()
+                self.assertEqual(incrementeel, self.afgeleid(), f"verschil na stap {stap}")
+
+    def test_zonder_regels(self):
+        self.session.exec(delete(Afleidingsregels))
+        self.session.commit()
+        self.voeg_toe(1, 3, OUDER)
+        self.voeg_toe(3, 5, OUDER)
+        self.assertEqual(self.afgeleid(), set())
+        self.assertEqual(herbereken_afgeleide_relaties(self.session), 0)
+
+if __name__ == '__main__':
+    unittest.main()
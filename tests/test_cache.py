@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from app.hulpmiddelen.cache import TTLCache
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = TTLCache("test", ttl=60)
+        self.aanroepen = 0
+
+    def bereken(self):
+        self.aanroepen += 1
+        return [self.aanroepen]
+
+    def test_hit_en_miss(self):
+        self.assertEqual(self.cache.get_or_compute("a", self.bereken), [1])
+        self.assertEqual(self.cache.get_or_compute("a", self.bereken), [1])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_invalidate(self):
+        self.cache.get_or_compute("a", self.bereken)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_or_compute("a", self.bereken), [2])
+
+    def test_verlopen(self):
+        cache = TTLCache("kort", ttl=0)
+        cache.get_or_compute("a", self.bereken)
+        self.assertEqual(cache.get_or_compute("a", self.bereken), [2])
+
+    def test_begrensd_lru(self):
+        cache = TTLCache("klein", ttl=60, max_entries=3)
+        for key in "abc":
+            cache.get_or_compute(key, self.bereken)
+        cache.get_or_compute("a", self.bereken)  # a is nu het meest recent gebruikt
+        cache.get_or_compute("d", self.bereken)
+        self.assertEqual(cache.stats()["entries"], 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.get_or_compute("a", self.bereken), [1])  # nog aanwezig
+        self.assertEqual(cache.get_or_compute("b", self.bereken), [5])  # was eruit
+
+    def test_begrensd_bij_veel_sleutels(self):
+        # Zoals de zoekcache: een nieuwe sleutel per toetsaanslag
+        cache = TTLCache("zoeken", ttl=60, max_entries=50)
+        for i in range(1000):
+            cache.get_or_compute(("personen", f"zoekterm{i}", 5), self.bereken)
+            self.assertLessEqual(cache.stats()["entries"], 50)
+
+    def test_verlopen_entries_opgeruimd(self):
+        cache = TTLCache("kort", ttl=0, max_entries=2)
+        for key in "abcd":
+            cache.get_or_compute(key, self.bereken)
+        self.assertLessEqual(cache.stats()["entries"], 1)
+
+    def test_invalidatie_tijdens_berekening(self):
+        def bereken_en_wijzig():
+            self.cache.invalidate()
+            return self.bereken()
+        self.cache.get_or_compute("a", bereken_en_wijzig)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_async_berekening(self):
+        async def bereken():
+            return self.bereken()
+        eerste = asyncio.run(self.cache.get_or_compute_async("a", bereken))
+        tweede = asyncio.run(self.cache.get_or_compute_async("a", bereken))
+        self.assertEqual(eerste, [1])
+        self.assertIs(tweede, eerste)
+
+if __name__ == '__main__':
+    unittest.main()
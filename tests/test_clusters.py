@@ -0,0 +1,121 @@
+import asyncio
+import random
+import unittest
+from unittest import mock
+
+from app.hulpmiddelen import clusters as clusters_module
+from app.hulpmiddelen.clusters import Clusters, familie_groepen
+
+def componenten(personen, relaties):
+    """Gewone BFS als referentie: verzameling clusters (frozensets)."""
+    buren = {persoon: set() for persoon in personen}
+    for p1, p2 in relaties:
+        if p1 in buren and p2 in buren:
+            buren[p1].add(p2)
+            buren[p2].add(p1)
+    gezien = set()
+    resultaat = set()
+    for persoon in personen:
+        if persoon in gezien:
+            continue
+        cluster = {persoon}
+        wachtrij = [persoon]
+        while wachtrij:
+            for buur in buren[wachtrij.pop()]:
+                if buur not in cluster:
+                    cluster.add(buur)
+                    wachtrij.append(buur)
+        gezien |= cluster
+        resultaat.add(frozenset(cluster))
+    return resultaat
+
+class TestClusters(unittest.TestCase):
+    def setUp(self):
+        # 1-2-3 en 4-5 zijn verbonden, 6 staat los; de relatie naar 99 (onbekend) telt niet mee
+        self.clusters = Clusters([1, 2, 3, 4, 5, 6], [(1, 2), (3, 2), (4, 5), (5, 4), (6, 99)])
+
+    def test_opbouwen(self):
+        self.assertEqual(len(self.clusters), 6)
+        self.assertEqual(self.clusters.aantal, 3)
+        self.assertEqual([sorted(c) for c in self.clusters.clusters()], [[1, 2, 3], [4, 5], [6]])
+        self.assertEqual(self.clusters.verdeling(), {1: 1, 2: 1, 3: 1})
+        self.assertTrue(self.clusters.verbonden(1, 3))
+        self.assertFalse(self.clusters.verbonden(1, 4))
+        self.assertFalse(self.clusters.verbonden(6, 99))
+        self.assertEqual(self.clusters.grootte(2), 3)
+        self.assertIsNone(self.clusters.cluster_van(99))
+
+    def test_bijwerken(self):
+        self.clusters.voeg_persoon_toe(7)
+        self.assertEqual(self.clusters.aantal, 4)
+        self.clusters.verbind(3, 4)
+        self.clusters.verbind(1, 5)  # al verbonden
+        self.assertEqual(self.clusters.aantal, 3)
+        self.assertEqual(self.clusters.grootte(1), 5)
+        self.clusters.verbind(7, 8)  # 8 nog onbekend: wordt toegevoegd
+        self.assertTrue(self.clusters.verbonden(8, 7))
+        self.assertEqual(self.clusters.aantal, 3)
+
+    def test_incrementeel_gelijk_aan_opbouwen_en_bfs(self):
+        rnd = random.Random(5)
+        personen = list(range(1, 501))
+        relaties = [(rnd.choice(personen), rnd.choice(personen)) for _ in range(400)]
+        clusters = Clusters(personen, relaties[:200])
+        for relatie in relaties[200:]:
+            clusters.verbind(*relatie)
+        opnieuw = Clusters(personen, relaties)
+        self.assertTrue(clusters.gelijk(opnieuw))
+        self.assertEqual({frozenset(c) for c in clusters.clusters()}, componenten(personen, relaties))
+        self.assertEqual(sum(clusters.verdeling().values()), clusters.aantal)
+
+        # Eén relatie minder: niet meer gelijk zodra die relatie twee clusters verbond
+        minder = Clusters(personen, relaties[:-1])
+        self.assertEqual(minder.gelijk(opnieuw), componenten(personen, relaties[:-1]) == componenten(personen, relaties))
+
+    def test_familie_groepen(self):
+        # Families 10 en 20 zijn via het cluster 1-2-3 verbonden, 30 staat los
+        familie_van = {1: 10, 2: 20, 3: 10, 4: 30, 5: 30, 6: 10}
+        groepen = familie_groepen(self.clusters.clusters(), familie_van)
+        self.assertEqual([sorted(g) for g in groepen], [[10, 20], [30]])
+
+    def test_familie_groepen_met_persoon_zonder_familie(self):
+        # 1 heeft geen familie meer; 2 en 3 verbinden families 20 en 10 alsnog
+        familie_van = {1: None, 2: 20, 3: 10, 4: 30, 6: 10}
+        groepen = familie_groepen(self.clusters.clusters(), familie_van)
+        self.assertEqual([sorted(g) for g in groepen], [[10, 20], [30]])
+        self.assertEqual(familie_groepen([[1, 2]], {1: None, 2: None}), [])
+
+class TestClusterBeheer(unittest.TestCase):
+    def test_wijziging_tijdens_opbouwen_blijft_bewaard(self):
+        beheer = clusters_module.ClusterBeheer(ttl=60)
+
+        async def lees(session):
+            # Een relatie die tijdens het opbouwen wordt toegevoegd, mist nog in de ingelezen rijen
+            beheer._wijzig("verbind", 2, 3)
+            return Clusters([1, 2, 3], [(1, 2)])
+
+        with mock.patch.object(clusters_module, "_lees_clusters", lees):
+            clusters = asyncio.run(beheer.get(None))
+            self.assertTrue(clusters.verbonden(1, 3))
+            self.assertIs(asyncio.run(beheer.get(None)), clusters)
+            # Controle: opnieuw opgebouwd (met dezelfde wijziging) en gelijk
+            self.assertTrue(asyncio.run(beheer.controleer(None)))
+
+        beheer.invalideer()
+        self.assertEqual(beheer._geladen_op, 0.0)
+
+    def test_controle_meldt_afwijking(self):
+        beheer = clusters_module.ClusterBeheer(ttl=60)
+
+        async def lees(session):
+            return Clusters([1, 2, 3], [(1, 2)])
+
+        with mock.patch.object(clusters_module, "_lees_clusters", lees):
+            asyncio.run(beheer.get(None))
+            # Een bijgewerkte relatie die niet in de database staat
+            beheer._index.verbind(2, 3)
+            self.assertFalse(asyncio.run(beheer.controleer(None)))
+            self.assertFalse(beheer._index.verbonden(1, 3))
+
+if __name__ == '__main__':
+    unittest.main()
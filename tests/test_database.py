@@ -1,6 +1,7 @@
 import os
 import unittest
 from sqlmodel import Session, select
+from datetime import date
 
 # Zet de omgeving op 'testing' voordat we iets importeren
 os.environ['TESTING'] = 'True'
@@ -33,8 +34,8 @@ class TestDatabase(unittest.TestCase):
         self.session.add(familie1)
         self.session.add(familie2)
         
-        jubileum1 = Jubilea(jubileumnaam="Huwelijk", jubileumdag="2000-05-15")
-        jubileum2 = Jubilea(jubileumnaam="Verjaardag", jubileumdag="1990-03-21")
+        jubileum1 = Jubilea(jubileumnaam="Huwelijk", jubileumdag=date(2000, 5, 15))
+        jubileum2 = Jubilea(jubileumnaam="Verjaardag", jubileumdag=date(1990, 3, 21))
         self.session.add(jubileum1)
         self.session.add(jubileum2)
         
@@ -76,7 +77,7 @@ class TestDatabase(unittest.TestCase):
         persoon = self.session.exec(select(Personen).where(Personen.voornaam == "Jan")).first()
         self.assertIsNotNone(persoon)
         self.assertEqual(persoon.jubileum.jubileumnaam, "Huwelijk")
-        self.assertEqual(persoon.jubileum.jubileumdag, "2000-05-15")
+        self.assertEqual(persoon.jubileum.jubileumdag, date(2000, 5, 15))
 
     def test_persoon_relaties(self):
         jan = self.session.exec(select(Personen).where(Personen.voornaam == "Jan")).first()
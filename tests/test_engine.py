@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from config import Settings
+from app.database import create_db_engine, create_async_db_engine, create_async_read_engine, async_database_url
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.tmpdir.name, 'engine.db')}"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def pragma(self, engine, naam):
+        with engine.connect() as connection:
+            return connection.exec_driver_sql(f"PRAGMA {naam}").scalar()
+
+    def test_pragmas_uit_settings(self):
+        engine = create_db_engine(self.url, Settings(SQLITE_BUSY_TIMEOUT=1234, SQLITE_CACHE_SIZE=-4000))
+        self.assertEqual(self.pragma(engine, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(engine, "busy_timeout"), 1234)
+        self.assertEqual(self.pragma(engine, "cache_size"), -4000)
+        self.assertEqual(self.pragma(engine, "synchronous"), 1)  # NORMAL
+        engine.dispose()
+
+    def test_pool_instellingen(self):
+        engine = create_db_engine(self.url, Settings(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=1))
+        self.assertIsInstance(engine.pool, QueuePool)
+        self.assertEqual(engine.pool.size(), 3)
+        engine.dispose()
+
+    def test_in_memory_zonder_pool(self):
+        engine = create_db_engine("sqlite://", Settings())
+        self.assertNotIsInstance(engine.pool, QueuePool)
+        self.assertEqual(self.pragma(engine, "busy_timeout"), 5000)
+
+    def test_leesengine_is_query_only(self):
+        schrijven = create_db_engine(self.url, Settings())
+        with schrijven.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        lezen = create_db_engine(self.url, Settings(), read_only=True)
+        self.assertEqual(self.pragma(lezen, "query_only"), 1)
+        with self.assertRaises(OperationalError):
+            with lezen.begin() as connection:
+                connection.exec_driver_sql("INSERT INTO t VALUES (1)")
+        schrijven.dispose()
+        lezen.dispose()
+
+    def test_leesengine_routering(self):
+        async_url = async_database_url(self.url)
+        schrijven = create_async_db_engine(async_url, Settings())
+        self.assertIsNot(create_async_read_engine(Settings(), schrijven), schrijven)
+        self.assertIs(create_async_read_engine(Settings(SQLITE_READ_ONLY=False), schrijven), schrijven)
+        replica = create_async_read_engine(Settings(DATABASE_READ_URL="sqlite:///replica.db"), schrijven)
+        self.assertEqual(replica.url.database, "replica.db")
+
+    def test_async_url(self):
+        self.assertEqual(async_database_url("sqlite:///data/x.db"), "sqlite+aiosqlite:///data/x.db")
+        self.assertEqual(async_database_url("postgresql+psycopg2://u@h/db"), "postgresql+asyncpg://u@h/db")
+        with self.assertRaises(ValueError):
+            async_database_url("oracle://h/db")
+
+if __name__ == '__main__':
+    unittest.main()
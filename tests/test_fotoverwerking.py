@@ -0,0 +1,207 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.hulpmiddelen import fotoverwerking
+from app.hulpmiddelen.afbeeldingen import maak_varianten, variant_naam, FotoTeGroot, FOTO_MATEN
+from app.hulpmiddelen.sjablonen import foto_variant, foto_srcset
+from app.hulpmiddelen.uploadlimiet import UploadLimietMiddleware
+from app.models.models import Families, Personen
+
+def jpeg_bytes(breedte, hoogte):
+    buffer = io.BytesIO()
+    Image.new("RGB", (breedte, hoogte), "red").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+class TestAfbeeldingen(unittest.TestCase):
+    def test_varianten(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bron = os.path.join(tmp, "bron.png")
+            Image.new("RGBA", (3000, 1500), "red").save(bron)
+            foto_hash = maak_varianten(bron, tmp)
+            for maat in FOTO_MATEN:
+                for ext, formaat in (("jpg", "JPEG"), ("webp", "WEBP")):
+                    with Image.open(os.path.join(tmp, variant_naam(foto_hash, maat, ext))) as img:
+                        self.assertEqual(img.size, (maat, maat // 2))
+                        self.assertEqual(img.format, formaat)
+            self.assertEqual(len(os.listdir(tmp)), 1 + 2 * len(FOTO_MATEN))
+            # Dezelfde inhoud levert dezelfde namen op
+            self.assertEqual(maak_varianten(bron, tmp), foto_hash)
+
+    def test_grote_jpeg(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bron = os.path.join(tmp, "bron.jpg")
+            with open(bron, "wb") as bestand:
+                bestand.write(jpeg_bytes(4096, 3072))
+            foto_hash = maak_varianten(bron, tmp, max_pixels=20_000_000)
+            with Image.open(os.path.join(tmp, variant_naam(foto_hash, 1024))) as img:
+                self.assertEqual(img.size, (1024, 768))
+
+    def test_te_veel_pixels(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bron = os.path.join(tmp, "bron.png")
+            Image.new("RGB", (2000, 2000), "red").save(bron)
+            with self.assertRaises(FotoTeGroot):
+                maak_varianten(bron, tmp, max_pixels=1_000_000)
+            self.assertEqual(os.listdir(tmp), ["bron.png"])
+
+class TestSjablonen(unittest.TestCase):
+    def test_foto_variant(self):
+        url = "/fotos/0123456789abcdef_1024.jpg"
+        self.assertEqual(foto_variant(url, 64), "/fotos/0123456789abcdef_64.jpg")
+        self.assertEqual(foto_variant(url, 100, "webp"), "/fotos/0123456789abcdef_256.webp")
+        self.assertEqual(foto_variant(url, 2000), url)
+        self.assertEqual(foto_srcset(url, 200), "/fotos/0123456789abcdef_256.jpg 1x, /fotos/0123456789abcdef_1024.jpg 2x")
+        # Oude foto's zonder varianten blijven ongewijzigd
+        self.assertEqual(foto_variant("/fotos/person_1.jpg", 64), "/fotos/person_1.jpg")
+        self.assertEqual(foto_srcset("/fotos/person_1.jpg", 64), "")
+        self.assertIsNone(foto_variant(None, 64))
+
+class TestFotoverwerking(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.tmp.name}/test.db")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with self.nieuwe_sessie() as session:
+            familie = Families(familienaam="De Vries", straatnaam="Hoofdstraat", huisnummer="1", postcode="1234AB", plaats="Amsterdam")
+            session.add(familie)
+            await session.commit()
+            persoon = Personen(voornaam="Jan", achternaam="de Vries", familie_id=familie.id)
+            session.add(persoon)
+            await session.commit()
+            self.persoon_id = persoon.id
+
+        fotodir = Path(self.tmp.name) / "fotos"
+        fotodir.mkdir()
+        self.patches = [
+            mock.patch.object(fotoverwerking, "settings", SimpleNamespace(FOTO_DIR=fotodir, FOTO_WORKERS=1,
+                                                                          MAX_IMAGE_PIXELS=5_000_000)),
+            mock.patch.object(fotoverwerking, "new_write_session", self.nieuwe_sessie),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.fotodir = fotodir
+
+    def nieuwe_sessie(self):
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await fotoverwerking.shutdown()
+        for patch in self.patches:
+            patch.stop()
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def test_foto_op_achtergrond_verwerkt(self):
+        upload = UploadFile(io.BytesIO(jpeg_bytes(2000, 2000)), filename="vakantie.jpg")
+        await fotoverwerking.start_foto_verwerking(upload, Personen, self.persoon_id)
+
+        async with self.nieuwe_sessie() as session:
+            persoon = await session.get(Personen, self.persoon_id)
+            self.assertIsNone(persoon.foto_url)
+            self.assertTrue(fotoverwerking.foto_in_verwerking(persoon))
+
+        await fotoverwerking.wacht_op_verwerking()
+
+        async with self.nieuwe_sessie() as session:
+            persoon = await session.get(Personen, self.persoon_id)
+            self.assertRegex(persoon.foto_url, r"^/fotos/[0-9a-f]{16}_1024\.jpg$")
+            self.assertFalse(fotoverwerking.foto_in_verwerking(persoon))
+        with Image.open(self.fotodir / persoon.foto_url.rsplit("/", 1)[1]) as img:
+            self.assertEqual(img.size, (1024, 1024))
+        self.assertEqual(os.listdir(self.fotodir / ".uploads"), [])
+
+    async def test_vervangen_foto_wordt_opgeruimd(self):
+        for kleur in ("red", "blue"):
+            buffer = io.BytesIO()
+            Image.new("RGB", (300, 300), kleur).save(buffer, format="JPEG")
+            upload = UploadFile(io.BytesIO(buffer.getvalue()), filename=f"{kleur}.jpg")
+            await fotoverwerking.start_foto_verwerking(upload, Personen, self.persoon_id)
+        await fotoverwerking.wacht_op_verwerking()
+
+        async with self.nieuwe_sessie() as session:
+            foto_url = (await session.get(Personen, self.persoon_id)).foto_url
+        foto_hash = foto_url.rsplit("/", 1)[1].split("_")[0]
+        bestanden = [naam for naam in os.listdir(self.fotodir) if not naam.startswith(".")]
+        self.assertEqual(len(bestanden), 6)
+        self.assertTrue(all(naam.startswith(foto_hash) for naam in bestanden))
+
+    async def test_gedeelde_foto_blijft_bestaan(self):
+        async with self.nieuwe_sessie() as session:
+            persoon = await session.get(Personen, self.persoon_id)
+            andere = Personen(voornaam="Marie", achternaam="de Vries", familie_id=persoon.familie_id)
+            session.add(andere)
+            await session.commit()
+            andere_id = andere.id
+        for record_id in (self.persoon_id, andere_id):
+            upload = UploadFile(io.BytesIO(jpeg_bytes(300, 300)), filename="zelfde.jpg")
+            await fotoverwerking.start_foto_verwerking(upload, Personen, record_id)
+        await fotoverwerking.wacht_op_verwerking()
+
+        async with self.nieuwe_sessie() as session:
+            persoon = await session.get(Personen, self.persoon_id)
+            foto_url = persoon.foto_url
+            persoon.foto_url = None
+            await session.commit()
+            await fotoverwerking.verwijder_foto(session, foto_url)
+        # De andere persoon gebruikt dezelfde foto nog
+        self.assertTrue((self.fotodir / foto_url.rsplit("/", 1)[1]).exists())
+
+    async def test_ongeldige_foto_laat_record_ongemoeid(self):
+        upload = UploadFile(io.BytesIO(b"geen afbeelding"), filename="kapot.jpg")
+        await fotoverwerking.start_foto_verwerking(upload, Personen, self.persoon_id)
+        await fotoverwerking.wacht_op_verwerking()
+        async with self.nieuwe_sessie() as session:
+            self.assertIsNone((await session.get(Personen, self.persoon_id)).foto_url)
+
+    async def test_controleer_foto(self):
+        await fotoverwerking.controleer_foto(UploadFile(io.BytesIO(jpeg_bytes(1000, 1000)), filename="goed.jpg"))
+        for inhoud, status_code in ((jpeg_bytes(3000, 2000), 413), (b"geen afbeelding", 400)):
+            upload = UploadFile(io.BytesIO(inhoud), filename="fout.jpg")
+            with self.assertRaises(HTTPException) as context:
+                await fotoverwerking.controleer_foto(upload)
+            self.assertEqual(context.exception.status_code, status_code)
+
+class TestUploadLimiet(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(UploadLimietMiddleware, max_bytes=10_000)
+
+        @app.post("/upload")
+        async def upload(foto: UploadFile = File(...)):
+            return {"grootte": len(await foto.read())}
+
+        self.client = TestClient(app)
+
+    def test_binnen_limiet(self):
+        response = self.client.post("/upload", files={"foto": ("a.jpg", b"x" * 5_000)})
+        self.assertEqual(response.json(), {"grootte": 5_000})
+
+    def test_te_groot(self):
+        response = self.client.post("/upload", files={"foto": ("a.jpg", b"x" * 20_000)})
+        self.assertEqual(response.status_code, 413)
+
+    def test_te_groot_zonder_content_length(self):
+        def body():
+            yield b"--grens\r\nContent-Disposition: form-data; name=\"foto\"; filename=\"a.jpg\"\r\n\r\n"
+            for _ in range(20):
+                yield b"x" * 1_000
+            yield b"\r\n--grens--\r\n"
+        response = self.client.post("/upload", content=body(),
+                                    headers={"Content-Type": "multipart/form-data; boundary=grens"})
+        self.assertEqual(response.status_code, 413)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from datetime import date
+
+from app.hulpmiddelen.kalender import maand_dag, maand_dag_bereiken, volgende_jubileumdatum
+
+class TestKalender(unittest.TestCase):
+    def test_maand_dag(self):
+        self.assertEqual(maand_dag(date(2000, 5, 15)), 515)
+        self.assertEqual(maand_dag(date(1990, 12, 31)), 1231)
+
+    def test_bereik_binnen_jaar(self):
+        self.assertEqual(maand_dag_bereiken(date(2024, 3, 10), date(2024, 4, 10)), [(310, 410)])
+
+    def test_bereik_over_jaargrens(self):
+        self.assertEqual(maand_dag_bereiken(date(2024, 12, 15), date(2025, 1, 15)), [(1215, 1231), (101, 115)])
+
+    def test_volgende_jubileumdatum(self):
+        vandaag = date(2024, 6, 1)
+        self.assertEqual(volgende_jubileumdatum(date(1980, 6, 1), vandaag), date(2024, 6, 1))
+        self.assertEqual(volgende_jubileumdatum(date(1980, 5, 31), vandaag), date(2025, 5, 31))
+
+    def test_schrikkeldag(self):
+        self.assertEqual(volgende_jubileumdatum(date(2000, 2, 29), date(2025, 2, 1)), date(2025, 3, 1))
+        self.assertEqual(volgende_jubileumdatum(date(2000, 2, 29), date(2028, 2, 1)), date(2028, 2, 29))
+
+    def test_bereik_met_schrikkeldag(self):
+        # Niet-schrikkeljaar: een venster vanaf 1 maart bevat ook de jubilea van 29 februari
+        self.assertEqual(maand_dag_bereiken(date(2025, 3, 1), date(2025, 4, 1)), [(301, 401), (229, 229)])
+        self.assertEqual(maand_dag_bereiken(date(2025, 2, 20), date(2025, 3, 20)), [(220, 320)])
+        # Schrikkeljaar, of 1 maart buiten het venster: geen extra bereik
+        self.assertEqual(maand_dag_bereiken(date(2028, 3, 1), date(2028, 4, 1)), [(301, 401)])
+        self.assertEqual(maand_dag_bereiken(date(2025, 3, 2), date(2025, 4, 2)), [(302, 402)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from itsdangerous import TimestampSigner
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, create_engine, select, delete, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.main import app, settings
+from app.database import get_read_session, get_write_session
+from app.hulpmiddelen.cache import invalidate_caches, UPCOMING_EVENTS
+from app.hulpmiddelen.kalender import maand_dag
+from app.hulpmiddelen.afleiding import verwerk_relatie_wijziging, feit
+from app.models.models import (Families, Personen, Jubilea, Jubileumtypes, Relatietypes, Relaties, Gebruikers, Rollen,
+                               Afleidingsregels, AfgeleideRelaties)
+from tests.querytelling import QueryCountMixin, count_queries
+
+class TestLaadplannen(QueryCountMixin, unittest.TestCase):
+    """Elke pagina moet met een vast aantal queries renderen, ongeacht het aantal relaties."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Vullen via een sync engine, de routes lezen via een async engine op hetzelfde bestand
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        pad = os.path.join(cls.tmpdir.name, "test.db")
+        sync_engine = create_engine(f"sqlite:///{pad}")
+        SQLModel.metadata.create_all(sync_engine)
+        with Session(sync_engine) as session:
+            rol = Rollen(naam="Administrator")
+            session.add(rol)
+            session.commit()
+            gebruiker = Gebruikers(email="admin@example.com", naam="Admin", google_id="1", rol_id=rol.id)
+            session.add(gebruiker)
+            familie = Families(familienaam="De Vries", straatnaam="Hoofdstraat", huisnummer="10", postcode="1234AB", plaats="Amsterdam")
+            session.add(familie)
+            geboortedag = Jubileumtypes(naam="Geboortedag")
+            trouwdag = Jubileumtypes(naam="Trouwdag")
+            ouder = Relatietypes(relatienaam="is ouder van")
+            gehuwd = Relatietypes(relatienaam="is gehuwd met", symmetrisch=True)
+            session.add_all([geboortedag, trouwdag, ouder, gehuwd])
+            session.commit()
+
+            personen = [Personen(voornaam=f"Persoon{i}", achternaam="de Vries", familie_id=familie.id, created_by=gebruiker.id)
+                        for i in range(8)]
+            session.add_all(personen)
+            session.commit()
+            # Persoon0 heeft veel relaties en jubilea, Persoon7 één relatie
+            for kind in personen[1:6]:
+                session.add(Relaties(persoon1_id=personen[0].id, persoon2_id=kind.id, relatietype_id=ouder.id))
+                session.add(Relaties(persoon1_id=kind.id, persoon2_id=personen[0].id, relatietype_id=gehuwd.id))
+                session.add(Jubilea(jubileumnaam="Verjaardag", jubileumdag=date(1980, 1, kind.id),
+                                    persoon_id=personen[0].id, jubileumtype_id=geboortedag.id))
+            session.add(Relaties(persoon1_id=personen[7].id, persoon2_id=personen[6].id, relatietype_id=gehuwd.id))
+            session.commit()
+            cls.veel_id, cls.weinig_id, cls.familie_id = personen[0].id, personen[7].id, familie.id
+            cls.gehuwd_ids, cls.trouwdag_id = [kind.id for kind in personen[1:6]], trouwdag.id
+        sync_engine.dispose()
+        cls.pad = pad
+
+        cls.async_engine = create_async_engine(f"sqlite+aiosqlite:///{pad}")
+        cls.engine = cls.async_engine.sync_engine  # voor het tellen van queries
+
+        async def override_get_session():
+            async with AsyncSession(cls.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_read_session] = override_get_session
+        app.dependency_overrides[get_write_session] = override_get_session
+        cls.client = TestClient(app)
+        data = base64.b64encode(json.dumps({"user": {"id": 1, "email": "admin@example.com", "name": "Admin",
+                                                      "role": "Administrator", "google_id": "1"}}).encode())
+        cls.client.cookies.set("my_relations_session", TimestampSigner(str(settings.SECRET_KEY)).sign(data).decode())
+
+    @classmethod
+    def tearDownClass(cls):
+        app.dependency_overrides.pop(get_read_session, None)
+        app.dependency_overrides.pop(get_write_session, None)
+        cls.tmpdir.cleanup()
+
+    def aantal_queries(self, url):
+        with count_queries(self.engine) as counter:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.text)
+        return counter.count
+
+    def test_persoon_detail(self):
+        # 4 voor persoon, relaties en jubilea, 1 voor de afgeleide relaties
+        with self.assertMaxQueries(self.engine, 5):
+            self.assertEqual(self.client.get(f"/personen/{self.veel_id}").status_code, 200)
+        self.assertEqual(self.aantal_queries(f"/personen/{self.veel_id}"), self.aantal_queries(f"/personen/{self.weinig_id}"))
+
+    def test_edit_persoon(self):
+        with self.assertMaxQueries(self.engine, 5):
+            self.assertEqual(self.client.get(f"/personen/{self.veel_id}/edit").status_code, 200)
+        self.assertEqual(self.aantal_queries(f"/personen/{self.veel_id}/edit"),
+                         self.aantal_queries(f"/personen/{self.weinig_id}/edit"))
+
+    def test_personen_lijst(self):
+        with self.assertMaxQueries(self.engine, 2):
+            self.assertEqual(self.client.get("/personen/").status_code, 200)
+
+    def voeg_trouwdagen_toe(self, persoon_ids):
+        # Over een paar dagen, 28 jaar geleden (ook op 29 februari een geldige datum)
+        dag = date.today() + timedelta(days=3)
+        dag = dag.replace(year=dag.year - 28)
+        engine = create_engine(f"sqlite:///{self.pad}")
+        with Session(engine) as session:
+            session.add_all([Jubilea(jubileumnaam="Trouwdag", jubileumdag=dag, jubileum_maanddag=maand_dag(dag),
+                                     persoon_id=persoon_id, jubileumtype_id=self.trouwdag_id) for persoon_id in persoon_ids])
+            session.commit()
+        engine.dispose()
+        invalidate_caches(UPCOMING_EVENTS)
+
+    def test_home(self):
+        # Partners van alle trouwdagen in één query: het aantal queries groeit niet met de jubilea
+        self.voeg_trouwdagen_toe(self.gehuwd_ids[:1])
+        weinig = self.aantal_queries("/home")
+        self.voeg_trouwdagen_toe(self.gehuwd_ids[1:])
+        with self.assertMaxQueries(self.engine, weinig):
+            response = self.client.get("/home")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text.count("Persoon0 de Vries"), len(self.gehuwd_ids))
+        self.assertLessEqual(weinig, 2)
+
+    def test_persoon_verwijderen(self):
+        # Grootouder - ouder - kind; na het verwijderen van de ouder blijft er geen relatie
+        # (gewoon of afgeleid) naar een niet bestaande persoon over
+        engine = create_engine(f"sqlite:///{self.pad}")
+        with Session(engine) as session:
+            ouder_type = session.exec(select(Relatietypes).where(Relatietypes.relatienaam == "is ouder van")).one()
+            grootouder_type = Relatietypes(relatienaam="is grootouder van")
+            personen = [Personen(voornaam=naam, achternaam="Bakker", familie_id=self.familie_id) for naam in ("Opa", "Vader", "Kind")]
+            session.add_all([grootouder_type, *personen])
+            session.commit()
+            regel = Afleidingsregels(relatietype_id=grootouder_type.id, eerste_type_id=ouder_type.id, tweede_type_id=ouder_type.id)
+            session.add(regel)
+            session.commit()
+            for persoon1, persoon2 in zip(personen, personen[1:]):
+                relatie = Relaties(persoon1_id=persoon1.id, persoon2_id=persoon2.id, relatietype_id=ouder_type.id)
+                session.add(relatie)
+                session.flush()
+                verwerk_relatie_wijziging(session, None, feit(relatie))
+            session.commit()
+            opa, vader, kind = (persoon.id for persoon in personen)
+            regel_id = regel.id
+            self.assertEqual(len(session.exec(select(AfgeleideRelaties).where(AfgeleideRelaties.persoon1_id == opa)).all()), 1)
+
+        response = self.client.get(f"/personen/{vader}/delete", follow_redirects=False)
+        self.assertEqual(response.status_code, 303)
+
+        with Session(engine) as session:
+            for tabel in (Relaties, AfgeleideRelaties):
+                rijen = session.exec(select(tabel).where(
+                    or_(*[kolom.in_([opa, vader, kind]) for kolom in (tabel.persoon1_id, tabel.persoon2_id)])
+                )).all()
+                self.assertEqual(rijen, [], tabel.__name__)
+            self.assertIsNone(session.get(Personen, vader))
+            self.assertEqual(self.client.get(f"/personen/{opa}").status_code, 200)
+            session.exec(delete(Afleidingsregels).where(Afleidingsregels.id == regel_id))
+            session.commit()
+        engine.dispose()
+
+    def test_familie_detail(self):
+        with self.assertMaxQueries(self.engine, 2):
+            self.assertEqual(self.client.get(f"/families/{self.familie_id}").status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
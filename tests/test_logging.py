@@ -0,0 +1,80 @@
+import json
+import logging
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import logging_config
+from app.logging_config import JsonFormatter, setup_logger, request_id_var
+from app.hulpmiddelen.requestlog import RequestLogMiddleware
+
+class LijstHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_json_via_queue(self):
+        pad = Path(self.tmp.name) / "logs" / "test.log"
+        logger = setup_logger("test_json_via_queue", str(pad), log_format="json", use_queue=True)
+        token = request_id_var.set("abc123")
+        try:
+            logger.info("hallo %s", "wereld", extra={"duration_ms": 1.5})
+        finally:
+            request_id_var.reset(token)
+        logging_config._listeners.pop().stop()  # schrijft de queue weg
+        regel = json.loads(pad.read_text().splitlines()[-1])
+        self.assertEqual(list(regel)[:2], ["time", "level"])
+        self.assertEqual(regel["message"], "hallo wereld")
+        self.assertEqual(regel["request_id"], "abc123")
+        self.assertEqual(regel["duration_ms"], 1.5)
+
+    def test_json_formatter_exceptie(self):
+        try:
+            raise ValueError("kapot")
+        except ValueError:
+            record = logging.getLogger("test").makeRecord("test", logging.ERROR, __file__, 1, "fout", (), sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        self.assertIn("ValueError: kapot", data["exc"])
+
+class TestRequestLog(unittest.TestCase):
+    def test_request_id(self):
+        handler = LijstHandler()
+        logging_config.app_logger.addHandler(handler)
+        self.addCleanup(logging_config.app_logger.removeHandler, handler)
+
+        app = FastAPI()
+        app.add_middleware(RequestLogMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            logging_config.app_logger.info("in de route")
+            return {"id": item_id}
+
+        client = TestClient(app)
+        response = client.get("/items/7", headers={"X-Request-ID": "vast-id"})
+        self.assertEqual(response.headers["x-request-id"], "vast-id")
+        self.assertTrue(client.get("/items/8").headers["x-request-id"])
+
+        route, afgerond = handler.records[0], handler.records[1]
+        self.assertEqual(route.request_id, "vast-id")
+        self.assertEqual(route.route, "GET /items/7")
+        self.assertEqual(afgerond.route, "GET /items/{item_id}")
+        self.assertEqual(afgerond.status, 200)
+        self.assertGreaterEqual(afgerond.duration_ms, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+from app.hulpmiddelen.logindex import LogIndex
+
+def regel(dag, niveau, bericht):
+    return f"2024-05-{dag:02d} 12:00:00,000 {niveau} {bericht}\n"
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pad = Path(self.tmp.name) / "app.log"
+        with open(self.pad, "w") as bestand:
+            for i in range(30):
+                bestand.write(regel(1 + i // 10, "ERROR" if i % 3 == 0 else "DEBUG", f"bericht {i}"))
+            bestand.write("Traceback (most recent call last):\n")  # vervolgregel, wordt overgeslagen
+        self.index = LogIndex(self.pad)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def berichten(self, *args):
+        regels, totaal = self.index.zoek(*args)
+        return [r["message"] for r in regels], totaal
+
+    def test_pagineren_en_filteren(self):
+        self.assertEqual(self.berichten(None, None, None, 0, 3), (["bericht 0", "bericht 1", "bericht 2"], 30))
+        self.assertEqual(self.berichten(None, None, None, 28, 5), (["bericht 28", "bericht 29"], 30))
+        self.assertEqual(self.berichten(date(2024, 5, 2), date(2024, 5, 2), None, 0, 2), (["bericht 10", "bericht 11"], 10))
+        self.assertEqual(self.berichten(date(2024, 5, 2), None, "error", 1, 2), (["bericht 15", "bericht 18"], 6))
+        self.assertEqual(self.berichten(None, None, "CRITICAL", 0, 10), ([], 0))
+        self.assertEqual(self.index.eerste_datum(), date(2024, 5, 1))
+
+    def test_incrementeel(self):
+        self.index.bijwerken()
+        gelezen = self.index._volgorde[0].gelezen
+        with open(self.pad, "a") as bestand:
+            bestand.write(regel(4, "INFO", "nieuw"))
+            bestand.write("2024-05-04 12:00:01,000 INFO half")  # nog niet afgeschreven
+        self.assertEqual(self.berichten(date(2024, 5, 4), None, None, 0, 10), (["nieuw"], 1))
+        self.assertGreater(self.index._volgorde[0].gelezen, gelezen)
+        with open(self.pad, "a") as bestand:
+            bestand.write(" geschreven\n")
+        self.assertEqual(self.berichten(date(2024, 5, 4), None, None, 0, 10), (["nieuw", "half geschreven"], 2))
+
+    def test_rotatie(self):
+        self.index.bijwerken()
+        oude_index = self.index._volgorde[0]
+        # Zoals RotatingFileHandler: app.log -> app.log.1 en een nieuw app.log
+        os.rename(self.pad, f"{self.pad}.1")
+        with open(self.pad, "w") as bestand:
+            bestand.write(regel(5, "WARNING", "na rotatie"))
+        self.assertEqual(self.berichten(None, None, None, 29, 2), (["bericht 29", "na rotatie"], 31))
+        self.assertIs(self.index._volgorde[0], oude_index)
+        self.assertEqual(self.berichten(None, None, "warning", 0, 10), (["na rotatie"], 1))
+
+    def test_json_regels(self):
+        with open(self.pad, "a") as bestand:
+            bestand.write('{"time": "2024-05-07 08:00:00,000", "level": "INFO", "message": "json", "request_id": "r1"}\n')
+        self.assertEqual(self.berichten(date(2024, 5, 7), None, "info", 0, 10), (["[r1] json"], 1))
+
+    def test_ingekort_bestand(self):
+        self.index.bijwerken()
+        with open(self.pad, "w") as bestand:
+            bestand.write(regel(6, "INFO", "opnieuw"))
+        self.assertEqual(self.berichten(None, None, None, 0, 10), (["opnieuw"], 1))
+
+if __name__ == '__main__':
+    unittest.main()
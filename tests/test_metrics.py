@@ -0,0 +1,61 @@
+import unittest
+
+import jinja2
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.hulpmiddelen.metrics import (Metriek, MetricsMiddleware, TimedTemplate, instrument_engine, request_stats,
+                                      REQUEST_DUUR, QUERIES_PER_REQUEST, DB_QUERIES, TEMPLATE_DUUR)
+
+class TestMetriek(unittest.TestCase):
+    def test_histogram(self):
+        metriek = Metriek("test_seconds", "histogram", "Test", ("route",), buckets=(0.1, 1.0))
+        for waarde in (0.05, 0.5, 5):
+            metriek.observe(waarde, "/a")
+        self.assertEqual(metriek.render().splitlines(), [
+            "# HELP test_seconds Test",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{route="/a",le="0.1"} 1',
+            'test_seconds_bucket{route="/a",le="1.0"} 2',
+            'test_seconds_bucket{route="/a",le="+Inf"} 3',
+            'test_seconds_sum{route="/a"} 5.55',
+            'test_seconds_count{route="/a"} 3',
+        ])
+
+    def test_counter(self):
+        metriek = Metriek("test_total", "counter", "Test", ("naam",))
+        metriek.inc(1, 'met "quotes"')
+        metriek.inc(2, 'met "quotes"')
+        self.assertEqual(metriek.render().splitlines()[-1], 'test_total{naam="met \\"quotes\\""} 3')
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def test_per_route(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+        env = jinja2.Environment(loader=jinja2.DictLoader({"metrics_test.html": "{{ n }} rijen"}))
+        env.template_class = TimedTemplate
+
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/metrics-test/{n}")
+        def route(n: int):
+            with engine.connect() as conn:
+                for _ in range(n):
+                    conn.execute(text("SELECT 1"))
+            stats = request_stats.get()
+            return {"html": env.get_template("metrics_test.html").render(n=n), "queries": stats.queries}
+
+        client = TestClient(app)
+        self.assertEqual(client.get("/metrics-test/3").json(), {"html": "3 rijen", "queries": 3})
+        client.get("/metrics-test/1")
+
+        route = "/metrics-test/{n}"
+        self.assertEqual(REQUEST_DUUR.waarden[("GET", route, "200")].aantal, 2)
+        self.assertEqual(QUERIES_PER_REQUEST.waarden[(route,)].som, 4)
+        self.assertEqual(DB_QUERIES.waarden[(route,)], 4)
+        self.assertEqual(TEMPLATE_DUUR.waarden[("metrics_test.html",)].aantal, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.models import Jubilea
+from app.hulpmiddelen.paginering import paginate
+
+class TestPaginering(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        self.session = AsyncSession(self.engine, expire_on_commit=False)
+        # Dubbele datums, zodat het id als tiebreaker nodig is
+        for i in range(7):
+            self.session.add(Jubilea(jubileumnaam=f"J{i}", jubileumdag=date(2000, 1, 1 + i // 2)))
+        await self.session.commit()
+        self.sort_keys = [Jubilea.jubileumdag, Jubilea.id]
+        self.count = select(func.count()).select_from(Jubilea)
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def pagina(self, cursor=None):
+        return await paginate(self.session, select(Jubilea), self.sort_keys, self.count, cursor=cursor, page_size=3)
+
+    async def test_vooruit_en_terug(self):
+        eerste = await self.pagina()
+        self.assertEqual([j.jubileumnaam for j in eerste.items], ["J0", "J1", "J2"])
+        self.assertEqual(eerste.total, 7)
+        self.assertIsNone(eerste.prev_cursor)
+
+        tweede = await self.pagina(eerste.next_cursor)
+        self.assertEqual([j.jubileumnaam for j in tweede.items], ["J3", "J4", "J5"])
+
+        derde = await self.pagina(tweede.next_cursor)
+        self.assertEqual([j.jubileumnaam for j in derde.items], ["J6"])
+        self.assertIsNone(derde.next_cursor)
+
+        terug = await self.pagina(derde.prev_cursor)
+        self.assertEqual([j.jubileumnaam for j in terug.items], ["J3", "J4", "J5"])
+        terug = await self.pagina(terug.prev_cursor)
+        self.assertEqual([j.jubileumnaam for j in terug.items], ["J0", "J1", "J2"])
+        self.assertIsNone(terug.prev_cursor)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import unittest
+from collections import deque
+from unittest import mock
+
+from app.hulpmiddelen import relatiegraaf as relatiegraaf_module
+from app.hulpmiddelen.relatiegraaf import RelatieGraaf
+
+OUDER, PARTNER = 1, 2
+SYMMETRISCH = {OUDER: False, PARTNER: True}
+
+def afstand(relaties, van, naar):
+    """Gewone BFS als referentie."""
+    buren = {}
+    for _, p1, p2, _ in relaties:
+        buren.setdefault(p1, set()).add(p2)
+        buren.setdefault(p2, set()).add(p1)
+    gezien = {van: 0}
+    wachtrij = deque([van])
+    while wachtrij:
+        persoon = wachtrij.popleft()
+        if persoon == naar:
+            return gezien[persoon]
+        for buur in buren.get(persoon, ()):
+            if buur not in gezien:
+                gezien[buur] = gezien[persoon] + 1
+                wachtrij.append(buur)
+    return None
+
+class TestRelatieGraaf(unittest.TestCase):
+    def setUp(self):
+        # Opa(1) ouder van Vader(2), Vader ouder van Kind(3), Vader partner van Moeder(4),
+        # Moeder ouder van Kind2(5); Los(6)-Los(7) staan apart
+        self.relaties = [
+            (10, 1, 2, OUDER),
+            (11, 2, 3, OUDER),
+            (12, 4, 2, PARTNER),
+            (13, 4, 5, OUDER),
+            (14, 6, 7, PARTNER),
+        ]
+        self.graaf = RelatieGraaf(self.relaties, SYMMETRISCH)
+
+    def test_pad_en_richting(self):
+        stappen = self.graaf.pad(3, 1)
+        self.assertEqual([(s.van, s.naar, s.relatie_id) for s in stappen], [(3, 2, 11), (2, 1, 10)])
+        # Kind -> Vader en Vader -> Opa lopen tegen 'ouder van' in
+        self.assertTrue(all(s.omgekeerd for s in stappen))
+        self.assertFalse(any(s.omgekeerd for s in self.graaf.pad(1, 3)))
+
+    def test_symmetrische_relatie_niet_omgekeerd(self):
+        stappen = self.graaf.pad(2, 4)
+        self.assertEqual(len(stappen), 1)
+        self.assertFalse(stappen[0].omgekeerd)
+
+    def test_geen_pad_en_maximale_diepte(self):
+        self.assertIsNone(self.graaf.pad(1, 6))
+        self.assertIsNone(self.graaf.pad(1, 999))
+        self.assertIsNone(self.graaf.pad(1, 5, max_diepte=2))
+        self.assertEqual(len(self.graaf.pad(1, 5, max_diepte=3)), 3)
+        self.assertEqual(self.graaf.pad(1, 1), [])
+
+    def test_wijzigingen(self):
+        self.graaf.voeg_toe(15, 3, 6, PARTNER)
+        self.assertEqual(len(self.graaf.pad(1, 7)), 4)
+
+        # Verhangen: Kind(3) is nu partner van Kind2(5) in plaats van Los(6)
+        self.graaf.wijzig(15, 3, 5, PARTNER)
+        self.assertIsNone(self.graaf.pad(1, 7))
+        self.assertEqual(len(self.graaf.pad(3, 5)), 1)
+
+        # Alleen het type wijzigen
+        self.graaf.wijzig(12, 4, 2, OUDER)
+        self.assertTrue(self.graaf.pad(2, 4)[0].omgekeerd)
+
+        self.graaf.verwijder(11)
+        self.graaf.verwijder(11)
+        self.assertEqual([s.relatie_id for s in self.graaf.pad(1, 3)], [10, 12, 13, 15])
+        self.assertEqual(len(self.graaf), 5)
+        self.assertEqual(sorted(zip(*self.graaf.kanten())),
+                         [(1, 2, OUDER), (3, 5, PARTNER), (4, 2, OUDER), (4, 5, OUDER), (6, 7, PARTNER)])
+
+    @mock.patch.object(relatiegraaf_module, "MIN_COMPACT", 50)
+    def test_kortste_pad_na_compact(self):
+        rnd = random.Random(7)
+        relaties = [(i, rnd.randint(1, 400), rnd.randint(1, 400), rnd.choice((OUDER, PARTNER))) for i in range(600)]
+        graaf = RelatieGraaf(relaties[:300], SYMMETRISCH)
+        # Genoeg wijzigingen om de CSR structuur tussendoor opnieuw op te bouwen
+        for relatie in relaties[300:]:
+            graaf.voeg_toe(*relatie)
+        for relatie_id in range(0, 600, 3):
+            graaf.verwijder(relatie_id)
+        self.assertLess(graaf._wijzigingen, 500)  # tussendoor opnieuw opgebouwd
+        over = [r for r in relaties if r[0] % 3]
+        for _ in range(200):
+            van, naar = rnd.randint(1, 400), rnd.randint(1, 400)
+            stappen = graaf.pad(van, naar, max_diepte=400)
+            verwacht = afstand(over, van, naar)
+            self.assertEqual(None if stappen is None else len(stappen), verwacht, (van, naar))
+            if stappen:
+                self.assertEqual(stappen[0].van, van)
+                self.assertEqual(stappen[-1].naar, naar)
+                self.assertTrue(all(a.naar == b.van for a, b in zip(stappen, stappen[1:])))
+
+class TestRelatieGraafBeheer(unittest.TestCase):
+    def test_wijziging_tijdens_laden_blijft_bewaard(self):
+        beheer = relatiegraaf_module.RelatieGraafBeheer(ttl=60)
+
+        async def lees(session):
+            # Een relatie die tijdens het laden wordt toegevoegd, mist nog in de ingelezen rijen
+            beheer._wijzig("voeg_toe", 2, 2, 3, PARTNER)
+            return [(1, 1, 2, OUDER)], SYMMETRISCH
+
+        with mock.patch.object(relatiegraaf_module, "_lees_relaties", lees):
+            graaf = asyncio.run(beheer.get(None))
+        self.assertEqual(len(graaf.pad(1, 3)), 2)
+        self.assertIs(asyncio.run(beheer.get(None)), graaf)
+
+        beheer.invalideer()
+        self.assertEqual(beheer._geladen_op, 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
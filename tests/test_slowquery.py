@@ -0,0 +1,54 @@
+import logging
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from app.hulpmiddelen.slowquery import install_slow_query_log
+from app.logging_config import app_logger, route_var, SLOW_QUERY
+
+class LijstHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class TestSlowQuery(unittest.TestCase):
+    def setUp(self):
+        self.handler = LijstHandler()
+        app_logger.addHandler(self.handler)
+        self.addCleanup(app_logger.removeHandler, self.handler)
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE relaties (id INTEGER PRIMARY KEY, persoon1_id INTEGER)"))
+
+    def trage_queries(self):
+        return [r.getMessage() for r in self.handler.records if r.levelno == SLOW_QUERY]
+
+    def test_explain_en_route(self):
+        install_slow_query_log(self.engine, 0)
+        token = route_var.set("GET /relaties/")
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT * FROM relaties WHERE persoon1_id = :id"), {"id": 5}).all()
+        finally:
+            route_var.reset(token)
+        bericht = self.trage_queries()[-1]
+        self.assertIn("route=GET /relaties/", bericht)
+        self.assertIn("params=(5,)", bericht)
+        self.assertIn("plan=SCAN relaties", bericht)
+
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_relaties_persoon1_id ON relaties (persoon1_id)"))
+            conn.execute(text("SELECT * FROM relaties WHERE persoon1_id = 5")).all()
+        self.assertIn("USING COVERING INDEX ix_relaties_persoon1_id", self.trage_queries()[-1])
+
+    def test_onder_drempel(self):
+        install_slow_query_log(self.engine, 60_000)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.assertEqual(self.trage_queries(), [])
+
+if __name__ == '__main__':
+    unittest.main()
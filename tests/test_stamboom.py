@@ -0,0 +1,63 @@
+import unittest
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.hulpmiddelen.stamboom import verwanten_query, generatie_naam, VOOROUDERS, NAKOMELINGEN, VERWANTEN
+from app.models.models import Families, Personen, Relatietypes, Relaties
+from tests.querytelling import QueryCountMixin
+
+class TestStamboom(QueryCountMixin, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(cls.engine)
+        with Session(cls.engine) as session:
+            session.add(Families(id=1, familienaam="De Vries", straatnaam="Hoofdstraat", huisnummer="1", postcode="1234AB", plaats="Amsterdam"))
+            for i in range(1, 10):
+                session.add(Personen(id=i, voornaam=f"Persoon{i}", achternaam="de Vries", familie_id=1))
+            session.add_all([
+                Relatietypes(id=1, relatienaam="is ouder van", afstamming="ouder"),
+                Relatietypes(id=2, relatienaam="is kind van", afstamming="kind"),
+                Relatietypes(id=3, relatienaam="is gehuwd met", symmetrisch=True),
+            ])
+            # 1 -> 2 -> 3 -> 4 (ouder -> kind), 1 -> 5 -> 4 (4 stamt via twee wegen af van 1),
+            # 3 is kind van 2 via het omgekeerde type, 6 is gehuwd met 4, 7 is kind van 4, 8-9 staan apart
+            for persoon1, persoon2, relatietype in [(1, 2, 1), (3, 2, 2), (3, 4, 1), (1, 5, 1), (5, 4, 1),
+                                                    (6, 4, 3), (7, 4, 2), (8, 9, 3)]:
+                session.add(Relaties(persoon1_id=persoon1, persoon2_id=persoon2, relatietype_id=relatietype))
+            session.commit()
+
+    def verwanten(self, soort, persoon_id, max_diepte=25):
+        with Session(self.engine) as session, self.assertMaxQueries(self.engine, 1):
+            return [(persoon.id, diepte) for persoon, diepte in session.exec(verwanten_query(soort, persoon_id, max_diepte))]
+
+    def test_voorouders(self):
+        # Kortste afstand per persoon: 1 is via 5 een grootouder van 4
+        self.assertEqual(self.verwanten(VOOROUDERS, 7), [(4, 1), (3, 2), (5, 2), (1, 3), (2, 3)])
+
+    def test_nakomelingen(self):
+        self.assertEqual(self.verwanten(NAKOMELINGEN, 1), [(2, 1), (5, 1), (3, 2), (4, 2), (7, 3)])
+        self.assertEqual(self.verwanten(NAKOMELINGEN, 7), [])
+
+    def test_maximale_diepte(self):
+        self.assertEqual(self.verwanten(NAKOMELINGEN, 1, max_diepte=1), [(2, 1), (5, 1)])
+        self.assertEqual(self.verwanten(VOOROUDERS, 7, max_diepte=2), [(4, 1), (3, 2), (5, 2)])
+
+    def test_verwanten_binnen_n_stappen(self):
+        # Alle relatietypes tellen, in beide richtingen; de persoon zelf niet
+        self.assertEqual(self.verwanten(VERWANTEN, 6, max_diepte=1), [(4, 1)])
+        self.assertEqual(self.verwanten(VERWANTEN, 6, max_diepte=2), [(4, 1), (3, 2), (5, 2), (7, 2)])
+        self.assertEqual(self.verwanten(VERWANTEN, 8), [(9, 1)])
+
+    def test_generatie_naam(self):
+        self.assertEqual(generatie_naam(VOOROUDERS, 2), "Grootouders")
+        self.assertEqual(generatie_naam(NAKOMELINGEN, 5), "5 generaties")
+        self.assertEqual(generatie_naam(VERWANTEN, 1), "1 stap")
+
+    def test_onbekende_soort(self):
+        with self.assertRaises(ValueError):
+            verwanten_query("buren", 1, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.hulpmiddelen.statisch import CachedStaticFiles, comprimeer_statisch, CACHE_IMMUTABLE, CACHE_REVALIDATE
+
+class TestStatisch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "site.css").write_text("body { color: red; }\n" * 50)
+        (self.dir / "0123456789abcdef_64.jpg").write_bytes(b"jpeg")
+        (self.dir / "person_1.jpg").write_bytes(b"oud")
+        app = FastAPI()
+        app.mount("/s", CachedStaticFiles(directory=self.dir), name="s")
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_control(self):
+        self.assertEqual(self.client.get("/s/site.css").headers["cache-control"], CACHE_REVALIDATE)
+        versie = hashlib.sha256((self.dir / "site.css").read_bytes()).hexdigest()[:10]
+        self.assertEqual(self.client.get(f"/s/site.css?v={versie}").headers["cache-control"], CACHE_IMMUTABLE)
+        # Een andere of verouderde versie, of een parameter die toevallig op 'v=' eindigt: valideren
+        self.assertEqual(self.client.get("/s/site.css?v=abc").headers["cache-control"], CACHE_REVALIDATE)
+        self.assertEqual(self.client.get("/s/site.css?nav=1").headers["cache-control"], CACHE_REVALIDATE)
+        self.assertEqual(self.client.get("/s/0123456789abcdef_64.jpg").headers["cache-control"], CACHE_IMMUTABLE)
+        self.assertEqual(self.client.get("/s/person_1.jpg").headers["cache-control"], CACHE_REVALIDATE)
+
+    def test_conditional_get(self):
+        etag = self.client.get("/s/person_1.jpg").headers["etag"]
+        response = self.client.get("/s/person_1.jpg", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["cache-control"], CACHE_REVALIDATE)
+
+    def test_voorgecomprimeerd(self):
+        self.assertGreaterEqual(comprimeer_statisch(self.dir), 1)
+        self.assertEqual(comprimeer_statisch(self.dir), 0)  # al actueel
+
+        response = self.client.get("/s/site.css", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertTrue(response.headers["content-type"].startswith("text/css"))
+        self.assertEqual(response.text, (self.dir / "site.css").read_text())
+        self.assertEqual(int(response.headers["content-length"]), len(gzip.compress((self.dir / "site.css").read_bytes(), 9, mtime=0)))
+
+        ongecomprimeerd = self.client.get("/s/site.css", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", ongecomprimeerd.headers)
+        self.assertNotEqual(ongecomprimeerd.headers["etag"], response.headers["etag"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+from unittest import mock
+
+from app.hulpmiddelen import verwantschap as verwantschap_module
+from app.hulpmiddelen.verwantschap import verwantschap, Verwantschap, MET_SCIPY
+
+OUDER, PARTNER, KIND = 1, 2, 3
+AFSTAMMING = {OUDER: "ouder", PARTNER: None, KIND: "kind"}
+
+def kolommen(relaties):
+    return [list(kolom) for kolom in zip(*relaties)]
+
+class TestVerwantschap(unittest.TestCase):
+    def setUp(self):
+        # 1 en 2 zijn ouders van 3 en 4 (4 is als 'kind van' 2 ingevoerd); 3 is ouder van 5,
+        # 4 is ouder van 6; 7 is partner van 5; 8 heeft geen relaties
+        self.relaties = [(1, 3, OUDER), (2, 3, OUDER), (1, 4, OUDER), (4, 2, KIND),
+                         (3, 5, OUDER), (4, 6, OUDER), (7, 5, PARTNER)]
+
+    def bereken(self, personen, max_afstand=4):
+        paren = verwantschap(*kolommen(self.relaties), AFSTAMMING, personen, max_afstand, 25)
+        return {(paar.persoon1_id, paar.persoon2_id): (paar.afstand, paar.coefficient) for paar in paren}
+
+    def test_afstand_en_coefficient(self):
+        for met_scipy in {False, MET_SCIPY}:
+            with self.subTest(met_scipy=met_scipy), mock.patch.object(verwantschap_module, "MET_SCIPY", met_scipy):
+                paren = self.bereken(range(1, 9))
+                self.assertEqual(paren[(1, 3)], (1, 0.5))    # ouder - kind
+                self.assertEqual(paren[(3, 4)], (2, 0.5))    # broer/zus
+                self.assertEqual(paren[(1, 5)], (2, 0.25))   # grootouder
+                self.assertEqual(paren[(4, 5)], (3, 0.25))   # oom/tante
+                self.assertEqual(paren[(5, 6)], (4, 0.125))  # neef/nicht
+                self.assertEqual(paren[(5, 7)], (1, 0.0))    # partner: geen bloedverwant
+                self.assertEqual(paren[(1, 2)], (2, 0.0))
+                self.assertNotIn((4, 7), self.bereken(range(1, 9), max_afstand=3))
+                self.assertFalse(any(8 in paar for paar in paren))
+
+    def test_volgorde_en_selectie(self):
+        paren = verwantschap(*kolommen(self.relaties), AFSTAMMING, [6, 5, 3, 5], 4, 25)
+        self.assertEqual(paren, [Verwantschap(3, 5, 1, 0.5), Verwantschap(3, 6, 3, 0.25), Verwantschap(5, 6, 4, 0.125)])
+        self.assertEqual(verwantschap([], [], [], AFSTAMMING, [1, 2], 4, 25), [])
+
+    @unittest.skipUnless(MET_SCIPY, "numpy/scipy niet geïnstalleerd")
+    def test_scipy_gelijk_aan_python(self):
+        rnd = random.Random(11)
+        relaties = []
+        for kind in range(30, 400):
+            for ouder in rnd.sample(range(max(1, kind - 60), kind), rnd.choice((1, 2, 2))):
+                relaties.append((ouder, kind, OUDER))
+        relaties += [(rnd.randint(1, 400), rnd.randint(1, 400), PARTNER) for _ in range(100)]
+        personen = rnd.sample(range(1, 420), 150)
+        resultaten = []
+        for met_scipy in (True, False):
+            with mock.patch.object(verwantschap_module, "MET_SCIPY", met_scipy):
+                resultaten.append(verwantschap(*kolommen(relaties), AFSTAMMING, personen, 5, 25))
+        self.assertEqual(resultaten[0], resultaten[1])
+        self.assertTrue(resultaten[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from itsdangerous import TimestampSigner
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.main import app, settings
+from app.database import get_read_session, get_write_session
+from app.hulpmiddelen.cache import invalidate_caches, SEARCH
+from app.models.models import Families, Personen, Jubilea, Jubileumtypes, Relatietypes, Relaties, Gebruikers, Rollen
+from app.routes import zoeken
+
+class TestZoeken(unittest.TestCase):
+    """GET /search: getypte treffers per soort, korte zoektermen, NDJSON en de cache."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        pad = os.path.join(cls.tmpdir.name, "test.db")
+        sync_engine = create_engine(f"sqlite:///{pad}")
+        SQLModel.metadata.create_all(sync_engine)  # inclusief de FTS5 zoekindex
+        with Session(sync_engine) as session:
+            rol = Rollen(naam="Administrator")
+            session.add(rol)
+            session.commit()
+            gebruiker = Gebruikers(email="admin@example.com", naam="Admin", google_id="1", rol_id=rol.id)
+            familie = Families(familienaam="Jansen", straatnaam="Hoofdstraat", huisnummer="10", postcode="1234AB", plaats="Utrecht")
+            geboortedag = Jubileumtypes(naam="Geboortedag")
+            ouder = Relatietypes(relatienaam="is ouder van")
+            session.add_all([gebruiker, familie, geboortedag, ouder])
+            session.commit()
+
+            personen = [Personen(voornaam=voornaam, achternaam="Jansen", familie_id=familie.id, created_by=gebruiker.id)
+                        for voornaam in ("Anna", "Bram", "Cor", "Dirk")]
+            session.add_all(personen)
+            session.commit()
+            session.add(Jubilea(jubileumnaam="Verjaardag Anna", jubileumdag=date(1980, 5, 1),
+                                persoon_id=personen[0].id, jubileumtype_id=geboortedag.id))
+            session.add(Relaties(persoon1_id=personen[0].id, persoon2_id=personen[1].id, relatietype_id=ouder.id))
+            session.commit()
+            cls.familie_id = familie.id
+        sync_engine.dispose()
+
+        cls.async_engine = create_async_engine(f"sqlite+aiosqlite:///{pad}")
+
+        async def override_get_session():
+            async with AsyncSession(cls.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_read_session] = override_get_session
+        app.dependency_overrides[get_write_session] = override_get_session
+        # De zoekers openen per soort een eigen sessie, buiten de dependencies om
+        cls.sessie_patch = mock.patch.object(
+            zoeken, "new_read_session", lambda: AsyncSession(cls.async_engine, expire_on_commit=False))
+        cls.sessie_patch.start()
+        cls.client = TestClient(app)
+        data = base64.b64encode(json.dumps({"user": {"id": 1, "email": "admin@example.com", "name": "Admin",
+                                                      "role": "Administrator", "google_id": "1"}}).encode())
+        cls.client.cookies.set("my_relations_session", TimestampSigner(str(settings.SECRET_KEY)).sign(data).decode())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sessie_patch.stop()
+        app.dependency_overrides.pop(get_read_session, None)
+        app.dependency_overrides.pop(get_write_session, None)
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        invalidate_caches(SEARCH)
+
+    def zoek(self, **params):
+        response = self.client.get("/search", params=params)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_treffers_per_soort(self):
+        results = self.zoek(q="Jansen")["results"]
+        self.assertEqual(set(results), set(zoeken.ZOEKERS))
+        self.assertEqual({hit["type"] for hit in results["personen"]}, {"persoon"})
+        self.assertEqual(len(results["personen"]), 4)
+        self.assertEqual(results["families"], [{"type": "familie", "id": self.familie_id,
+                                                "label": "Jansen, Utrecht", "url": f"/families/{self.familie_id}"}])
+
+        results = self.zoek(q="Anna", types="jubilea,relaties")["results"]
+        self.assertEqual(set(results), {"jubilea", "relaties"})
+        self.assertEqual([hit["label"] for hit in results["jubilea"]], ["Verjaardag Anna (Anna Jansen)"])
+        self.assertEqual([hit["label"] for hit in results["relaties"]], ["Anna is ouder van Bram"])
+
+    def test_limit_per_soort(self):
+        results = self.zoek(q="Jansen", types="personen", limit=2)["results"]
+        self.assertEqual(len(results["personen"]), 2)
+        response = self.client.get("/search", params={"q": "Jansen", "limit": zoeken.MAX_LIMIT + 1})
+        self.assertEqual(response.status_code, 422)
+
+    def test_korte_zoekterm(self):
+        self.assertEqual(self.zoek(q="J"), {"query": "J", "results": {}})
+        self.assertEqual(self.zoek(q="  J "), {"query": "J", "results": {}})
+
+    def test_onbekend_type(self):
+        response = self.client.get("/search", params={"q": "Jansen", "types": "personen,foo"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Onbekend zoektype: foo", response.text)
+
+    def test_stream(self):
+        response = self.client.get("/search", params={"q": "Jansen", "types": "personen,families", "stream": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        regels = [json.loads(regel) for regel in response.text.splitlines()]
+        self.assertEqual({regel["type"] for regel in regels}, {"personen", "families"})
+        per_soort = {regel["type"]: regel["hits"] for regel in regels}
+        self.assertEqual(len(per_soort["personen"]), 4)
+        self.assertEqual(len(per_soort["families"]), 1)
+
+    def test_cache_vervalt_na_wijziging(self):
+        self.assertEqual(self.zoek(q="Evert", types="personen")["results"]["personen"], [])
+        response = self.client.post("/personen/new", data={"voornaam": "Evert", "achternaam": "Visser",
+                                                           "familie_id": self.familie_id}, follow_redirects=False)
+        self.assertEqual(response.status_code, 303)
+        hits = self.zoek(q="Evert", types="personen")["results"]["personen"]
+        self.assertEqual([hit["label"] for hit in hits], ["Evert Visser"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.orm import aliased
+
+from app.models.models import Families, Personen, Jubilea, Jubileumtypes, Relatietypes, Relaties
+from app.hulpmiddelen.zoekindex import fts_query, search_personen, search_families, search_jubilea, search_relaties
+from datetime import date
+
+class TestZoekindex(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        familie = Families(familienaam="De Vries", straatnaam="Hoofdstraat", huisnummer="10", postcode="1234AB", plaats="Amsterdam")
+        self.session.add(familie)
+        self.session.commit()
+        self.jan = Personen(voornaam="Jan", achternaam="de Vries", familie_id=familie.id)
+        self.jose = Personen(voornaam="José", achternaam="Jansen", familie_id=familie.id)
+        self.session.add_all([self.jan, self.jose])
+        geboortedag = Jubileumtypes(naam="Geboortedag")
+        gehuwd = Relatietypes(relatienaam="is gehuwd met", symmetrisch=True)
+        self.session.add_all([geboortedag, gehuwd])
+        self.session.commit()
+        self.session.add(Jubilea(jubileumnaam="Verjaardag", jubileumdag=date(1980, 1, 1),
+                                 persoon_id=self.jan.id, jubileumtype_id=geboortedag.id))
+        self.session.add(Relaties(persoon1_id=self.jan.id, persoon2_id=self.jose.id, relatietype_id=gehuwd.id))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_fts_query(self):
+        self.assertEqual(fts_query('jan "vries'), '"jan"* "vries"*')
+        self.assertIsNone(fts_query("  "))
+
+    def test_personen_prefix_en_diakrieten(self):
+        namen = lambda term: [p.voornaam for p in self.session.exec(search_personen(self.session, select(Personen), term))]
+        self.assertEqual(sorted(namen("ja")), ["Jan", "José"])
+        self.assertEqual(namen("jose"), ["José"])
+        self.assertEqual(namen("jan vries"), ["Jan"])
+
+    def test_index_volgt_wijzigingen(self):
+        self.jose.voornaam = "Maria"
+        self.session.commit()
+        query = lambda term: self.session.exec(search_personen(self.session, select(Personen), term)).all()
+        self.assertEqual(query("jose"), [])
+        self.assertEqual(len(query("maria")), 1)
+
+    def test_families(self):
+        query = search_families(self.session, select(Families), "1234")
+        self.assertEqual(len(self.session.exec(query).all()), 1)
+
+    def test_jubilea_via_persoon_en_type(self):
+        basis = select(Jubilea, Personen, Jubileumtypes).outerjoin(Personen).join(Jubileumtypes)
+        self.assertEqual(len(self.session.exec(search_jubilea(self.session, basis, "vries")).all()), 1)
+        self.assertEqual(len(self.session.exec(search_jubilea(self.session, basis, "geboorte")).all()), 1)
+        self.assertEqual(len(self.session.exec(search_jubilea(self.session, basis, "jansen")).all()), 0)
+
+    def test_relaties(self):
+        persoon1, persoon2 = aliased(Personen), aliased(Personen)
+        basis = (select(Relaties.id).join(persoon1, Relaties.persoon1_id == persoon1.id)
+                 .join(Relatietypes, Relaties.relatietype_id == Relatietypes.id)
+                 .outerjoin(persoon2, Relaties.persoon2_id == persoon2.id))
+        for term in ("jansen", "gehuwd"):
+            self.assertEqual(len(self.session.exec(search_relaties(self.session, basis, term, persoon1, persoon2)).all()), 1)
+
+    def test_relaties_op_rank(self):
+        # Een relatie waarin beide personen treffen komt voor een relatie met één treffer
+        piet = Personen(voornaam="Piet", achternaam="Jansen", familie_id=self.jan.familie_id)
+        kees = Personen(voornaam="Kees", achternaam="Bakker", familie_id=self.jan.familie_id)
+        ouder = Relatietypes(relatienaam="is ouder van")
+        self.session.add_all([piet, kees, ouder])
+        self.session.commit()
+        beide = Relaties(persoon1_id=self.jose.id, persoon2_id=piet.id, relatietype_id=ouder.id)
+        self.session.add(beide)
+        self.session.commit()
+        een = Relaties(persoon1_id=piet.id, persoon2_id=kees.id, relatietype_id=ouder.id)
+        self.session.add(een)
+        self.session.commit()
+        persoon1, persoon2 = aliased(Personen), aliased(Personen)
+        basis = (select(Relaties.id).join(persoon1, Relaties.persoon1_id == persoon1.id)
+                 .join(Relatietypes, Relaties.relatietype_id == Relatietypes.id)
+                 .outerjoin(persoon2, Relaties.persoon2_id == persoon2.id))
+        ids = self.session.exec(search_relaties(self.session, basis, "jansen", persoon1, persoon2)).all()
+        # Daarna de relaties met één treffer (gelijke rank) op id
+        eerste = self.session.exec(select(Relaties.id).where(Relaties.persoon2_id == self.jose.id)).one()
+        self.assertEqual(ids, [beide.id, eerste, een.id])
+
+if __name__ == '__main__':
+    unittest.main()